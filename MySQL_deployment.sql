@@ -337,3 +337,74 @@ FROM gl860_weather_data
 WHERE year = 2025 AND month = 8
 GROUP BY DATE(record_time)
 ORDER BY DATE(record_time);
+
+-- ============================================
+-- 10. 彙總資料表查詢（資料量大時建議使用）
+-- ============================================
+-- gl860_hourly_rollup / gl860_monthly_rollup 由 create_statistics.py 更新，
+-- 每個通道存放 _count / _sum / _min / _max，平均值 = SUM(_sum) / SUM(_count)
+-- 一個月只需讀取約 720 筆（小時）或 1 筆（月），不必掃描每分鐘的原始資料
+-- 彙總表每個記錄器（logger_id）各自一筆，下列查詢合併全部記錄器，加上 logger_id = '...' 可只查詢一個記錄器
+
+-- 查詢各小時的平均溫度（對應「3. 時段分析」）
+SELECT 
+    hour,
+    ROUND(SUM(temperature_sum) / SUM(temperature_count), 2) as avg_temp,
+    SUM(record_count) as record_count
+FROM gl860_hourly_rollup
+WHERE year = 2025 AND month = 8
+GROUP BY hour
+ORDER BY hour;
+
+-- 查詢白天（6:00-18:00）vs 夜晚（18:00-6:00）的平均值
+SELECT 
+    CASE 
+        WHEN hour BETWEEN 6 AND 17 THEN '白天'
+        ELSE '夜晚'
+    END as time_period,
+    ROUND(SUM(temperature_sum) / SUM(temperature_count), 2) as avg_temp,
+    ROUND(SUM(humidity_sum) / SUM(humidity_count), 2) as avg_humidity,
+    SUM(record_count) as record_count
+FROM gl860_hourly_rollup
+WHERE year = 2025 AND month = 8
+GROUP BY time_period;
+
+-- 查詢週間 vs 週末的比較（weekday 同 DAYOFWEEK：1=星期日, 7=星期六）
+SELECT 
+    CASE 
+        WHEN weekday IN (1, 7) THEN '週末'
+        ELSE '週間'
+    END as day_type,
+    ROUND(SUM(temperature_sum) / SUM(temperature_count), 2) as avg_temp,
+    ROUND(SUM(humidity_sum) / SUM(humidity_count), 2) as avg_humidity,
+    SUM(record_count) as record_count
+FROM gl860_hourly_rollup
+WHERE year = 2025 AND month = 8
+GROUP BY day_type;
+
+-- 查詢每日 UV 和光照（全部五個通道都有彙總）
+SELECT 
+    DATE(hour_start) as date,
+    ROUND(SUM(uv_sum) / SUM(uv_count), 2) as avg_uv,
+    MAX(uv_max) as max_uv,
+    ROUND(SUM(lux_sum) / SUM(lux_count), 2) as avg_lux,
+    MAX(lux_max) as max_lux
+FROM gl860_hourly_rollup
+WHERE hour_start >= '2025-08-01' AND hour_start < '2025-09-01'
+GROUP BY DATE(hour_start)
+ORDER BY date;
+
+-- 查詢各月份統計（每個記錄器一筆）
+SELECT 
+    logger_id,
+    year,
+    month,
+    record_count,
+    ROUND(temperature_sum / temperature_count, 2) as avg_temp,
+    temperature_max as max_temp,
+    temperature_min as min_temp,
+    ROUND(humidity_sum / humidity_count, 2) as avg_humidity,
+    uv_max as max_uv,
+    lux_max as max_lux
+FROM gl860_monthly_rollup
+ORDER BY month_start, logger_id;
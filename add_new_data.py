@@ -1,289 +1,502 @@
 """
 增量導入新的 GL860 資料
 只導入資料庫中不存在的記錄
+
+不加參數時以選單操作；加上 --mode 時不需要任何輸入，可以排程定期執行：
+    python add_new_data.py --mode new --reimport-policy upsert
+    python add_new_data.py --mode all --reimport-policy replace --yes
+    python add_new_data.py --mode files --files "GL860/GL860 RAWDATA_2509.xlsx"
+    python add_new_data.py --mode new --dry-run      # 只列出會執行的動作
+    python add_new_data.py --mode new --reimport-policy tail   # 已變更的檔案只導入後面新增的資料列
+
+同一個月份的匯出檔在月中會一再重新存檔、只在後面增加資料，
+--reimport-policy tail 從 manifest 記錄的位置繼續讀取，只寫入新增的資料列（支援 .xlsx 和 .csv）
 """
-import pandas as pd
-import mysql.connector
+import argparse
 from mysql.connector import Error
 import os
+import sys
 from datetime import datetime
 import glob
-import configparser
+import itertools
+
+from db import bulk_load_session, get_connection, import_config, mysql_config
+from db_schema import ensure_weather_table
+from dirty_dates import DirtyDates
+from gl860_loader import (
+    DEFAULT_BATCH_SIZE, DEFAULT_COMMIT_INTERVAL, DEFAULT_ENGINE, DEFAULT_MODE, DEFAULT_TABLE,
+    BatchLoader
+)
+from gl860_parser import (
+    DEFAULT_LOGGER_ID, FILE_PATTERNS, PARSE_ERRORS, TailPosition, extract_year_month_from_filename,
+    iter_record_batches, map_channel_columns, open_sheet
+)
+from import_manifest import (
+    STATUS_CHANGED, STATUS_NEW, STATUS_UNCHANGED, ImportManifest, file_fingerprint
+)
+from import_metrics import NO_METRICS, ImportRun
+from parse_cache import ParseCache, iter_cached_batches
+from partitions import (
+    add_months, has_other_loggers, is_partitioned, month_days, prepare_month, replace_month
+)
+from result_cache import month_summaries
+
+# manifest 建立前就已導入的月份（資料庫有資料但沒有檔案指紋）
+STATUS_EXISTS = 'exists'
+
+STATUS_LABELS = {
+    STATUS_NEW: "○ 新檔案",
+    STATUS_CHANGED: "↻ 已變更",
+    STATUS_UNCHANGED: "✓ 未變更",
+    STATUS_EXISTS: "✓ 已存在",
+}
+
+# 命令列模式：new 新檔案和已變更的檔案、all 全部檔案、files 指定的檔案
+CLI_MODES = ('new', 'all', 'files')
+# 月份已有資料時的處理方式：skip 跳過、replace 刪除該月份後重新導入、upsert 覆蓋同一時間的記錄、
+# tail 只導入上次導入位置之後新增的資料列（檔案前面的內容被修改時，加上 --yes 才會改為 upsert）
+REIMPORT_POLICIES = ('skip', 'replace', 'upsert', 'tail')
+
+ACTION_IMPORT = 'import'
+ACTION_SKIP = 'skip'
+ACTION_LABELS = {
+    ACTION_IMPORT: "導入",
+    ACTION_SKIP: "跳過",
+    'replace': "刪除該月份後重新導入",
+    'upsert': "重新導入（覆蓋同一時間的記錄）",
+    'tail': "只導入新增的資料列",
+}
+
+# 同一時間只允許一個導入程式執行（排程間隔比導入時間短時，後來的會直接結束）
+IMPORT_LOCK = 'gl860_add_new_data'
 
 class GL860IncrementalImporter:
-    def __init__(self):
-        """初始化資料庫連接參數"""
-        self.config = self.read_config()
-        self.connection = None
-    
-    def read_config(self):
-        """讀取配置文件"""
-        config = configparser.ConfigParser()
-        config.read('config.ini', encoding='utf-8')
-        return config['MySQL']
+    def __init__(self, connection=None):
+        """初始化資料庫連接參數
+        connection: 可傳入現有的連線，否則由 create_connection 從連線池取得
+        """
+        self.config = mysql_config()
+        self.import_config = import_config()
+        self.connection = connection
+        self.owns_connection = connection is None
+        self.manifest = ImportManifest(connection) if connection else None
+        # 資料庫中已有資料的 (year, month)，第一次查詢時一次載入
+        self.existing_months = None
+        # 本次導入的計時記錄（ImportRun），結束後寫入 import_runs
+        self.run = None
+        # 解析結果快取（config.ini 的 parse_cache 關閉或沒有安裝 pyarrow 時為 None）
+        self.cache = ParseCache.from_config()
+        # tail 無法繼續時是否改為 upsert 重新導入整個檔案（命令列模式需要 --yes）
+        self.tail_fallback = True
     
     def create_connection(self):
-        """建立 MySQL 連接"""
+        """從共用連線池取得 MySQL 連接"""
         try:
-            self.connection = mysql.connector.connect(
-                host=self.config['host'],
-                database=self.config['database'],
-                user=self.config['user'],
-                password=self.config['password']
-            )
+            self.connection = get_connection()
+            self.owns_connection = True
             if self.connection.is_connected():
                 print(f"✓ 成功連接到 MySQL 資料庫: {self.config['database']}")
+                self.manifest = ImportManifest(self.connection)
                 return True
         except Error as e:
             print(f"✗ 連接錯誤: {e}")
             return False
     
+    def ensure_table(self):
+        """確認資料表存在並升級到最新結構（舊版資料表會轉換成精簡結構）"""
+        try:
+            ensure_weather_table(self.connection)
+            self.manifest.ensure_table()
+            DirtyDates(self.connection).ensure_table()
+            return True
+        except (Error, ValueError) as e:
+            print(f"✗ 資料表結構升級錯誤: {e}")
+            return False
+    
     def extract_year_month_from_filename(self, filename):
         """從檔名提取年份和月份"""
-        basename = os.path.basename(filename)
-        parts = basename.split('_')
-        if len(parts) >= 2:
-            yymm = parts[1].replace('.xlsx', '')
-            if len(yymm) == 4:
-                year = 2000 + int(yymm[:2])
-                month = int(yymm[2:])
-                return year, month
-        return None, None
+        return extract_year_month_from_filename(filename)
     
-    def check_month_exists(self, year, month):
-        """檢查特定年月的資料是否已存在"""
+    def load_existing_months(self):
+        """一次查詢資料庫中已有資料的所有 (year, month)（由索引 idx_year_month 回答，不必讀取資料列）"""
         cursor = self.connection.cursor()
-        query = """
-        SELECT COUNT(*) 
-        FROM gl860_weather_data 
-        WHERE year = %s AND month = %s
-        """
-        cursor.execute(query, (year, month))
-        count = cursor.fetchone()[0]
-        cursor.close()
-        return count > 0
+        try:
+            cursor.execute("SELECT DISTINCT year, month FROM gl860_weather_data")
+            self.existing_months = {(year, month) for year, month in cursor.fetchall()}
+        finally:
+            cursor.close()
     
-    def parse_excel_file(self, filepath):
-        """解析 Excel 檔案"""
+    def check_month_exists(self, year, month):
+        """檢查特定年月的資料是否已存在（結果快取在記憶體中，不必每次查詢）"""
+        if self.existing_months is None:
+            self.load_existing_months()
+        return (year, month) in self.existing_months
+    
+    def iter_excel_batches(self, filepath, chunk_size=None, metrics=None, position=None):
+        """逐批解析 Excel 或 CSV 檔案（chunk_size 為 None 時整個檔案為一批）
+        metrics: FileMetrics 物件，記錄各階段的耗時
+        position: TailPosition 物件，position.rows 大於 0 時從該位置之後開始讀取
+                  （無法繼續時 position.resumed 為 False，不產生任何批次），
+                  結束時更新為檔案讀取到的位置
+        """
         year, month = self.extract_year_month_from_filename(filepath)
         if not year or not month:
             print(f"✗ 無法從檔名提取年月: {filepath}")
-            return None
+            return
         
         print(f"\n處理檔案: {os.path.basename(filepath)}")
         print(f"年份: {year}, 月份: {month}")
         
-        try:
-            # 讀取第一個 sheet
-            df = pd.read_excel(filepath, sheet_name=0, header=None)
-            
-            # 找到 "Data" 標記的位置
-            data_row = None
-            for idx, row in df.iterrows():
-                if row[0] == 'Data':
-                    data_row = idx
-                    break
-            
-            if data_row is None:
+        metrics = metrics or NO_METRICS
+        # 以唯讀串流方式讀取第一個 sheet（或 CSV 檔），一次掃描同時找到 Data 標記和資料列
+        with open_sheet(filepath, metrics=metrics) as reader:
+            if reader.data_row is None:
                 print("✗ 找不到資料區域")
-                return None
-            
-            # 讀取資料
-            df_data = pd.read_excel(
-                filepath, 
-                sheet_name=0,
-                skiprows=data_row + 2
-            )
+                return
             
-            print(f"讀取到的欄位: {df_data.columns.tolist()}")
-            
-            # 準備資料
-            records = []
+            columns = reader.columns
+            print(f"讀取到的欄位: {columns}")
             
             # 找出日期時間和通道欄位
-            date_col = None
-            ch_cols = {}
-            data_columns = []
-            
-            for col in df_data.columns:
-                col_str = str(col).strip()
-                if 'time' in col_str.lower() or '時間' in col_str:
-                    date_col = col
-                elif col_str not in ['NO.', 'Number'] and not col_str.startswith('Unnamed'):
-                    data_columns.append(col)
-            
-            # 統計有多少個 degC 欄位
-            degc_columns = [col for col in data_columns if 'degc' in str(col).lower()]
-            
-            # 映射通道
-            for i, col in enumerate(data_columns):
-                col_str = str(col)
-                col_lower = col_str.lower()
-                
-                # Channel 1: 第一個溫度欄位
-                if 'degc' in col_lower and '.1' not in col_str and 1 not in ch_cols:
-                    ch_cols[1] = col
-                # Channel 2: 濕度
-                elif '%' in col_str or 'rh' in col_lower:
-                    ch_cols[2] = col
-                # Channel 3: UV
-                elif 'w/m2' in col_lower and '.1' not in col_str:
-                    ch_cols[3] = col
-                # Channel 4: 照度
-                elif 'lux' in col_lower:
-                    ch_cols[4] = col
-                # Channel 5: 設備溫度
-                elif 'degc.1' in col_lower:
-                    ch_cols[5] = col
-                elif len(degc_columns) >= 2 and 'degc' in col_lower and 1 in ch_cols and col != ch_cols[1]:
-                    ch_cols[5] = col
+            with metrics.phase('column_mapping'):
+                date_col, ch_cols, data_columns = map_channel_columns(columns)
             
             print(f"日期欄位: {date_col}")
             print(f"通道映射: {ch_cols}")
             
             if date_col is None:
                 print("✗ 找不到日期時間欄位")
-                return None
+                return
             
-            # 處理每一行資料
-            for idx, row in df_data.iterrows():
-                try:
-                    if pd.isna(row.get(date_col)):
-                        continue
-                    
-                    date_time = row[date_col]
-                    if isinstance(date_time, str):
-                        date_time = pd.to_datetime(date_time)
-                    
-                    record_time = date_time
-                    
-                    # 提取各通道資料
-                    ch1_temp = float(row[ch_cols.get(1)]) if 1 in ch_cols and pd.notna(row.get(ch_cols.get(1))) else None
-                    ch2_humidity = float(row[ch_cols.get(2)]) if 2 in ch_cols and pd.notna(row.get(ch_cols.get(2))) else None
-                    ch3_uv = float(row[ch_cols.get(3)]) if 3 in ch_cols and pd.notna(row.get(ch_cols.get(3))) else None
-                    ch4_lux = float(row[ch_cols.get(4)]) if 4 in ch_cols and pd.notna(row.get(ch_cols.get(4))) else None
-                    ch5_device_temp = float(row[ch_cols.get(5)]) if 5 in ch_cols and pd.notna(row.get(ch_cols.get(5))) else None
-                    
-                    records.append({
-                        'year': year,
-                        'month': month,
-                        'record_time': record_time,
-                        'channel1_temperature': ch1_temp,
-                        'channel2_humidity': ch2_humidity,
-                        'channel3_uv': ch3_uv,
-                        'channel4_lux': ch4_lux,
-                        'channel5_device_temp': ch5_device_temp
-                    })
-                    
-                except Exception as e:
-                    print(f"✗ 處理第 {idx} 行時發生錯誤: {e}")
-                    continue
+            date_index = columns.index(date_col)
+            if position is not None and position.rows:
+                # 略過上次已導入的資料列，確認上次的最後一列沒有被修改
+                with metrics.phase('read'):
+                    position.resumed = reader.resume(position, date_index)
+                if not position.resumed:
+                    print("✗ 檔案前面的內容已變更，無法只導入新增的資料列")
+                    return
+                print(f"從第 {position.rows + 1} 筆資料列繼續讀取")
             
-            print(f"✓ 成功解析 {len(records)} 筆記錄")
-            return records
+            # 以欄為單位轉換日期時間和各通道數值
+            total = 0
+            invalid_total = 0
+            for batch, invalid_count in iter_record_batches(
+                reader, columns, date_col, ch_cols, year, month, chunk_size,
+                self.import_config.get('logger_id', DEFAULT_LOGGER_ID), metrics
+            ):
+                total += len(batch)
+                invalid_total += invalid_count
+                yield batch
             
-        except Exception as e:
+            if position is not None:
+                position.update(reader.position(date_index))
+        
+        if invalid_total:
+            print(f"✗ 略過 {invalid_total} 筆無法轉換的資料列")
+        
+        print(f"✓ 成功解析 {total} 筆記錄")
+    
+    def iter_file_batches(self, filepath, chunk_size=None, metrics=None, position=None,
+                          content_hash=None):
+        """逐批取得整個檔案的資料：有解析快取時直接讀取，否則解析檔案並同時寫入快取"""
+        return iter_cached_batches(
+            self.cache, filepath, content_hash,
+            lambda: self.iter_excel_batches(filepath, chunk_size, metrics, position),
+            chunk_size, self.import_config.get('logger_id', DEFAULT_LOGGER_ID), metrics, position
+        )
+    
+    def parse_excel_file(self, filepath):
+        """解析 Excel 檔案（整個檔案為一個批次）"""
+        try:
+            batches = list(self.iter_excel_batches(filepath))
+        except PARSE_ERRORS as e:
             print(f"✗ 解析 Excel 檔案錯誤: {e}")
             return None
+        return batches[0] if batches else None
     
-    def insert_records_ignore_duplicates(self, records):
-        """插入記錄，忽略重複的資料"""
-        if not self.connection or not records:
-            return False
-        
-        # 使用 INSERT IGNORE 來跳過重複的記錄
-        insert_query = """
-        INSERT IGNORE INTO gl860_weather_data 
-        (year, month, record_time, channel1_temperature, channel2_humidity, 
-         channel3_uv, channel4_lux, channel5_device_temp)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    def insert_batches(self, batches, mode=None, table=DEFAULT_TABLE, metrics=None,
+                       commit_interval=None):
+        """逐批插入記錄，成功時回傳 BatchLoader（含筆數統計），失敗時回傳 None
+        mode: ignore（跳過已存在的記錄）或 upsert（覆蓋已存在的記錄），預設依 config.ini
+        table: 寫入的資料表（替換分區時寫入暫存資料表）
+        metrics: FileMetrics 物件，記錄寫入和 commit 的耗時
+        commit_interval: 每幾批 commit 一次，預設依 config.ini
         """
+        if not self.connection:
+            return None
+        
+        if mode is None:
+            mode = self.import_config.get('duplicate_mode', DEFAULT_MODE)
+        if commit_interval is None:
+            commit_interval = self.import_config.getint('commit_interval', fallback=DEFAULT_COMMIT_INTERVAL)
         
+        # 以主鍵 (record_time, logger_id) 判斷重複：
+        # ignore 使用 INSERT IGNORE，upsert 使用 ON DUPLICATE KEY UPDATE
+        loader = BatchLoader(
+            self.connection,
+            engine=self.import_config.get('load_engine', DEFAULT_ENGINE),
+            table=table,
+            mode=mode,
+            commit_interval=commit_interval,
+            dirty_dates=DirtyDates(self.connection),
+            metrics=metrics
+        )
         try:
-            cursor = self.connection.cursor()
-            
-            values = [
-                (
-                    r['year'],
-                    r['month'],
-                    r['record_time'],
-                    r['channel1_temperature'],
-                    r['channel2_humidity'],
-                    r['channel3_uv'],
-                    r['channel4_lux'],
-                    r['channel5_device_temp']
-                )
-                for r in records
-            ]
-            
-            cursor.executemany(insert_query, values)
-            self.connection.commit()
-            
-            inserted_count = cursor.rowcount
-            print(f"✓ 成功插入 {inserted_count} 筆新記錄")
+            with bulk_load_session(self.connection):
+                loader.load_batches(batches)
+        except Error as e:
+            print(f"✗ 插入資料錯誤: {e}")
+            print(f"  (已提交 {loader.committed} 筆記錄，未提交的部分已復原)")
+            return None
+        except PARSE_ERRORS as e:
+            print(f"✗ 解析 Excel 檔案錯誤: {e}")
+            print(f"  (已提交 {loader.committed} 筆記錄，未提交的部分已復原)")
+            return None
+        
+        if loader.mode == 'upsert':
+            print(f"✓ 成功寫入 {loader.processed} 筆記錄（新增或更新，影響 {loader.inserted} 筆）")
+        else:
+            print(f"✓ 成功插入 {loader.inserted} 筆新記錄")
             
-            skipped = len(records) - inserted_count
+            skipped = loader.processed - loader.inserted
             if skipped > 0:
                 print(f"  (跳過 {skipped} 筆已存在的記錄)")
-            
-            cursor.close()
-            return True
-            
-        except Error as e:
-            print(f"✗ 插入資料錯誤: {e}")
-            self.connection.rollback()
+        
+        return loader
+    
+    def insert_records_ignore_duplicates(self, records):
+        """插入記錄，忽略重複的資料"""
+        if not self.connection or not records:
             return False
+        return self.insert_batches([records], mode='ignore') is not None
+    
+    def file_status(self, filepath):
+        """判斷檔案狀態：新檔案、未變更、已變更，或在 manifest 建立前就已導入"""
+        status, _ = self.manifest.check(filepath)
+        if status == STATUS_NEW:
+            year, month = self.extract_year_month_from_filename(filepath)
+            if self.check_month_exists(year, month):
+                return STATUS_EXISTS
+        return status
     
-    def import_file(self, filepath):
-        """導入單個檔案"""
+    def import_file(self, filepath, mode=None):
+        """導入單個檔案
+        有指定 mode 時不再詢問是否重新導入（例如已變更的檔案直接以 upsert 方式導入）
+        mode 為 replace 時先刪除該月份的資料再導入；
+        mode 為 tail 時只導入 manifest 記錄的位置之後的資料列，無法繼續時改為 upsert
+        （self.tail_fallback 為 False 時不重新導入，跳過此檔案並回傳 False）
+        """
         year, month = self.extract_year_month_from_filename(filepath)
         
         if not year or not month:
             return False
         
         # 檢查是否已存在
-        if self.check_month_exists(year, month):
+        if mode is None and self.check_month_exists(year, month):
             print(f"⚠ {year}年{month}月的資料已存在")
             response = input(f"  是否要重新導入這個月的資料？(y/n): ").strip().lower()
             if response != 'y':
                 print("  跳過此檔案")
                 return True
+            # 重新導入時以新資料覆蓋同一時間的記錄，不會產生重複資料
+            mode = 'upsert'
+        
+        # 解析前先取得檔案指紋，導入成功後登記到 manifest
+        fingerprint = file_fingerprint(filepath)
+        metrics = self.run.file(filepath) if self.run is not None else NO_METRICS
+        metrics.track_connection(self.connection)
         
-        records = self.parse_excel_file(filepath)
-        if records:
-            return self.insert_records_ignore_duplicates(records)
-        return False
+        # 邊解析邊寫入，每批 batch_size 筆
+        batch_size = self.import_config.getint('batch_size', fallback=DEFAULT_BATCH_SIZE)
+        row_count = 0
+        position = TailPosition()
+        if mode == 'tail':
+            entry = self.manifest.get(filepath)
+            position = TailPosition.from_entry(entry)
+            if position.rows:
+                row_count = entry['row_count']
+                loader = self.append_tail(filepath, year, month, batch_size, metrics, position)
+                if loader is not None and not position.resumed:
+                    mode, position, row_count = 'upsert', TailPosition(), 0
+            else:
+                print("  沒有上次導入的位置")
+                mode = 'upsert'
+            if mode == 'upsert':
+                if not self.tail_fallback:
+                    print("✗ 無法只導入新增的資料列，重新導入整個檔案需要加上 --yes，跳過此檔案")
+                    metrics.finish(self.connection)
+                    return False
+                print("  改為重新導入整個檔案（覆蓋同一時間的記錄）")
+        
+        if mode != 'tail':
+            loader = self.load_file(filepath, year, month, mode, batch_size, metrics, position,
+                                    fingerprint['content_hash'])
+        metrics.finish(self.connection)
+        metrics.print_summary()
+        if loader is None:
+            return False
+        
+        row_count += loader.processed
+        self.manifest.record(filepath, fingerprint, year, month, row_count, position)
+        if self.existing_months is not None and loader.processed:
+            self.existing_months.add((year, month))
+        return True
     
-    def import_all_new_files(self, folder_path='GL860'):
-        """導入指定資料夾中的所有新檔案"""
-        pattern = os.path.join(folder_path, 'GL860 RAWDATA_*.xlsx')
-        files = glob.glob(pattern)
+    def load_file(self, filepath, year, month, mode, batch_size, metrics, position=None,
+                  content_hash=None):
+        """寫入整個檔案，成功時回傳 BatchLoader，失敗時回傳 None
+        content_hash: 檔案內容雜湊，有解析快取時直接讀取快取
+        """
+        batches = self.iter_file_batches(filepath, batch_size, metrics, position, content_hash)
+        if mode == 'replace':
+            # 先確認檔案有解析出資料，才刪除或替換該月份的原資料
+            batches = self.peek_batches(batches)
+            if batches is None:
+                return None
+            logger_id = self.import_config.get('logger_id', DEFAULT_LOGGER_ID)
+            if (is_partitioned(self.connection, DEFAULT_TABLE)
+                    and not has_other_loggers(self.connection, DEFAULT_TABLE, year, month, logger_id)):
+                # 分區中只有這個 logger 的資料時，整個替換該月份的分區
+                return self.replace_month_partition(year, month, batches, metrics)
+            return self.replace_month_rows(year, month, batches, metrics)
+        # upsert 在任何資料表結構下都以 ON DUPLICATE KEY UPDATE 覆蓋同一時間的記錄
+        prepare_month(self.connection, DEFAULT_TABLE, year, month)
+        return self.insert_batches(batches, mode=mode, metrics=metrics)
+    
+    def peek_batches(self, batches):
+        """讀取到第一個有資料的批次為止，回傳包含該批次的完整批次來源；
+        沒有解析出任何記錄（例如找不到資料區域）或解析失敗時回傳 None
+        """
+        try:
+            for batch in batches:
+                if len(batch):
+                    return itertools.chain([batch], batches)
+        except PARSE_ERRORS as e:
+            print(f"✗ 解析 Excel 檔案錯誤: {e}")
+            return None
+        print("✗ 檔案沒有解析出任何記錄，原資料不受影響")
+        return None
+    
+    def append_tail(self, filepath, year, month, batch_size, metrics, position):
+        """只寫入 position 之後新增的資料列，耗時與新增的筆數成正比
+        成功時回傳 BatchLoader 並將 position 更新為新的位置；
+        檔案前面的內容已變更時 position.resumed 為 False（沒有寫入任何資料）
+        """
+        print(f"  只導入新增的資料列（上次導入到 {position.last_time}）")
+        prepare_month(self.connection, DEFAULT_TABLE, year, month)
+        # 之前的資料已在資料庫中，同一時間的記錄不需要覆蓋
+        return self.insert_batches(
+            self.iter_excel_batches(filepath, batch_size, metrics, position), mode='ignore',
+            metrics=metrics
+        )
+    
+    def replace_month_partition(self, year, month, batches, metrics=None):
+        """將檔案的資料（batches）寫入暫存資料表，再以 EXCHANGE PARTITION 替換該月份的分區
+        成功時回傳 BatchLoader，失敗時回傳 None（原資料不受影響）
+        """
+        print(f"  以分區交換替換 {year}年{month}月 的資料")
+        
+        def load(staging):
+            loader = self.insert_batches(batches, mode='ignore', table=staging, metrics=metrics)
+            if loader is None:
+                raise RuntimeError("寫入暫存資料表失敗")
+            if loader.processed == 0:
+                raise RuntimeError("檔案沒有解析出任何記錄")
+            return loader
+        
+        try:
+            return replace_month(self.connection, DEFAULT_TABLE, year, month, load,
+                                 dirty_dates=DirtyDates(self.connection))
+        except (Error, RuntimeError, ValueError) as e:
+            print(f"✗ 替換分區失敗，原資料不受影響: {e}")
+            return None
+    
+    def replace_month_rows(self, year, month, batches, metrics=None):
+        """刪除該月份這個 logger 的資料後重新寫入檔案的資料（batches）
+        用於沒有分區的資料表，以及分區中還有其他 logger 資料的月份；
+        刪除和寫入在同一個交易中，失敗時一併復原，原資料不受影響
+        """
+        print(f"  刪除 {year}年{month}月 的資料後重新導入")
+        logger_id = self.import_config.get('logger_id', DEFAULT_LOGGER_ID)
+        prepare_month(self.connection, DEFAULT_TABLE, year, month)
+        # autocommit 關閉期間刪除，刪除和寫入才會在同一個交易中
+        with bulk_load_session(self.connection):
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute(
+                    f"DELETE FROM {DEFAULT_TABLE} WHERE logger_id = %s AND record_time >= %s AND record_time < %s",
+                    (logger_id, datetime(year, month, 1), datetime(*add_months(year, month, 1), 1))
+                )
+                print(f"  已刪除 {cursor.rowcount} 筆記錄")
+                # 舊資料有、新資料沒有的日期也需要重新計算統計
+                DirtyDates(self.connection).mark(month_days(year, month))
+            except Error as e:
+                self.connection.rollback()
+                print(f"✗ 刪除資料失敗: {e}")
+                return None
+            finally:
+                cursor.close()
+            
+            # 整個月份在同一個交易中寫入，最後才 commit
+            return self.insert_batches(
+                batches, mode='ignore', metrics=metrics, commit_interval=sys.maxsize
+            )
+    
+    def find_files(self, folder_path='GL860'):
+        """資料夾中的所有 GL860 檔案（.xlsx 和 .csv，依檔名排序，排除暫存檔）"""
+        files = []
+        for pattern in FILE_PATTERNS:
+            files.extend(glob.glob(os.path.join(folder_path, pattern)))
         
         # 排除暫存檔
         files = [f for f in files if not os.path.basename(f).startswith('~$')]
+        files.sort()
+        return files
+    
+    def print_file_list(self, files, statuses):
+        """顯示檔案列表和每個檔案的狀態"""
+        print("\n檔案列表：")
+        for i, filepath in enumerate(files, 1):
+            year, month = self.extract_year_month_from_filename(filepath)
+            label = STATUS_LABELS[statuses[filepath]]
+            print(f"{i}. {os.path.basename(filepath)} - {year}年{month}月 [{label}]")
+    
+    def import_all_new_files(self, folder_path='GL860'):
+        """導入指定資料夾中的所有新檔案"""
+        files = self.find_files(folder_path)
         
         if not files:
             print(f"✗ 在 {folder_path} 中找不到符合條件的檔案")
             return
         
         print(f"✓ 找到 {len(files)} 個檔案")
-        files.sort()
+        
+        # 依檔案指紋判斷每個檔案的狀態
+        statuses = {filepath: self.file_status(filepath) for filepath in files}
         
         # 顯示檔案列表
-        print("\n檔案列表：")
-        for i, filepath in enumerate(files, 1):
-            year, month = self.extract_year_month_from_filename(filepath)
-            exists = "✓ 已存在" if self.check_month_exists(year, month) else "○ 新檔案"
-            print(f"{i}. {os.path.basename(filepath)} - {year}年{month}月 [{exists}]")
+        self.print_file_list(files, statuses)
         
         print("\n選項：")
         print("1. 全部導入（跳過已存在的月份）")
-        print("2. 只導入新檔案")
+        print("2. 只導入新檔案和已變更的檔案")
         print("3. 選擇特定檔案導入")
         print("4. 取消")
         
         choice = input("\n請選擇 (1-4): ").strip()
         
+        # 記錄本次導入每個檔案各階段的耗時
+        self.run = ImportRun('add_new_data')
+        try:
+            self.import_choice(choice, files, statuses)
+        finally:
+            if self.run.files:
+                self.run.report(self.connection)
+            self.run = None
+    
+    def import_choice(self, choice, files, statuses):
+        """依選項導入檔案"""
         if choice == '1':
             # 全部導入，但跳過已存在的
             for filepath in files:
@@ -294,14 +507,17 @@ class GL860IncrementalImporter:
                 self.import_file(filepath)
         
         elif choice == '2':
-            # 只導入新檔案
-            new_files = [f for f in files 
-                        if not self.check_month_exists(*self.extract_year_month_from_filename(f))]
-            if not new_files:
-                print("\n沒有新檔案需要導入")
+            # 只導入新檔案，已變更的檔案自動以 upsert 方式重新導入，未變更的檔案不需重新解析
+            new_files = [f for f in files if statuses[f] == STATUS_NEW]
+            changed_files = [f for f in files if statuses[f] == STATUS_CHANGED]
+            if not new_files and not changed_files:
+                print("\n沒有新檔案或已變更的檔案需要導入")
             else:
                 for filepath in new_files:
                     self.import_file(filepath)
+                for filepath in changed_files:
+                    print(f"\n↻ {os.path.basename(filepath)} 已變更，重新導入")
+                    self.import_file(filepath, mode='upsert')
         
         elif choice == '3':
             # 選擇特定檔案
@@ -319,26 +535,78 @@ class GL860IncrementalImporter:
         else:
             print("\n取消導入")
     
+    def plan_imports(self, files, statuses, mode='new', policy=None):
+        """決定每個檔案的處理方式，回傳 [(檔案, 動作), ...]
+
+        mode: new 只處理新檔案和已變更的檔案，all / files 處理傳入的所有檔案
+        policy: 月份已有資料時的處理方式（skip / replace / upsert）；
+                未指定時與選單相同：已變更的檔案以 upsert 重新導入，其他已存在的月份跳過
+        """
+        if mode == 'new':
+            files = [f for f in files if statuses[f] in (STATUS_NEW, STATUS_CHANGED)]
+        
+        plan = []
+        for filepath in files:
+            status = statuses[filepath]
+            if status == STATUS_NEW:
+                action = ACTION_IMPORT
+            elif policy == 'tail' and status == STATUS_UNCHANGED:
+                # 內容未變更，沒有新增的資料列
+                action = ACTION_SKIP
+            elif policy is not None:
+                action = policy
+            else:
+                action = 'upsert' if status == STATUS_CHANGED else ACTION_SKIP
+            plan.append((filepath, action))
+        return plan
+    
+    def run_plan(self, plan):
+        """依計畫導入檔案，全部成功時回傳 True"""
+        self.run = ImportRun('add_new_data')
+        ok = True
+        try:
+            for filepath, action in plan:
+                if action == ACTION_SKIP:
+                    print(f"\n⊘ 跳過 {os.path.basename(filepath)}")
+                    continue
+                if action == ACTION_IMPORT:
+                    # 新檔案依 config.ini 的 duplicate_mode 寫入
+                    mode = self.import_config.get('duplicate_mode', DEFAULT_MODE)
+                else:
+                    mode = action
+                    print(f"\n↻ {os.path.basename(filepath)}: {ACTION_LABELS[action]}")
+                ok = self.import_file(filepath, mode=mode) and ok
+        finally:
+            if self.run.files:
+                self.run.report(self.connection)
+            self.run = None
+        return ok
+    
+    def acquire_lock(self, name=IMPORT_LOCK):
+        """取得 MySQL 命名鎖（不等待），其他導入程式正在執行時回傳 False"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (name,))
+            return cursor.fetchone()[0] == 1
+        finally:
+            cursor.close()
+    
+    def release_lock(self, name=IMPORT_LOCK):
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+            cursor.fetchone()
+        finally:
+            cursor.close()
+    
     def verify_data(self):
         """驗證導入的資料"""
         if not self.connection:
             return
         
         try:
-            cursor = self.connection.cursor()
-            
-            query = """
-            SELECT year, month, COUNT(*) as record_count,
-                   MIN(record_time) as first_record,
-                   MAX(record_time) as last_record,
-                   COUNT(channel5_device_temp) as ch5_count
-            FROM gl860_weather_data
-            GROUP BY year, month
-            ORDER BY year, month
-            """
-            
-            cursor.execute(query)
-            results = cursor.fetchall()
+            # 各月份的彙總（兩次導入之間由結果快取回答，只有導入過的月份會重新查詢）
+            summaries = month_summaries(self.connection)
             
             print("\n" + "="*80)
             print("資料驗證")
@@ -346,24 +614,97 @@ class GL860IncrementalImporter:
             print(f"{'年份':<6} {'月份':<6} {'記錄數':<10} {'CH5記錄':<10} {'第一筆':<20} {'最後一筆':<20}")
             print("-" * 80)
             
-            for row in results:
-                year, month, count, first, last, ch5_count = row
-                print(f"{year:<6} {month:<6} {count:<10} {ch5_count:<10} {first.strftime('%Y-%m-%d %H:%M'):<20} {last.strftime('%Y-%m-%d %H:%M'):<20}")
-            
-            cursor.close()
+            for row in summaries:
+                first, last = row['first_time'], row['last_time']
+                print(f"{row['year']:<6} {row['month']:<6} {row['total']:<10} {row['ch5_count']:<10} {first.strftime('%Y-%m-%d %H:%M'):<20} {last.strftime('%Y-%m-%d %H:%M'):<20}")
             
         except Error as e:
             print(f"✗ 驗證資料錯誤: {e}")
     
     def close(self):
-        """關閉資料庫連接"""
-        if self.connection and self.connection.is_connected():
+        """關閉資料庫連接（歸還連線池；外部傳入的連線由呼叫端負責關閉）"""
+        if self.owns_connection and self.connection and self.connection.is_connected():
             self.connection.close()
             print("\n✓ 資料庫連接已關閉")
 
 
+def build_parser():
+    """命令列參數"""
+    parser = argparse.ArgumentParser(description='GL860 天氣資料增量導入（不加參數時以選單操作）')
+    parser.add_argument('--mode', choices=CLI_MODES,
+                        help='new: 新檔案和已變更的檔案，all: 全部檔案，files: --files 指定的檔案')
+    parser.add_argument('--files', nargs='+', metavar='FILE', help='--mode files 時要導入的檔案')
+    parser.add_argument('--folder', default='GL860', help='GL860 檔案所在資料夾')
+    parser.add_argument('--reimport-policy', choices=REIMPORT_POLICIES,
+                        help='月份已有資料時的處理方式（預設：已變更的檔案 upsert，其他跳過；'
+                             'tail 只導入後面新增的資料列）')
+    parser.add_argument('--yes', '-y', action='store_true', help='不詢問，直接執行會覆蓋或刪除資料的動作')
+    parser.add_argument('--dry-run', action='store_true', help='只列出每個檔案的處理方式，不寫入資料')
+    return parser
+
+
+def run_unattended(importer, args):
+    """依命令列參數導入（不需要任何輸入），成功時回傳 True"""
+    if args.mode == 'files':
+        files = [f for f in args.files if os.path.exists(f)]
+        for missing in sorted(set(args.files) - set(files)):
+            print(f"✗ 找不到檔案: {missing}")
+        if len(files) != len(args.files):
+            return False
+    else:
+        files = importer.find_files(args.folder)
+    
+    if not files:
+        print(f"在 {args.folder} 中沒有需要導入的檔案")
+        return True
+    
+    statuses = {filepath: importer.file_status(filepath) for filepath in files}
+    importer.print_file_list(files, statuses)
+    plan = importer.plan_imports(files, statuses, args.mode, args.reimport_policy)
+    
+    print("\n處理方式：")
+    if not plan:
+        print("沒有新檔案或已變更的檔案需要導入")
+        return True
+    for filepath, action in plan:
+        print(f"  {os.path.basename(filepath)}: {ACTION_LABELS[action]}")
+    
+    if args.dry_run:
+        print("\n--dry-run：沒有寫入任何資料")
+        return True
+    
+    # 會覆蓋或刪除已存在的資料時需要確認；沒有終端機（排程執行）時必須加上 --yes
+    overwrites = [f for f, action in plan if action in ('replace', 'upsert')]
+    if overwrites and not args.yes:
+        if not sys.stdin.isatty():
+            print("✗ 有已存在的月份需要重新導入，排程執行時請加上 --yes")
+            return False
+        response = input(f"\n將重新導入 {len(overwrites)} 個已有資料的檔案，是否繼續？(y/n): ").strip().lower()
+        if response != 'y':
+            print("已取消")
+            return True
+    
+    # tail 無法繼續時會改為 upsert 重新導入整個檔案，沒有 --yes 時跳過該檔案
+    importer.tail_fallback = args.yes
+    
+    if not importer.acquire_lock():
+        print("⊘ 另一個導入程式正在執行，本次略過")
+        return True
+    try:
+        return importer.run_plan(plan)
+    finally:
+        importer.release_lock()
+
+
 def main():
-    """主程式"""
+    """主程式，回傳程式結束代碼（0 為成功）"""
+    parser = build_parser()
+    args = parser.parse_args()
+    if args.mode is None and (args.files or args.reimport_policy or args.yes or args.dry_run):
+        parser.error("--files / --reimport-policy / --yes / --dry-run 需要搭配 --mode")
+    if args.mode == 'files' and not args.files:
+        parser.error("--mode files 需要以 --files 指定檔案")
+    
     print("=" * 80)
     print("GL860 天氣資料增量導入系統")
     print("=" * 80)
@@ -373,14 +714,19 @@ def main():
     
     if not importer.create_connection():
         print("✗ 無法連接到資料庫，程式結束")
-        return
+        return 1
     
     try:
-        importer.import_all_new_files('GL860')
-        importer.verify_data()
+        if not importer.ensure_table():
+            return 1
+        if args.mode is None:
+            importer.import_all_new_files(args.folder)
+            importer.verify_data()
+            return 0
+        return 0 if run_unattended(importer, args) else 1
     finally:
         importer.close()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+可合併的統計狀態
+每個時段、每個通道存放 筆數、總和、平方和、最小值、最大值，
+任意多個時段合併後仍可精確算出平均值和變異數，不需要重新讀取原始資料：
+
+    january = AggregateState.from_values([20.5, 21.0, 22.25])
+    february = AggregateState.from_values([18.0, 19.5])
+    combine([january, february]).mean()
+
+資料庫中的數值為 DECIMAL，總和與平方和以 Decimal 精確計算
+"""
+from decimal import Decimal
+
+# 彙總資料表中每個通道的欄位後綴，以及合併時使用的 SQL 函式
+STATE_FIELDS = ('count', 'sum', 'sumsq', 'min', 'max')
+MERGE_FUNCTIONS = {
+    'count': 'SUM',
+    'sum': 'SUM',
+    'sumsq': 'SUM',
+    'min': 'MIN',
+    'max': 'MAX',
+}
+
+
+def _to_decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+class AggregateState:
+    """單一通道在一個時段的統計狀態"""
+
+    __slots__ = ('count', 'total', 'total_sq', 'minimum', 'maximum')
+
+    def __init__(self, count=0, total=0, total_sq=0, minimum=None, maximum=None):
+        self.count = int(count or 0)
+        self.total = _to_decimal(total or 0)
+        self.total_sq = _to_decimal(total_sq or 0)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @classmethod
+    def from_values(cls, values):
+        """由原始數值建立（None 會被略過）"""
+        state = cls()
+        for value in values:
+            if value is None:
+                continue
+            value = _to_decimal(value)
+            state.count += 1
+            state.total += value
+            state.total_sq += value * value
+            state.minimum = value if state.minimum is None else min(state.minimum, value)
+            state.maximum = value if state.maximum is None else max(state.maximum, value)
+        return state
+
+    @classmethod
+    def from_row(cls, row, name):
+        """由彙總資料表的一列建立，row 為 dict，欄位為 <name>_count, <name>_sum ..."""
+        return cls(
+            row[f'{name}_count'],
+            row[f'{name}_sum'],
+            row[f'{name}_sumsq'],
+            row[f'{name}_min'],
+            row[f'{name}_max'],
+        )
+
+    def merge(self, other):
+        """合併兩個狀態，回傳新的狀態"""
+        minimums = [v for v in (self.minimum, other.minimum) if v is not None]
+        maximums = [v for v in (self.maximum, other.maximum) if v is not None]
+        return AggregateState(
+            self.count + other.count,
+            self.total + other.total,
+            self.total_sq + other.total_sq,
+            min(minimums) if minimums else None,
+            max(maximums) if maximums else None,
+        )
+
+    __add__ = merge
+
+    def mean(self):
+        """平均值，沒有資料時為 None"""
+        if self.count == 0:
+            return None
+        return self.total / self.count
+
+    def variance(self, ddof=0):
+        """變異數（ddof=0 為母體變異數，ddof=1 為樣本變異數），資料不足時為 None"""
+        if self.count - ddof <= 0:
+            return None
+        # 以精確的 Decimal 計算，平方和與總和相減不會有浮點誤差
+        return max(self.total_sq - self.total * self.total / self.count, Decimal(0)) / (self.count - ddof)
+
+    def stddev(self, ddof=0):
+        """標準差，資料不足時為 None"""
+        variance = self.variance(ddof)
+        return None if variance is None else variance.sqrt()
+
+    def __repr__(self):
+        return (f"AggregateState(count={self.count}, sum={self.total}, sumsq={self.total_sq}, "
+                f"min={self.minimum}, max={self.maximum})")
+
+
+def combine(states):
+    """合併多個狀態"""
+    result = AggregateState()
+    for state in states:
+        result = result.merge(state)
+    return result
+
+
+def merge_columns(name):
+    """以 SQL 合併彙總資料表中一個通道的狀態欄位"""
+    return [f"{MERGE_FUNCTIONS[field]}({name}_{field})" for field in STATE_FIELDS]
+
+
+def raw_columns(column):
+    """以 SQL 由原始資料欄位計算一個通道的狀態（順序同 STATE_FIELDS）"""
+    return [f"COUNT({column})", f"SUM({column})", f"SUM({column} * {column})",
+            f"MIN({column})", f"MAX({column})"]
@@ -0,0 +1,101 @@
+"""
+寫入引擎效能比較
+以 GL860 資料夾中的檔案，分別用 executemany 和 LOAD DATA LOCAL INFILE 寫入暫存資料表並計時
+"""
+import argparse
+import glob
+import os
+import time
+
+import mysql.connector
+from mysql.connector import Error
+
+from db import connection_args
+from gl860_loader import LOAD_ENGINES
+from gl860_to_mysql import GL860DataImporter
+
+BENCH_TABLE = 'gl860_weather_data_bench'
+
+
+def parse_files(importer, folder_path):
+    """解析資料夾中所有檔案，回傳批次列表"""
+    pattern = os.path.join(folder_path, 'GL860 RAWDATA_*.xlsx')
+    files = sorted(f for f in glob.glob(pattern) if not os.path.basename(f).startswith('~$'))
+    batches = []
+    for filepath in files:
+        batch = importer.parse_excel_file(filepath)
+        if batch:
+            batches.append(batch)
+    return batches
+
+
+def run_engine(connection, engine_name, batches, repeat):
+    """以指定引擎寫入所有批次，回傳每次的耗時（秒）"""
+    load = LOAD_ENGINES[engine_name]
+    cursor = connection.cursor()
+    timings = []
+    for _ in range(repeat):
+        cursor.execute(f"TRUNCATE TABLE {BENCH_TABLE}")
+        start = time.perf_counter()
+        for batch in batches:
+            load(connection, batch, table=BENCH_TABLE)
+            connection.commit()
+        timings.append(time.perf_counter() - start)
+    cursor.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比較 executemany 與 LOAD DATA 的寫入速度')
+    parser.add_argument('--folder', default='GL860', help='GL860 檔案所在資料夾')
+    parser.add_argument('--repeat', type=int, default=3, help='每種引擎重複執行次數')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("寫入引擎效能比較")
+    print("=" * 70)
+
+    # 連線設定讀取 config.ini；兩種引擎都要測試，所以一律開啟 allow_local_infile
+    try:
+        connection = mysql.connector.connect(**{**connection_args(), 'allow_local_infile': True})
+    except Error as e:
+        print(f"✗ 連接失敗: {e}")
+        return
+    importer = GL860DataImporter(connection=connection)
+    if not importer.create_table():
+        print("無法連接到資料庫，程式結束")
+        return
+
+    batches = parse_files(importer, args.folder)
+    total_rows = sum(len(b) for b in batches)
+    if total_rows == 0:
+        print("沒有可用的資料")
+        connection.close()
+        return
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        cursor.execute(f"CREATE TABLE {BENCH_TABLE} LIKE gl860_weather_data")
+
+        print(f"\n共 {len(batches)} 個檔案，{total_rows} 筆記錄，每種引擎執行 {args.repeat} 次\n")
+        print(f"{'引擎':<14}{'最佳(秒)':<12}{'平均(秒)':<12}{'筆/秒':<12}")
+        print("-" * 50)
+        for engine_name in LOAD_ENGINES:
+            try:
+                timings = run_engine(connection, engine_name, batches, args.repeat)
+            except Error as e:
+                print(f"{engine_name:<14}執行失敗: {e}")
+                connection.rollback()
+                continue
+            best = min(timings)
+            avg = sum(timings) / len(timings)
+            print(f"{engine_name:<14}{best:<12.3f}{avg:<12.3f}{total_rows / best:<12.0f}")
+    finally:
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        cursor.close()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
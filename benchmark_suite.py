@@ -0,0 +1,267 @@
+"""
+大量資料效能測試
+以 synthetic_gl860.py 產生的模擬匯出檔，測量解析速度、寫入速度、統計更新時間和記憶體峰值，
+結果存成 JSON，與上一次的結果比較即可看出效能是否退步：
+
+    python benchmark_suite.py --months 12 --loggers 2
+    python benchmark_suite.py --folder synthetic    # 使用已產生的檔案
+
+測試寫入獨立的資料庫（<database>_bench），不影響正式資料
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import time
+from datetime import datetime, timedelta
+
+import mysql.connector
+from mysql.connector import Error
+
+from create_statistics import populate_daily_statistics, update_statistics
+from db import connection_args, mysql_config
+from dirty_dates import DirtyDates
+from gl860_to_mysql import GL860DataImporter
+from import_metrics import peak_rss_mb
+from partitions import prepare_month
+from synthetic_gl860 import DEFAULT_INTERVAL, DEFAULT_OUTPUT, generate, parse_month
+
+RESULTS_FOLDER = 'benchmark_results'
+BENCH_DATABASE_SUFFIX = '_bench'
+
+
+def find_workbooks(folder):
+    """資料夾中每個記錄器子資料夾的匯出檔 -> {記錄器代號: [檔案路徑, ...]}"""
+    files = {}
+    for logger_folder in sorted(glob.glob(os.path.join(folder, '*'))):
+        if not os.path.isdir(logger_folder):
+            continue
+        paths = sorted(
+            f for f in glob.glob(os.path.join(logger_folder, 'GL860 RAWDATA_*.xlsx'))
+            if not os.path.basename(f).startswith('~$')
+        )
+        if paths:
+            files[os.path.basename(logger_folder)] = paths
+    return files
+
+
+def connect_bench_database():
+    """連接到測試用的資料庫（不存在時建立）"""
+    database = mysql_config()['database'] + BENCH_DATABASE_SUFFIX
+    # --load-engine load_data 時需要 LOAD DATA LOCAL INFILE，一律開啟
+    connection = mysql.connector.connect(
+        **{**connection_args(with_database=False), 'allow_local_infile': True})
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database}")
+    cursor.execute(f"USE {database}")
+    cursor.close()
+    return connection, database
+
+
+def quiet():
+    """測試期間隱藏導入程式的逐檔輸出"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def timed(function, *args, **kwargs):
+    """執行函式，回傳 (結果, 耗時秒數)"""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def rate(rows, seconds):
+    return round(rows / seconds) if seconds else None
+
+
+def run_benchmark(connection, files, load_engine=None, batch_size=None):
+    """依序解析並寫入所有檔案，再測量統計更新時間，回傳結果 dict"""
+    parse_seconds = 0.0
+    insert_seconds = 0.0
+    parsed_rows = 0
+    inserted_rows = 0
+    per_file = []
+
+    cursor = connection.cursor()
+    for table in ('gl860_weather_data', 'gl860_dirty_dates', 'gl860_daily_statistics'):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.close()
+
+    last_date = None
+    for logger_id, paths in files.items():
+        importer = GL860DataImporter(connection=connection, load_engine=load_engine,
+                                     batch_size=batch_size, logger_id=logger_id)
+        with quiet():
+            importer.create_table()
+        for filepath in paths:
+            # 一次只處理一個檔案，記憶體峰值與單一檔案的大小有關
+            with quiet():
+                batch, parse_time = timed(importer.parse_excel_file, filepath)
+            if batch is None:
+                print(f"✗ 無法解析 {filepath}")
+                continue
+            prepare_month(connection, importer.table, batch.year, batch.month)
+            with quiet():
+                loader, insert_time = timed(importer.insert_batches, [batch])
+            if loader is None:
+                print(f"✗ 無法寫入 {filepath}")
+                continue
+
+            parse_seconds += parse_time
+            insert_seconds += insert_time
+            parsed_rows += len(batch)
+            inserted_rows += loader.inserted
+            last_date = max(last_date, max(batch.dates())) if last_date else max(batch.dates())
+            per_file.append({
+                'logger_id': logger_id,
+                'file': os.path.basename(filepath),
+                'rows': len(batch),
+                'bytes': os.path.getsize(filepath),
+                'parse_seconds': round(parse_time, 3),
+                'insert_seconds': round(insert_time, 3),
+            })
+            print(f"  {logger_id} {os.path.basename(filepath)}: {len(batch)} 筆，"
+                  f"解析 {parse_time:.2f} 秒，寫入 {insert_time:.2f} 秒")
+            del batch
+
+    # 統計：全部重新計算，以及只有一天有新資料時的增量更新
+    with quiet():
+        _, full_stats_time = timed(update_statistics, connection, True)
+    incremental_stats_time = None
+    if last_date is not None:
+        DirtyDates(connection).mark([last_date - timedelta(days=1)])
+        connection.commit()
+        with quiet():
+            _, incremental_stats_time = timed(populate_daily_statistics, connection)
+
+    return {
+        'files': len(per_file),
+        'rows': parsed_rows,
+        'inserted_rows': inserted_rows,
+        'parse_seconds': round(parse_seconds, 3),
+        'parse_rows_per_second': rate(parsed_rows, parse_seconds),
+        'insert_seconds': round(insert_seconds, 3),
+        'insert_rows_per_second': rate(inserted_rows, insert_seconds),
+        'stats_full_seconds': round(full_stats_time, 3),
+        'stats_incremental_seconds': (
+            round(incremental_stats_time, 3) if incremental_stats_time is not None else None
+        ),
+        'peak_rss_mb': peak_rss_mb(),
+        'per_file': per_file,
+    }
+
+
+def latest_result(folder=RESULTS_FOLDER):
+    """上一次的測試結果，沒有時為 None"""
+    paths = sorted(glob.glob(os.path.join(folder, '*.json')))
+    if not paths:
+        return None
+    with open(paths[-1], encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_result(result, folder=RESULTS_FOLDER):
+    """將結果存成 benchmark_results/YYYYmmdd-HHMMSS.json，回傳檔案路徑"""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return path
+
+
+COMPARED_METRICS = (
+    ('parse_rows_per_second', '解析 筆/秒', True),
+    ('insert_rows_per_second', '寫入 筆/秒', True),
+    ('stats_full_seconds', '統計（全部）秒', False),
+    ('stats_incremental_seconds', '統計（增量）秒', False),
+    ('peak_rss_mb', '記憶體峰值 MB', False),
+)
+
+
+def print_comparison(result, previous):
+    """顯示本次結果，有上一次的結果時一併顯示變化（較差時標示 ✗）"""
+    print(f"\n{'項目':<18}{'本次':>14}{'上一次':>14}{'變化':>10}")
+    print("-" * 58)
+    for key, label, higher_is_better in COMPARED_METRICS:
+        value = result['metrics'].get(key)
+        old = previous['metrics'].get(key) if previous else None
+        change = ''
+        if value is not None and old:
+            ratio = (value - old) / old
+            worse = ratio < 0 if higher_is_better else ratio > 0
+            change = f"{ratio:+.0%}" + (' ✗' if worse and abs(ratio) >= 0.1 else '')
+        print(f"{label:<18}{value if value is not None else '-':>14}"
+              f"{old if old is not None else '-':>14}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='大量資料的導入和統計效能測試')
+    parser.add_argument('--folder', default=DEFAULT_OUTPUT, help='模擬匯出檔所在資料夾')
+    parser.add_argument('--generate', action='store_true', help='先重新產生模擬匯出檔')
+    parser.add_argument('--start', type=parse_month, default=(2023, 1), metavar='YYYY-MM', help='第一個月份')
+    parser.add_argument('--months', type=int, default=3, help='月份數')
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL, help='記錄間隔（分鐘）')
+    parser.add_argument('--loggers', type=int, default=1, help='記錄器數量')
+    parser.add_argument('--load-engine', help='寫入引擎（預設使用 config.ini 的設定）')
+    parser.add_argument('--batch-size', type=int, help='每批筆數（預設使用 config.ini 的設定）')
+    parser.add_argument('--keep', action='store_true', help='保留測試資料庫')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("大量資料效能測試")
+    print("=" * 70)
+
+    files = find_workbooks(args.folder)
+    if args.generate or not files:
+        print(f"\n產生模擬匯出檔到 {args.folder}")
+        files = generate(args.folder, args.start, args.months, args.interval, args.loggers)
+
+    try:
+        connection, database = connect_bench_database()
+    except Error as e:
+        print(f"✗ 連接失敗: {e}")
+        return
+
+    total_files = sum(len(paths) for paths in files.values())
+    print(f"\n測試資料庫 {database}，{len(files)} 個記錄器，{total_files} 個檔案\n")
+    try:
+        metrics = run_benchmark(connection, files, args.load_engine, args.batch_size)
+    except Error as e:
+        print(f"✗ 測試失敗: {e}")
+        return
+    finally:
+        if not args.keep:
+            cursor = connection.cursor()
+            cursor.execute(f"DROP DATABASE IF EXISTS {database}")
+            cursor.close()
+        connection.close()
+
+    per_file = metrics.pop('per_file')
+    # 未指定的項目記錄 config.ini 的實際設定
+    settings = GL860DataImporter(load_engine=args.load_engine, batch_size=args.batch_size)
+    result = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'settings': {
+            'folder': args.folder,
+            'loggers': len(files),
+            'load_engine': settings.load_engine,
+            'batch_size': settings.batch_size,
+        },
+        'metrics': metrics,
+        'per_file': per_file,
+    }
+    previous = latest_result()
+    path = save_result(result)
+    print_comparison(result, previous)
+    print(f"\n結果已寫入 {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+C0AI10 測站資料解析工具
+COAI 資料夾中的 C0AI10-YYYY-MM.xlsx 是氣象站的每日觀測資料：
+
+  觀測時間(day), 氣溫(℃), 相對溼度(%) ...   <- 中文欄位名稱
+  ObsTime, Temperature, RH ...                <- 欄位代碼（作為欄位名稱）
+  2025-07-01, 31.7, 70 ...                    <- 每天一筆
+
+每個月份的欄位不一定相同（例如 2025-09 有測站氣壓和最高氣溫、沒有風向），依欄位代碼對應到資料表欄位；
+ObsTime 可能是日期，也可能只有當月的第幾天。
+與 GL860 共用串流讀取（GL860SheetReader）和寫入引擎（gl860_loader.py）
+"""
+import os
+import re
+from itertools import islice
+
+import pandas as pd
+
+from gl860_parser import GL860SheetReader
+from import_metrics import NO_METRICS
+
+DEFAULT_STATION_ID = 'C0AI10'
+STATION_TABLE = 'c0ai10_daily_data'
+STATION_MANIFEST_TABLE = 'c0ai10_import_manifest'
+FILE_PATTERN = 'C0AI10-*.xlsx'
+
+# 欄位代碼列的第一欄，同時是觀測日期欄位
+DATE_CODE = 'ObsTime'
+
+# 欄位代碼對應的資料表欄位
+MEASUREMENT_FIELDS = {
+    'StnPres': 'station_pressure',
+    'Temperature': 'temperature',
+    'T Max': 'temperature_max',
+    'T Min': 'temperature_min',
+    'RH': 'humidity',
+    'RHMin': 'humidity_min',
+    'WS': 'wind_speed',
+    'WD': 'wind_direction',
+    'WSGust': 'wind_gust',
+    'Precp': 'precipitation',
+    'SunShine': 'sunshine_hours',
+    'GloblRad': 'global_radiation',
+}
+
+# c0ai10_daily_data 的寫入欄位順序
+STATION_FIELDS = ('station_id', 'year', 'month', 'obs_date') + tuple(MEASUREMENT_FIELDS.values())
+
+# 觀測資料中的符號：/ 無資料、X 儀器故障等都視為空值；降水量 T 為微量（少於 0.1 mm），記為 0
+TRACE = 'T'
+TRACE_FIELDS = ('precipitation',)
+
+FILENAME_PATTERN = re.compile(r'^(?P<station>[A-Za-z0-9]+)-(?P<year>\d{4})-(?P<month>\d{1,2})$')
+
+
+def parse_station_filename(filename):
+    """從檔名提取測站代號、年份和月份
+    例如: C0AI10-2025-07.xlsx -> ('C0AI10', 2025, 7)
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    match = FILENAME_PATTERN.match(name)
+    if not match:
+        return None, None, None
+    return match['station'], int(match['year']), int(match['month'])
+
+
+def open_station_sheet(filepath, metrics=None):
+    """以串流方式讀取測站資料（ObsTime 列為欄位名稱）"""
+    return GL860SheetReader(filepath, marker=DATE_CODE, metrics=metrics, header_offset=0)
+
+
+def map_station_columns(columns):
+    """根據欄位代碼識別觀測日期和各觀測項目
+
+    回傳 (date_col, field_cols, unknown)，field_cols 為 {資料表欄位: 欄位名稱}，
+    unknown 為沒有對應資料表欄位的欄位代碼
+    """
+    date_col = None
+    field_cols = {}
+    unknown = []
+    for col in columns:
+        code = str(col).strip()
+        if code == DATE_CODE:
+            date_col = col
+        elif code in MEASUREMENT_FIELDS:
+            field_cols[MEASUREMENT_FIELDS[code]] = col
+        elif not code.startswith('Unnamed'):
+            unknown.append(code)
+    return date_col, field_cols, unknown
+
+
+class StationRecordBatch:
+    """欄式測站資料批次，介面與 GL860RecordBatch 相同，可直接交給 BatchLoader 寫入"""
+
+    fields = STATION_FIELDS
+    key_fields = ('station_id', 'obs_date')
+
+    def __init__(self, station_id, year, month, obs_date, values):
+        self.station_id = station_id
+        self.year = year
+        self.month = month
+        self.obs_date = obs_date
+        self.values = values
+
+    def __len__(self):
+        return len(self.obs_date)
+
+    def columns(self):
+        """依 STATION_FIELDS 順序回傳每個欄位的值 list"""
+        n = len(self.obs_date)
+        return [[self.station_id] * n, [self.year] * n, [self.month] * n, self.obs_date] + [
+            self.values[field] for field in MEASUREMENT_FIELDS.values()
+        ]
+
+    def rows(self):
+        """依 STATION_FIELDS 順序產生每一筆資料的 tuple"""
+        return zip(*self.columns())
+
+    def dates(self):
+        """批次中的觀測日期"""
+        return set(self.obs_date)
+
+    def to_records(self):
+        """轉換成 dict 列表（檢視或除錯用）"""
+        return [dict(zip(STATION_FIELDS, row)) for row in self.rows()]
+
+
+def _obs_dates(raw, year, month):
+    """觀測日期欄位：日期（時間）或當月的第幾天，無法轉換時為 NaT"""
+    if pd.api.types.is_datetime64_any_dtype(raw):
+        # 整欄都是日期時間時 pandas 已轉換成 datetime64（不能再當成數字）
+        return raw
+    day = pd.to_numeric(raw, errors='coerce')
+    from_day = pd.to_datetime(
+        pd.DataFrame({'year': year, 'month': month, 'day': day}), errors='coerce'
+    )
+    parsed = pd.to_datetime(raw.where(day.isna()), errors='coerce', format='mixed')
+    return parsed.where(day.isna(), from_day)
+
+
+def convert_station_rows(rows, columns, date_col, field_cols, year, month,
+                         station_id=DEFAULT_STATION_ID):
+    """以欄為單位轉換測站資料列
+
+    - 沒有觀測日期的列直接略過
+    - 觀測日期無法轉換或不在該月份的列（例如月底的統計列）視為錯誤列並略過
+    - 數值以外的符號（/、X 等）轉為 None，降水量 T 轉為 0
+
+    回傳 (batch, invalid_count)
+    """
+    df = pd.DataFrame.from_records(iter(rows), columns=columns)
+
+    raw_date = df[date_col]
+    has_date = raw_date.notna()
+    obs = _obs_dates(raw_date, year, month)
+    keep = obs.notna() & (obs.dt.year == year) & (obs.dt.month == month)
+    invalid = has_date & ~keep
+
+    values = {}
+    for field in MEASUREMENT_FIELDS.values():
+        if field not in field_cols:
+            values[field] = [None] * int(keep.sum())
+            continue
+        raw = df[field_cols[field]][keep]
+        numeric = pd.to_numeric(raw, errors='coerce').astype('float64')
+        if field in TRACE_FIELDS:
+            numeric = numeric.mask(raw.astype(str).str.strip() == TRACE, 0.0)
+        values[field] = numeric.astype(object).where(numeric.notna(), None).tolist()
+
+    batch = StationRecordBatch(
+        station_id, year, month, [t.date() for t in obs[keep]], values
+    )
+    return batch, int(invalid.sum())
+
+
+def iter_station_batches(reader, date_col, field_cols, year, month, chunk_size=None,
+                         station_id=DEFAULT_STATION_ID, metrics=None):
+    """將資料列分段轉換成批次，每次產生 (batch, invalid_count)
+
+    與 gl860_parser.iter_record_batches 相同：chunk_size 為 None 或 0 時整個檔案為一批
+    """
+    metrics = metrics or NO_METRICS
+    rows = iter(reader)
+    while True:
+        with metrics.phase('read'):
+            chunk = list(islice(rows, chunk_size) if chunk_size else rows)
+        if chunk_size and not chunk:
+            break
+        with metrics.phase('conversion'):
+            batch, invalid_count = convert_station_rows(
+                chunk, reader.columns, date_col, field_cols, year, month, station_id)
+        metrics.count('rows', len(batch))
+        metrics.count('invalid_rows', invalid_count)
+        yield batch, invalid_count
+        if not chunk_size:
+            break
@@ -0,0 +1,316 @@
+"""
+C0AI10 測站資料導入 MySQL
+導入 COAI 資料夾中的 C0AI10-YYYY-MM.xlsx（氣象站每日觀測資料）到 c0ai10_daily_data，
+可以與 gl860_weather_data / gl860_daily_statistics 以日期對照：
+
+    python c0ai10_to_mysql.py                 # 導入新檔案和已變更的檔案
+    python c0ai10_to_mysql.py --all           # 全部重新導入（覆蓋同一天的記錄）
+    python c0ai10_to_mysql.py --dry-run       # 只列出每個檔案的處理方式
+
+與 GL860 使用相同的串流讀取和寫入引擎（config.ini [Import] 的 load_engine / batch_size），
+導入成功的檔案登記在 c0ai10_import_manifest，未變更的檔案不會重新解析
+"""
+import argparse
+import glob
+import os
+import sys
+
+from mysql.connector import Error
+
+from c0ai10_parser import (
+    DEFAULT_STATION_ID, FILE_PATTERN, STATION_MANIFEST_TABLE, STATION_TABLE, iter_station_batches,
+    map_station_columns, open_station_sheet, parse_station_filename
+)
+from db import bulk_load_session, get_connection, import_config, mysql_config
+from gl860_loader import DEFAULT_BATCH_SIZE, DEFAULT_COMMIT_INTERVAL, DEFAULT_ENGINE, BatchLoader
+from gl860_parser import PARSE_ERRORS
+from import_manifest import (
+    STATUS_CHANGED, STATUS_NEW, STATUS_UNCHANGED, ImportManifest, file_fingerprint
+)
+from import_metrics import NO_METRICS, ImportRun
+
+DEFAULT_FOLDER = 'COAI'
+
+STATUS_LABELS = {
+    STATUS_NEW: "○ 新檔案",
+    STATUS_CHANGED: "↻ 已變更",
+    STATUS_UNCHANGED: "✓ 未變更",
+}
+
+
+def station_table_ddl(table=STATION_TABLE):
+    """測站資料表的 CREATE TABLE 語法（每個測站每天一筆）"""
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        station_id VARCHAR(16) NOT NULL DEFAULT '{DEFAULT_STATION_ID}',
+        year INT NOT NULL,
+        month INT NOT NULL,
+        obs_date DATE NOT NULL,
+        station_pressure DECIMAL(6, 1),
+        temperature DECIMAL(4, 1),
+        temperature_max DECIMAL(4, 1),
+        temperature_min DECIMAL(4, 1),
+        humidity DECIMAL(4, 1),
+        humidity_min DECIMAL(4, 1),
+        wind_speed DECIMAL(4, 1),
+        wind_direction DECIMAL(4, 0),
+        wind_gust DECIMAL(4, 1),
+        precipitation DECIMAL(6, 1),
+        sunshine_hours DECIMAL(4, 1),
+        global_radiation DECIMAL(6, 2),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY uk_station_obs_date (station_id, obs_date),
+        INDEX idx_obs_date (obs_date)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """
+
+
+class C0AI10Importer:
+    def __init__(self, connection=None, load_engine=None, batch_size=None,
+                 table=STATION_TABLE, manifest_table=STATION_MANIFEST_TABLE):
+        """初始化導入設定，未指定的項目使用 config.ini [Import] 的設定
+        connection: 可傳入現有的連線，否則由 create_connection 從連線池取得
+        """
+        settings = import_config()
+        self.database = mysql_config()['database']
+        self.load_engine = load_engine or settings.get('load_engine', DEFAULT_ENGINE)
+        self.batch_size = batch_size or settings.getint('batch_size', fallback=DEFAULT_BATCH_SIZE)
+        self.commit_interval = settings.getint('commit_interval', fallback=DEFAULT_COMMIT_INTERVAL)
+        self.table = table
+        self.connection = connection
+        self.owns_connection = connection is None
+        self.manifest = ImportManifest(connection, manifest_table) if connection else None
+        self.manifest_table = manifest_table
+        # 本次導入的計時記錄（ImportRun），結束後寫入 import_runs
+        self.run = None
+
+    def create_connection(self):
+        """從共用連線池取得 MySQL 連接（資料庫不存在時會自動創建）"""
+        try:
+            self.connection = get_connection(create_database=True)
+            self.owns_connection = True
+            if self.connection.is_connected():
+                print(f"✓ 成功連接到 MySQL 資料庫: {self.database}")
+                self.manifest = ImportManifest(self.connection, self.manifest_table)
+                return True
+        except Error as e:
+            print(f"✗ 連接錯誤: {e}")
+            return False
+
+    def ensure_table(self):
+        """建立測站資料表和導入清單（若不存在）"""
+        try:
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute(station_table_ddl(self.table))
+                self.connection.commit()
+            finally:
+                cursor.close()
+            self.manifest.ensure_table()
+            return True
+        except Error as e:
+            print(f"✗ 建立資料表錯誤: {e}")
+            return False
+
+    def find_files(self, folder_path=DEFAULT_FOLDER):
+        """資料夾中的所有 C0AI10 檔案（依檔名排序，排除暫存檔）"""
+        files = glob.glob(os.path.join(folder_path, FILE_PATTERN))
+        return sorted(f for f in files if not os.path.basename(f).startswith('~$'))
+
+    def iter_batches(self, filepath, metrics=None):
+        """逐批解析測站檔案，每批最多 batch_size 筆"""
+        station_id, year, month = parse_station_filename(filepath)
+        if not year:
+            print(f"✗ 無法從檔名提取測站和年月: {filepath}")
+            return
+
+        print(f"\n處理檔案: {os.path.basename(filepath)}（{station_id} {year}年{month}月）")
+
+        metrics = metrics or NO_METRICS
+        with open_station_sheet(filepath, metrics=metrics) as reader:
+            if reader.data_row is None:
+                print("✗ 找不到欄位代碼列（ObsTime）")
+                return
+
+            with metrics.phase('column_mapping'):
+                date_col, field_cols, unknown = map_station_columns(reader.columns)
+            print(f"觀測項目: {', '.join(field_cols)}")
+            if unknown:
+                print(f"  (略過沒有對應欄位的項目: {', '.join(unknown)})")
+
+            total = 0
+            invalid_total = 0
+            for batch, invalid_count in iter_station_batches(
+                reader, date_col, field_cols, year, month, self.batch_size, station_id, metrics
+            ):
+                total += len(batch)
+                invalid_total += invalid_count
+                yield batch
+
+        if invalid_total:
+            print(f"✗ 略過 {invalid_total} 筆日期無法轉換的資料列")
+        print(f"✓ 成功解析 {total} 筆記錄")
+
+    def insert_batches(self, batches, mode, metrics=None):
+        """逐批寫入，成功時回傳 BatchLoader，失敗時回傳 None
+        mode: ignore（新檔案）或 upsert（已變更的檔案，覆蓋同一天的記錄）
+        """
+        loader = BatchLoader(
+            self.connection,
+            engine=self.load_engine,
+            table=self.table,
+            mode=mode,
+            commit_interval=self.commit_interval,
+            metrics=metrics
+        )
+        try:
+            with bulk_load_session(self.connection):
+                loader.load_batches(batches)
+        except Error as e:
+            print(f"✗ 插入資料錯誤: {e}")
+            print(f"  (已提交 {loader.committed} 筆記錄，未提交的部分已復原)")
+            return None
+        except PARSE_ERRORS as e:
+            print(f"✗ 解析檔案錯誤: {e}")
+            print(f"  (已提交 {loader.committed} 筆記錄，未提交的部分已復原)")
+            return None
+        print(f"✓ 成功寫入 {loader.processed} 筆記錄（影響 {loader.inserted} 筆）")
+        return loader
+
+    def import_file(self, filepath, mode):
+        """導入單個檔案並登記到 manifest，成功時回傳 True"""
+        # 解析前先取得檔案指紋，導入成功後登記到 manifest
+        fingerprint = file_fingerprint(filepath)
+        metrics = self.run.file(filepath) if self.run is not None else NO_METRICS
+        metrics.track_connection(self.connection)
+        loader = self.insert_batches(self.iter_batches(filepath, metrics), mode, metrics)
+        metrics.finish(self.connection)
+        metrics.print_summary()
+        if loader is None:
+            return False
+        _, year, month = parse_station_filename(filepath)
+        self.manifest.record(filepath, fingerprint, year, month, loader.processed)
+        return True
+
+    def plan_imports(self, files, reimport=False):
+        """決定每個檔案的寫入方式，回傳 [(檔案, 狀態, mode)]，mode 為 None 表示跳過
+
+        新檔案以 ignore 寫入，已變更的檔案以 upsert 覆蓋同一天的記錄，未變更的檔案跳過；
+        reimport 為 True 時全部以 upsert 重新導入
+        """
+        plan = []
+        for filepath in files:
+            status, _ = self.manifest.check(filepath)
+            if status == STATUS_NEW:
+                mode = 'ignore'
+            elif status == STATUS_CHANGED or reimport:
+                mode = 'upsert'
+            else:
+                mode = None
+            plan.append((filepath, status, mode))
+        return plan
+
+    def import_files(self, files, reimport=False, dry_run=False):
+        """依 manifest 導入檔案，回傳 (是否全部成功, 寫入的檔案數)"""
+        plan = self.plan_imports(files, reimport)
+        print("\n檔案列表：")
+        for filepath, status, mode in plan:
+            action = {None: "跳過", 'ignore': "導入", 'upsert': "重新導入（覆蓋同一天的記錄）"}[mode]
+            print(f"  {os.path.basename(filepath)} [{STATUS_LABELS[status]}] -> {action}")
+
+        todo = [(filepath, mode) for filepath, _, mode in plan if mode is not None]
+        if dry_run or not todo:
+            if not todo:
+                print("\n沒有新檔案或已變更的檔案需要導入")
+            return True, 0
+
+        self.run = ImportRun('c0ai10_to_mysql')
+        ok = True
+        try:
+            for filepath, mode in todo:
+                ok = self.import_file(filepath, mode) and ok
+        finally:
+            self.run.report(self.connection)
+            self.run = None
+        return ok, len(todo)
+
+    def verify_data(self):
+        """顯示各月份的天數和平均值"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(f"""
+            SELECT station_id, year, month, COUNT(*), MIN(obs_date), MAX(obs_date),
+                   AVG(temperature), SUM(precipitation)
+            FROM {self.table}
+            GROUP BY station_id, year, month
+            ORDER BY station_id, year, month
+            """)
+            rows = cursor.fetchall()
+            cursor.close()
+        except Error as e:
+            print(f"✗ 驗證資料錯誤: {e}")
+            return
+
+        print("\n=== 測站資料驗證 ===")
+        print(f"{'測站':<8} {'年份':<6} {'月份':<6} {'天數':<6} {'第一天':<12} {'最後一天':<12} {'平均氣溫':<10} {'降水量':<8}")
+        print("-" * 80)
+        for station_id, year, month, days, first, last, avg_temp, rain in rows:
+            avg_temp = f"{avg_temp:.1f}" if avg_temp is not None else '-'
+            rain = f"{rain:.1f}" if rain is not None else '-'
+            print(f"{station_id:<8} {year:<6} {month:<6} {days:<6} {str(first):<12} {str(last):<12} "
+                  f"{avg_temp:<10} {rain:<8}")
+
+    def close(self):
+        """關閉資料庫連接（歸還連線池；外部傳入的連線由呼叫端負責關閉）"""
+        if self.owns_connection and self.connection and self.connection.is_connected():
+            self.connection.close()
+            print("\n✓ 資料庫連接已關閉")
+
+
+def import_station_files(connection, files):
+    """以現有的連線導入測站檔案（給 watch_folders.py 使用），有寫入資料時回傳 True"""
+    importer = C0AI10Importer(connection=connection)
+    if not importer.ensure_table():
+        raise RuntimeError("無法建立測站資料表")
+    ok, imported = importer.import_files(sorted(files))
+    if not ok:
+        raise RuntimeError("部分檔案導入失敗")
+    return imported > 0
+
+
+def main():
+    """主程式，回傳程式結束代碼（0 為成功）"""
+    parser = argparse.ArgumentParser(description='C0AI10 測站資料導入')
+    parser.add_argument('--folder', default=DEFAULT_FOLDER, help='C0AI10 檔案所在資料夾')
+    parser.add_argument('--all', action='store_true', help='全部重新導入（覆蓋同一天的記錄）')
+    parser.add_argument('--dry-run', action='store_true', help='只列出每個檔案的處理方式，不寫入資料')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("C0AI10 測站資料導入 MySQL")
+    print("=" * 70)
+
+    importer = C0AI10Importer()
+    if not importer.create_connection():
+        print("✗ 無法連接到資料庫，程式結束")
+        return 1
+
+    try:
+        if not importer.ensure_table():
+            return 1
+        files = importer.find_files(args.folder)
+        if not files:
+            print(f"✗ 在 {args.folder} 中找不到符合條件的檔案")
+            return 1
+        print(f"✓ 找到 {len(files)} 個檔案")
+        ok, _ = importer.import_files(files, args.all, args.dry_run)
+        if not args.dry_run:
+            importer.verify_data()
+        return 0 if ok else 1
+    finally:
+        importer.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
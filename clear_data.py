@@ -1,25 +1,41 @@
-import mysql.connector
 from mysql.connector import Error
 
-def clear_table():
-    """清空資料表"""
+from data_generations import DataGenerations
+from db import get_connection
+from import_manifest import ImportManifest
+
+def clear_table(connection=None):
+    """清空資料表，成功時回傳 True
+    connection: 可傳入現有的連線，否則從共用連線池取得並在結束後歸還
+    """
+    owns_connection = connection is None
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='weather_data',
-            user='root',
-            password=''
-        )
+        if owns_connection:
+            connection = get_connection()
         
         if connection.is_connected():
             cursor = connection.cursor()
             cursor.execute("TRUNCATE TABLE gl860_weather_data")
+            # 所有月份的快取結果一起失效
+            generations = DataGenerations(connection)
+            generations.ensure_table()
+            generations.bump_all()
             connection.commit()
             print("已清空 gl860_weather_data 資料表")
-            connection.close()
+            
+            # 資料已清空，導入清單也要一併清除，下次才會重新導入所有檔案
+            manifest = ImportManifest(connection)
+            manifest.ensure_table()
+            manifest.clear()
+            print("已清空導入清單 gl860_import_manifest")
+            cursor.close()
+            if owns_connection:
+                connection.close()
+            return True
             
     except Error as e:
         print(f"錯誤: {e}")
+    return False
 
 if __name__ == "__main__":
     clear_table()
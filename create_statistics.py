@@ -1,27 +1,22 @@
 """
 建立統計資料表和視圖
+預設只重新計算有新資料的日期，加上 --full 重新計算所有日期：
+    python create_statistics.py --full
 """
-import mysql.connector
+import argparse
+from datetime import datetime, timedelta
+
 from mysql.connector import Error
-import configparser
 
-def read_config():
-    """讀取配置文件"""
-    config = configparser.ConfigParser()
-    config.read('config.ini', encoding='utf-8')
-    return config['MySQL']
+from db import get_connection
+from dirty_dates import DirtyDates, date_ranges
+from result_cache import STATISTICS_SOURCE, month_sample, month_summaries, statistics_result
+from rollups import create_rollup_tables, refresh_rollup_ranges
 
 def create_connection():
-    """創建資料庫連接"""
-    config = read_config()
+    """從共用連線池取得資料庫連接"""
     try:
-        connection = mysql.connector.connect(
-            host=config['host'],
-            user=config['user'],
-            password=config['password'],
-            database=config['database']
-        )
-        return connection
+        return get_connection()
     except Error as e:
         print(f"連接失敗: {e}")
         return None
@@ -57,8 +52,10 @@ def create_daily_statistics_table(connection):
     try:
         cursor.execute(create_table_sql)
         print("✓ 每日統計資料表創建成功")
+        return True
     except Error as e:
         print(f"✗ 創建資料表失敗: {e}")
+        return False
     finally:
         cursor.close()
 
@@ -75,7 +72,7 @@ def create_view_all_data(connection):
     create_view_sql = """
     CREATE VIEW v_gl860_complete_data AS
     SELECT 
-        id,
+        logger_id,
         year,
         month,
         DATE(record_time) as date,
@@ -92,20 +89,15 @@ def create_view_all_data(connection):
         cursor.execute(create_view_sql)
         print("✓ 完整資料視圖創建成功 (v_gl860_complete_data)")
         print("  使用方式: SELECT * FROM v_gl860_complete_data;")
+        return True
     except Error as e:
         print(f"✗ 創建視圖失敗: {e}")
+        return False
     finally:
         cursor.close()
 
-def populate_daily_statistics(connection):
-    """填充每日統計資料"""
-    cursor = connection.cursor()
-    
-    insert_sql = """
-    INSERT INTO gl860_daily_statistics 
-    (date, year, month, day, avg_temperature, avg_humidity, avg_device_temp,
-     max_temperature, max_humidity, min_temperature, min_humidity,
-     temperature_delta, humidity_delta, record_count)
+# 每日統計的計算方式，{where} 為 record_time 的範圍條件
+DAILY_STATISTICS_SELECT = """
     SELECT 
         DATE(record_time) as date,
         year,
@@ -122,7 +114,22 @@ def populate_daily_statistics(connection):
         ROUND(MAX(channel2_humidity) - MIN(channel2_humidity), 2) as humidity_delta,
         COUNT(*) as record_count
     FROM gl860_weather_data
+    {where}
     GROUP BY DATE(record_time), year, month, DAY(record_time)
+"""
+
+DAILY_STATISTICS_INSERT = """
+    INSERT INTO gl860_daily_statistics 
+    (date, year, month, day, avg_temperature, avg_humidity, avg_device_temp,
+     max_temperature, max_humidity, min_temperature, min_humidity,
+     temperature_delta, humidity_delta, record_count)
+"""
+
+def populate_all_daily_statistics(connection):
+    """重新計算所有日期的每日統計"""
+    cursor = connection.cursor()
+    
+    insert_sql = DAILY_STATISTICS_INSERT + DAILY_STATISTICS_SELECT.format(where='') + """
     ON DUPLICATE KEY UPDATE
         avg_temperature = VALUES(avg_temperature),
         avg_humidity = VALUES(avg_humidity),
@@ -137,106 +144,160 @@ def populate_daily_statistics(connection):
     """
     
     try:
+        dirty_dates = DirtyDates(connection)
+        dirty_dates.ensure_table()
         cursor.execute(insert_sql)
+        days = cursor.rowcount
+        hours, rollup_days, months = refresh_rollup_ranges(cursor, [(None, None)])
+        # 統計和彙總已更新，查詢統計資料表的快取結果隨之失效
+        dirty_dates.generations.bump_all(STATISTICS_SOURCE)
         connection.commit()
-        print(f"✓ 每日統計資料已更新，共 {cursor.rowcount} 天的資料")
+        dirty_dates.clear()
+        print(f"✓ 每日統計資料已更新，共 {days} 天的資料")
+        print(f"✓ 彙總資料已更新，共 {hours} 小時、{rollup_days} 天、{months} 個月的資料")
+        return True
     except Error as e:
         print(f"✗ 填充統計資料失敗: {e}")
         connection.rollback()
+        return False
     finally:
         cursor.close()
 
-def verify_channel5_data(connection):
-    """驗證 Channel 5 資料"""
+def refresh_statistics_ranges(cursor, ranges):
+    """重新計算 record_time 範圍內的每日統計（不 commit），回傳寫入的天數
+
+    ranges: [(起始, 結束), ...]，結束為 None 表示沒有上限
+    先刪除範圍內的舊統計再重新寫入，資料已被刪除的日期也會一併移除
+    以 record_time 範圍作為條件（而不是 DATE(record_time)），查詢可以使用 record_time 索引
+    """
+    days = 0
+    for start, end in ranges:
+        if end is None:
+            cursor.execute("DELETE FROM gl860_daily_statistics WHERE date >= %s", (start.date(),))
+            where, params = "WHERE record_time >= %s", (start,)
+        else:
+            cursor.execute(
+                "DELETE FROM gl860_daily_statistics WHERE date >= %s AND date < %s",
+                (start.date(), end.date())
+            )
+            where, params = "WHERE record_time >= %s AND record_time < %s", (start, end)
+        cursor.execute(DAILY_STATISTICS_INSERT + DAILY_STATISTICS_SELECT.format(where=where), params)
+        days += cursor.rowcount
+    return days
+
+def populate_daily_statistics(connection, full=False):
+    """填充每日統計資料
+
+    只重新計算需要更新的日期：
+    - 導入時登記的日期（gl860_dirty_dates）
+    - 統計資料表最後一天之後的所有資料（高水位線之後的新資料）
+    統計資料表是空的或 full 為 True 時重新計算所有日期
+    """
     cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT MAX(date) FROM gl860_daily_statistics")
+        last_date = cursor.fetchone()[0]
+    except Error as e:
+        print(f"✗ 讀取統計資料失敗: {e}")
+        cursor.close()
+        return False
     
+    if full or last_date is None:
+        cursor.close()
+        return populate_all_daily_statistics(connection)
+    
+    dirty_dates = DirtyDates(connection)
+    try:
+        dirty_dates.ensure_table()
+        dates = dirty_dates.pending()
+        ranges = date_ranges(dates)
+        # 高水位線：統計最後一天的隔天之後都視為新資料
+        after_last = datetime(last_date.year, last_date.month, last_date.day) + timedelta(days=1)
+        ranges = [(start, min(end, after_last)) for start, end in ranges if start < after_last]
+        ranges.append((after_last, None))
+        
+        days = refresh_statistics_ranges(cursor, ranges)
+        hours, rollup_days, months = refresh_rollup_ranges(cursor, ranges)
+        dirty_dates.remove(dates)
+        dirty_dates.generations.bump_all(STATISTICS_SOURCE)
+        connection.commit()
+        print(f"✓ 每日統計資料已更新，重新計算 {len(dates)} 個待更新日期，共寫入 {days} 天的資料")
+        print(f"✓ 彙總資料已更新，共寫入 {hours} 小時、{rollup_days} 天、{months} 個月的資料")
+        return True
+    except Error as e:
+        print(f"✗ 填充統計資料失敗: {e}")
+        connection.rollback()
+        return False
+    finally:
+        cursor.close()
+
+# verify_channel5_data 的樣本：2025年7月前10筆有設備溫度的記錄（參數為該月份的 record_time 範圍）
+CHANNEL5_SAMPLE_QUERY = """
+    SELECT 
+        record_time,
+        channel1_temperature,
+        channel5_device_temp
+    FROM gl860_weather_data
+    WHERE record_time >= %s AND record_time < %s
+    AND channel5_device_temp IS NOT NULL
+    ORDER BY record_time
+    LIMIT 10;
+"""
+
+STATISTICS_SAMPLE_QUERY = """
+    SELECT 
+        date,
+        avg_temperature,
+        avg_humidity,
+        avg_device_temp,
+        max_temperature,
+        min_temperature,
+        temperature_delta,
+        humidity_delta,
+        record_count
+    FROM gl860_daily_statistics
+    ORDER BY date DESC
+    LIMIT 10;
+"""
+
+def verify_channel5_data(connection):
+    """驗證 Channel 5 資料（各月份的彙總和樣本在兩次導入之間由結果快取回答）"""
     print("\n" + "="*70)
     print("Channel 5 (設備溫度) 資料驗證")
     print("="*70)
     
     # 檢查每月的 channel 5 數據
-    query = """
-    SELECT 
-        year,
-        month,
-        COUNT(*) as total_records,
-        COUNT(channel5_device_temp) as ch5_records,
-        ROUND(COUNT(channel5_device_temp) * 100.0 / COUNT(*), 2) as percentage,
-        ROUND(MIN(channel5_device_temp), 2) as min_temp,
-        ROUND(MAX(channel5_device_temp), 2) as max_temp,
-        ROUND(AVG(channel5_device_temp), 2) as avg_temp
-    FROM gl860_weather_data
-    GROUP BY year, month
-    ORDER BY year, month;
-    """
-    
-    cursor.execute(query)
-    results = cursor.fetchall()
-    
     print(f"{'年份':<8}{'月份':<8}{'總記錄':<12}{'CH5記錄':<12}{'比例':<10}{'最小值':<10}{'最大值':<10}{'平均值':<10}")
     print("-" * 70)
     
-    for row in results:
-        year, month, total, ch5, pct, min_t, max_t, avg_t = row
+    for row in month_summaries(connection):
+        total, ch5 = row['total'], row['ch5_count']
+        pct = round(ch5 * 100.0 / total, 2)
+        min_t, max_t, avg_t = row['ch5_min'], row['ch5_max'], row['ch5_avg']
         min_str = f"{min_t:.2f}" if min_t is not None else "N/A"
         max_str = f"{max_t:.2f}" if max_t is not None else "N/A"
         avg_str = f"{avg_t:.2f}" if avg_t is not None else "N/A"
-        print(f"{year:<8}{month:<8}{total:<12}{ch5:<12}{pct:<10.1f}%{min_str:<10}{max_str:<10}{avg_str:<10}")
+        print(f"{row['year']:<8}{row['month']:<8}{total:<12}{ch5:<12}{pct:<10.1f}%{min_str:<10}{max_str:<10}{avg_str:<10}")
     
     # 顯示一些實際的 channel 5 資料
     print("\n" + "="*70)
     print("Channel 5 資料樣本 (2025年7月，前10筆有值的記錄)")
     print("="*70)
     
-    sample_query = """
-    SELECT 
-        record_time,
-        channel1_temperature,
-        channel5_device_temp
-    FROM gl860_weather_data
-    WHERE year = 2025 
-    AND month = 7 
-    AND channel5_device_temp IS NOT NULL
-    ORDER BY record_time
-    LIMIT 10;
-    """
-    
-    cursor.execute(sample_query)
-    samples = cursor.fetchall()
+    samples = month_sample(connection, 2025, 7, CHANNEL5_SAMPLE_QUERY)
     
     print(f"{'時間':<25}{'環境溫度(CH1)':<20}{'設備溫度(CH5)':<20}")
     print("-" * 70)
     for record_time, ch1_temp, ch5_temp in samples:
         print(f"{record_time.strftime('%Y-%m-%d %H:%M:%S'):<25}{ch1_temp:<20.2f}{ch5_temp:<20.2f}")
-    
-    cursor.close()
 
 def show_statistics_sample(connection):
-    """顯示統計資料樣本"""
-    cursor = connection.cursor()
-    
+    """顯示統計資料樣本（統計更新之前由結果快取回答）"""
     print("\n" + "="*70)
     print("每日統計資料樣本 (最近10天)")
     print("="*70)
     
-    query = """
-    SELECT 
-        date,
-        avg_temperature,
-        avg_humidity,
-        avg_device_temp,
-        max_temperature,
-        min_temperature,
-        temperature_delta,
-        humidity_delta,
-        record_count
-    FROM gl860_daily_statistics
-    ORDER BY date DESC
-    LIMIT 10;
-    """
-    
-    cursor.execute(query)
-    results = cursor.fetchall()
+    results = statistics_result(connection, STATISTICS_SAMPLE_QUERY)
     
     print(f"{'日期':<12}{'平均溫度':<10}{'平均濕度':<10}{'平均設備溫':<12}{'最高溫':<10}{'最低溫':<10}{'溫差':<8}{'濕差':<8}{'記錄數':<8}")
     print("-" * 100)
@@ -245,10 +306,34 @@ def show_statistics_sample(connection):
         date, avg_t, avg_h, avg_dt, max_t, min_t, t_delta, h_delta, count = row
         avg_dt_str = f"{avg_dt:.2f}" if avg_dt is not None else "N/A"
         print(f"{date.strftime('%Y-%m-%d'):<12}{avg_t:<10.2f}{avg_h:<10.2f}{avg_dt_str:<12}{max_t:<10.2f}{min_t:<10.2f}{t_delta:<8.2f}{h_delta:<8.2f}{count:<8}")
+
+def update_statistics(connection, full=False):
+    """建立統計資料表和視圖並填充每日統計，全部成功時回傳 True
+    full: 重新計算所有日期（預設只計算有新資料的日期）
+    """
+    # 1. 建立每日統計資料表
+    print("\n步驟 1: 建立每日統計資料表")
+    if not create_daily_statistics_table(connection):
+        return False
+    
+    # 每小時 / 每日 / 每月彙總資料表（涵蓋全部五個通道，存放可合併的統計狀態）
+    if not create_rollup_tables(connection):
+        return False
+    
+    # 2. 建立完整資料視圖
+    print("\n步驟 2: 建立完整資料視圖")
+    if not create_view_all_data(connection):
+        return False
     
-    cursor.close()
+    # 3. 填充每日統計資料
+    print("\n步驟 3: 填充每日統計資料")
+    return populate_daily_statistics(connection, full=full)
 
 def main():
+    parser = argparse.ArgumentParser(description='建立統計資料表和視圖')
+    parser.add_argument('--full', action='store_true', help='重新計算所有日期的每日統計')
+    args = parser.parse_args()
+    
     print("="*70)
     print("建立統計資料表和視圖")
     print("="*70)
@@ -259,17 +344,8 @@ def main():
         return
     
     try:
-        # 1. 建立每日統計資料表
-        print("\n步驟 1: 建立每日統計資料表")
-        create_daily_statistics_table(connection)
-        
-        # 2. 建立完整資料視圖
-        print("\n步驟 2: 建立完整資料視圖")
-        create_view_all_data(connection)
-        
-        # 3. 填充每日統計資料
-        print("\n步驟 3: 填充每日統計資料")
-        populate_daily_statistics(connection)
+        # 1~3. 建立統計資料表、視圖並填充每日統計
+        update_statistics(connection, full=args.full)
         
         # 4. 驗證 Channel 5 資料
         verify_channel5_data(connection)
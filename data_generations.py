@@ -0,0 +1,142 @@
+"""
+資料版本
+每個月份有一個資料版本（gl860_data_generations），寫入資料的程式在同一個交易中遞增寫入過的月份的版本，
+查詢結果快取（result_cache.py）以版本判斷結果是否仍然有效：
+
+- 導入程式 commit 時遞增寫入過的月份（dirty_dates.DirtyDates.mark）
+- 清空資料表、換表、結構轉換時遞增整個資料表的版本（year = month = 0）
+- 建立資料表時記錄一個隨機的 epoch，資料庫刪除重建後 epoch 不同，舊的快取不會被誤用
+"""
+import uuid
+
+from mysql.connector import Error, errorcode
+
+GENERATION_TABLE = 'gl860_data_generations'
+
+# 資料版本的來源（資料表名稱）
+RAW_SOURCE = 'gl860_weather_data'
+STATISTICS_SOURCE = 'gl860_daily_statistics'
+
+# 代表整個資料表的版本
+ALL_MONTHS = (0, 0)
+
+# epoch 記錄在 (EPOCH_SOURCE, 0, 0) 的 generation 欄位
+EPOCH_SOURCE = '__epoch__'
+
+
+def months_of(dates):
+    """日期所屬的 (year, month)"""
+    return {(day.year, day.month) for day in dates}
+
+
+class DataGenerations:
+    """每個月份的資料版本
+
+    bump 不 commit，與寫入的資料在同一個交易中提交：讀取到新版本時一定也讀得到新資料
+    """
+
+    def __init__(self, connection, table=GENERATION_TABLE):
+        self.connection = connection
+        self.table = table
+
+    def ensure_table(self):
+        """建立資料表（若不存在）
+
+        第一次建立時原始資料表可能已經有資料，先登記既有的月份，快取才會涵蓋所有月份；
+        同時記錄這個資料庫的 epoch（隨機數字，已有 epoch 時不變）
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                source VARCHAR(64) NOT NULL,
+                year SMALLINT NOT NULL,
+                month TINYINT NOT NULL,
+                generation BIGINT NOT NULL DEFAULT 1,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (source, year, month)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """)
+            cursor.execute(f"SELECT COUNT(*) FROM {self.table} WHERE source = %s", (RAW_SOURCE,))
+            if cursor.fetchone()[0] == 0:
+                try:
+                    cursor.execute(f"SELECT DISTINCT year, month FROM {RAW_SOURCE}")
+                    months = cursor.fetchall()
+                except Error as e:
+                    if e.errno != errorcode.ER_NO_SUCH_TABLE:
+                        raise
+                    months = []
+                self.bump(set(months) | {ALL_MONTHS})
+            cursor.execute(
+                f"INSERT IGNORE INTO {self.table} (source, year, month, generation) VALUES (%s, 0, 0, %s)",
+                (EPOCH_SOURCE, uuid.uuid4().int >> 66)
+            )
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def bump(self, months, source=RAW_SOURCE):
+        """遞增月份的版本（不 commit）"""
+        if not months:
+            return
+        cursor = self.connection.cursor()
+        try:
+            cursor.executemany(
+                f"""
+                INSERT INTO {self.table} (source, year, month) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE generation = generation + 1
+                """,
+                [(source, year, month) for year, month in sorted(months)]
+            )
+        finally:
+            cursor.close()
+
+    def bump_all(self, source=RAW_SOURCE):
+        """遞增整個資料表的版本，所有月份的快取一起失效（不 commit）"""
+        self.bump([ALL_MONTHS], source)
+
+    def snapshot(self, source=RAW_SOURCE):
+        """目前的版本 -> {(year, month): generation}，包含代表整個資料表的 ALL_MONTHS"""
+        cursor = self.connection.cursor()
+        try:
+            try:
+                cursor.execute(
+                    f"SELECT year, month, generation FROM {self.table} WHERE source = %s",
+                    (source,)
+                )
+            except Error as e:
+                if e.errno != errorcode.ER_NO_SUCH_TABLE:
+                    raise
+                self.ensure_table()
+                return self.snapshot(source)
+            return {(year, month): generation for year, month, generation in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    def scope(self):
+        """資料庫的識別 (主機, 連接埠, 資料庫名稱, epoch)
+
+        不同的資料庫（或刪除重建後的資料庫）版本都從 1 開始，快取的鍵需要包含識別才不會互相誤用
+        """
+        cursor = self.connection.cursor()
+        try:
+            try:
+                cursor.execute(
+                    f"""
+                    SELECT @@hostname, @@port, DATABASE(),
+                        (SELECT generation FROM {self.table} WHERE source = %s AND year = 0 AND month = 0)
+                    """,
+                    (EPOCH_SOURCE,)
+                )
+                scope = cursor.fetchone()
+            except Error as e:
+                if e.errno != errorcode.ER_NO_SUCH_TABLE:
+                    raise
+                scope = None
+        finally:
+            cursor.close()
+        if scope is None or scope[3] is None:
+            # 還沒建立資料表，或資料表在記錄 epoch 之前就已建立
+            self.ensure_table()
+            return self.scope()
+        return tuple(scope)
@@ -0,0 +1,123 @@
+"""
+共用資料庫連線模組
+config.ini 只讀取一次，所有腳本從同一個連線池取得連線
+"""
+import configparser
+from contextlib import contextmanager
+from functools import lru_cache
+
+import mysql.connector
+from mysql.connector import errorcode, pooling
+
+CONFIG_PATH = 'config.ini'
+POOL_NAME = 'weather_data_pool'
+DEFAULT_POOL_SIZE = 5
+
+_pool = None
+
+
+@lru_cache(maxsize=None)
+def read_config(path=CONFIG_PATH):
+    """讀取配置文件（同一個路徑只讀取一次）"""
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'MySQL': {
+            'host': 'localhost',
+            'database': 'weather_data',
+            'user': 'root',
+            'password': '',
+        },
+        'Import': {},
+    })
+    config.read(path, encoding='utf-8')
+    return config
+
+
+def mysql_config():
+    """config.ini 的 [MySQL] 區段"""
+    return read_config()['MySQL']
+
+
+def import_config():
+    """config.ini 的 [Import] 區段"""
+    return read_config()['Import']
+
+
+def connection_args(with_database=True):
+    """mysql.connector.connect 的連線參數"""
+    config = mysql_config()
+    args = {
+        'host': config['host'],
+        'user': config['user'],
+        'password': config['password'],
+        # 使用 LOAD DATA LOCAL INFILE 寫入時需要開啟
+        'allow_local_infile': import_config().get('load_engine', '').strip() == 'load_data',
+    }
+    if with_database:
+        args['database'] = config['database']
+    return args
+
+
+def ensure_database():
+    """建立資料庫（若不存在）"""
+    database = mysql_config()['database']
+    connection = mysql.connector.connect(**connection_args(with_database=False))
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database}")
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def get_pool():
+    """取得共用連線池（第一次呼叫時建立）"""
+    global _pool
+    if _pool is None:
+        _pool = pooling.MySQLConnectionPool(
+            pool_name=POOL_NAME,
+            pool_size=mysql_config().getint('pool_size', fallback=DEFAULT_POOL_SIZE),
+            pool_reset_session=True,
+            **connection_args()
+        )
+    return _pool
+
+
+def get_connection(create_database=False):
+    """從連線池取得連線，close() 時會歸還連線池
+
+    create_database 為 True 時，資料庫不存在會先建立
+    """
+    try:
+        return get_pool().get_connection()
+    except mysql.connector.Error as e:
+        if not create_database or e.errno != errorcode.ER_BAD_DB_ERROR:
+            raise
+    ensure_database()
+    return get_pool().get_connection()
+
+
+@contextmanager
+def bulk_load_session(connection, disable_unique_checks=False):
+    """批次寫入期間的 session 設定，結束後還原
+
+    - autocommit 關閉，由呼叫端決定 commit 時機
+    - foreign_key_checks 關閉
+    - disable_unique_checks 為 True 時關閉 unique_checks；
+      只能用在確定沒有重複資料的情況（例如寫入空的資料表），
+      否則 INSERT IGNORE / upsert 可能無法發現重複的記錄
+    """
+    cursor = connection.cursor()
+    cursor.execute("SELECT @@SESSION.autocommit, @@SESSION.foreign_key_checks, @@SESSION.unique_checks")
+    autocommit, foreign_key_checks, unique_checks = cursor.fetchone()
+    try:
+        cursor.execute("SET SESSION autocommit = 0")
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        if disable_unique_checks:
+            cursor.execute("SET SESSION unique_checks = 0")
+        yield connection
+    finally:
+        cursor.execute("SET SESSION autocommit = %s", (autocommit,))
+        cursor.execute("SET SESSION foreign_key_checks = %s", (foreign_key_checks,))
+        cursor.execute("SET SESSION unique_checks = %s", (unique_checks,))
+        cursor.close()
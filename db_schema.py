@@ -0,0 +1,506 @@
+"""
+gl860_weather_data 資料表結構與結構遷移
+直接執行此腳本會將現有資料表升級到最新結構，並比較升級前後每筆資料佔用的空間和緩衝池命中率：
+    python db_schema.py
+    python db_schema.py --measure    # 只測量，不升級
+"""
+import argparse
+from datetime import date
+
+from mysql.connector import Error, errorcode
+
+from data_generations import DataGenerations
+from db import get_connection
+from gl860_parser import DEFAULT_LOGGER_ID
+from partitions import PARTITION_CLAUSE, list_partitions, partitioning_enabled, prepare_month
+
+WEATHER_TABLE = 'gl860_weather_data'
+
+# 重建時使用的暫存資料表名稱後綴：新資料寫入 <table>_new，換表後舊資料表改名為 <table>_old
+SHADOW_SUFFIX = '_new'
+OLD_SUFFIX = '_old'
+
+# 聚簇主鍵：資料列依時間順序存放，時間範圍查詢直接掃描主鍵，也保證同一記錄器同一時間只有一筆
+PRIMARY_KEY = ('record_time', 'logger_id')
+
+# 各通道的欄位類型 (精度, 小數位數)：DECIMAL(5,2) 佔 3 bytes（±999.99）；
+# 日照強度可超過 1000 W/m²，使用 DECIMAL(6,2)（±9999.99，同樣佔 3 bytes）；
+# 照度可達十幾萬 lux，使用 DECIMAL(8,2) 佔 4 bytes
+CHANNEL_TYPES = {
+    'channel1_temperature': (5, 2),
+    'channel2_humidity': (5, 2),
+    'channel3_uv': (6, 2),
+    'channel4_lux': (8, 2),
+    'channel5_device_temp': (5, 2),
+}
+
+# 主鍵以外的索引（重建時在資料寫入完成後才建立）；
+# 依時間和自然鍵的查詢由主鍵處理，idx_year_month 讓以 year / month（虛擬欄位）篩選的查詢
+# （MySQL_deployment.sql 的查詢範例、已導入月份的清單）不必掃描整個資料表
+SECONDARY_INDEXES = {
+    'idx_year_month': 'INDEX idx_year_month (year, month)',
+}
+
+# index_advisor.py --apply 建立的生成欄位和索引登記在這個資料表，
+# 重建資料表（pipeline.py --shadow、結構轉換）時一併建立，不會因為換表而消失
+EXTENSIONS_TABLE = 'gl860_schema_extensions'
+EXTENSION_COLUMN = 'column'
+EXTENSION_INDEX = 'index'
+
+# 測量緩衝池命中率時執行的查詢：依日期彙總整個資料表（與每日統計相同的讀取方式）
+WORKLOAD_QUERY = """
+    SELECT DATE(record_time), COUNT(*), AVG(channel1_temperature), AVG(channel2_humidity),
+           MAX(channel3_uv), MAX(channel4_lux), AVG(channel5_device_temp)
+    FROM {table}
+    GROUP BY DATE(record_time)
+"""
+
+
+def channel_type(field):
+    """通道欄位的 SQL 類型"""
+    precision, scale = CHANNEL_TYPES[field]
+    return f"DECIMAL({precision}, {scale})"
+
+
+def channel_limit(field):
+    """通道欄位可存放的最大絕對值（例如 DECIMAL(5,2) 為 999.99）"""
+    precision, scale = CHANNEL_TYPES[field]
+    return 10 ** (precision - scale) - 10 ** -scale
+
+
+def weather_table_ddl(table=WEATHER_TABLE, with_indexes=True, partitioned=False, columns=None,
+                      indexes=None):
+    """天氣資料表的 CREATE TABLE 語法
+
+    - 主鍵為 (record_time, logger_id)，沒有自動遞增的 id
+    - year / month 是由 record_time 計算的虛擬欄位，不佔儲存空間，寫入時不需要（也不能）指定
+    - 各通道使用足夠的最小 DECIMAL 類型（見 CHANNEL_TYPES）
+
+    with_indexes 為 False 時只有主鍵，用於重建時先寫入資料再建立索引
+    partitioned 為 True 時依 record_time 的月份分區（見 partitions.py），主鍵已包含分區欄位
+    columns: 額外的生成欄位 {名稱: 定義}（見 registered_extensions）
+    indexes: 次要索引 {名稱: 定義}，預設為 SECONDARY_INDEXES
+    """
+    indexes = SECONDARY_INDEXES if indexes is None else indexes
+    indexes = ''.join(f",\n        {definition}" for definition in indexes.values()) \
+        if with_indexes else ''
+    channels = ''.join(f"\n        {field} {channel_type(field)}," for field in CHANNEL_TYPES)
+    channels += ''.join(f"\n        {name} {definition}," for name, definition in (columns or {}).items())
+    return f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        logger_id VARCHAR(32) NOT NULL DEFAULT '{DEFAULT_LOGGER_ID}',
+        record_time DATETIME NOT NULL,
+        year SMALLINT AS (YEAR(record_time)) VIRTUAL,
+        month TINYINT AS (MONTH(record_time)) VIRTUAL,{channels}
+        PRIMARY KEY ({', '.join(PRIMARY_KEY)}){indexes}
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    {PARTITION_CLAUSE if partitioned else ''}
+    """
+
+
+def column_exists(cursor, table, column):
+    """檢查資料表是否有指定欄位"""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """,
+        (table, column)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def index_exists(cursor, table, index):
+    """檢查資料表是否有指定索引"""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        """,
+        (table, index)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def table_exists(cursor, table):
+    """檢查資料表是否存在"""
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """,
+        (table,)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def ensure_extensions_table(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {EXTENSIONS_TABLE} (
+            name VARCHAR(64) NOT NULL PRIMARY KEY,
+            kind VARCHAR(16) NOT NULL COMMENT 'column 或 index',
+            definition VARCHAR(255) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def register_extension(connection, kind, name, definition):
+    """登記額外的生成欄位（kind = EXTENSION_COLUMN）或索引（EXTENSION_INDEX），之後重建資料表時一併建立
+
+    definition: 生成欄位為欄位定義（例如 DATE AS (DATE(record_time)) STORED），
+                索引為 INDEX 子句（例如 INDEX idx_name (year, month, record_date)）
+    """
+    ensure_extensions_table(connection)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            f"""
+            INSERT INTO {EXTENSIONS_TABLE} (name, kind, definition) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE kind = VALUES(kind), definition = VALUES(definition)
+            """,
+            (name, kind, definition)
+        )
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def registered_extensions(cursor, kind):
+    """已登記的生成欄位或索引 {名稱: 定義}（依登記順序），還沒有登記資料表時為空"""
+    try:
+        cursor.execute(
+            f"SELECT name, definition FROM {EXTENSIONS_TABLE} WHERE kind = %s ORDER BY created_at, name",
+            (kind,)
+        )
+    except Error as e:
+        if e.errno != errorcode.ER_NO_SUCH_TABLE:
+            raise
+        return {}
+    return dict(cursor.fetchall())
+
+
+def secondary_indexes(cursor):
+    """所有次要索引：SECONDARY_INDEXES 加上已登記的索引"""
+    return {**SECONDARY_INDEXES, **registered_extensions(cursor, EXTENSION_INDEX)}
+
+
+def is_legacy_layout(cursor, table=WEATHER_TABLE):
+    """資料表是否為舊版結構（自動遞增 id 主鍵、year / month 為實際欄位）"""
+    return column_exists(cursor, table, 'id')
+
+
+def check_channel_ranges(cursor, table):
+    """確認現有資料都能存入 CHANNEL_TYPES 的欄位類型，有超出範圍的通道時引發 ValueError
+
+    結構轉換會縮小欄位類型，超出範圍的數值寫入時會失敗或被截斷，因此先檢查各通道的最大絕對值
+    """
+    cursor.execute(
+        f"SELECT {', '.join(f'MAX(ABS({field}))' for field in CHANNEL_TYPES)} FROM {table}"
+    )
+    too_large = [
+        f"{field} 最大絕對值 {value}（{channel_type(field)} 上限 {channel_limit(field):.2f}）"
+        for field, value in zip(CHANNEL_TYPES, cursor.fetchone())
+        if value is not None and value > channel_limit(field)
+    ]
+    if too_large:
+        raise ValueError(
+            f"{table} 有超出新欄位類型範圍的資料，未轉換結構（請調整 db_schema.CHANNEL_TYPES）: "
+            + "; ".join(too_large)
+        )
+
+
+def widen_channels(connection, table=WEATHER_TABLE):
+    """將比 CHANNEL_TYPES 窄的通道欄位加寬（例如舊版的 channel3_uv DECIMAL(5,2)），回傳加寬的欄位
+
+    只會加寬，不會縮小欄位類型，現有資料不受影響
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT COLUMN_NAME, NUMERIC_PRECISION, NUMERIC_SCALE FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """,
+            (table,)
+        )
+        current = {name: (precision, scale) for name, precision, scale in cursor.fetchall()}
+        narrow = [
+            field for field, (precision, scale) in CHANNEL_TYPES.items()
+            if field in current and current[field][0] is not None
+            and (current[field][0] - current[field][1] < precision - scale or current[field][1] < scale)
+        ]
+        if narrow:
+            print(f"  加寬欄位: {', '.join(f'{field} {channel_type(field)}' for field in narrow)}")
+            cursor.execute(
+                f"ALTER TABLE {table} "
+                + ", ".join(f"MODIFY {field} {channel_type(field)}" for field in narrow)
+            )
+            connection.commit()
+        return narrow
+    finally:
+        cursor.close()
+
+
+def migrate_compact_layout(connection, table=WEATHER_TABLE):
+    """將舊版資料表轉換成精簡結構，回傳複製的月份數；已是精簡結構時不做任何事
+
+    依月份將資料複製到暫存資料表（精簡結構，已分區的資料表也會分區），再以 RENAME TABLE 換表，
+    轉換期間查詢仍看得到完整的舊資料。同一 (logger_id, record_time) 有多筆時保留最後導入的一筆；
+    更舊的資料表沒有 logger_id 欄位時使用預設的記錄器代號。
+    現有資料超出新欄位類型的範圍時引發 ValueError，不做任何轉換
+    """
+    cursor = connection.cursor()
+    try:
+        if not is_legacy_layout(cursor, table):
+            return 0
+        check_channel_ranges(cursor, table)
+        logger_id = 'logger_id' if column_exists(cursor, table, 'logger_id') else '%s'
+        cursor.execute(f"SELECT DISTINCT year, month FROM {table} ORDER BY year, month")
+        months = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    print(f"  將 {table} 轉換成精簡結構（{len(months)} 個月份）")
+    shadow = create_shadow_table(connection, table)
+    fields = ', '.join(CHANNEL_TYPES)
+    query = f"""
+        INSERT INTO {shadow} (logger_id, record_time, {fields})
+        SELECT {logger_id}, record_time, {fields}
+        FROM {table}
+        WHERE year = %s AND month = %s
+        ORDER BY id
+        ON DUPLICATE KEY UPDATE {', '.join(f"{field} = VALUES({field})" for field in CHANNEL_TYPES)}
+    """
+    params = (DEFAULT_LOGGER_ID,) if logger_id == '%s' else ()
+    for year, month in months:
+        prepare_month(connection, shadow, year, month)
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, params + (year, month))
+            connection.commit()
+        finally:
+            cursor.close()
+    build_secondary_indexes(connection, shadow)
+    swap_tables(connection, [(table, shadow)])
+    # 月份改由 record_time 計算，所有月份的快取結果一起失效
+    generations = DataGenerations(connection)
+    generations.ensure_table()
+    generations.bump_all()
+    connection.commit()
+    return len(months)
+
+
+def ensure_weather_table(connection, table=WEATHER_TABLE):
+    """建立資料表（若不存在）並升級到最新結構
+
+    config.ini 設定 partition_by_month 時新建立的資料表會依月份分區；
+    已分區的資料表會預先建立未來幾個月的分區
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(weather_table_ddl(
+            table, partitioned=partitioning_enabled(),
+            columns=registered_extensions(cursor, EXTENSION_COLUMN), indexes=secondary_indexes(cursor)
+        ))
+        connection.commit()
+    finally:
+        cursor.close()
+    migrate_compact_layout(connection, table)
+    # 之前建立的精簡結構資料表可能還沒有 idx_year_month（或已登記的生成欄位和索引），
+    # 或 channel3_uv 仍是 DECIMAL(5,2)
+    widen_channels(connection, table)
+    build_secondary_indexes(connection, table)
+    today = date.today()
+    prepare_month(connection, table, today.year, today.month)
+
+
+def shadow_name(table=WEATHER_TABLE):
+    """重建時寫入新資料的暫存資料表名稱"""
+    return table + SHADOW_SUFFIX
+
+
+def create_shadow_table(connection, table=WEATHER_TABLE):
+    """建立空的暫存資料表（只有主鍵），已存在的暫存資料表會先刪除，回傳暫存資料表名稱
+
+    寫入時不必逐筆維護次要索引，資料寫完再由 build_secondary_indexes 一次建立。
+    已登記的生成欄位（index_advisor.py --apply）在建立時就加入，寫入時一併計算。
+    正式資料表已分區（或設定要分區）時暫存資料表也會分區，換表後仍維持分區
+    """
+    shadow = shadow_name(table)
+    cursor = connection.cursor()
+    try:
+        partitioned = partitioning_enabled() or bool(list_partitions(cursor, table))
+        cursor.execute(f"DROP TABLE IF EXISTS {shadow}")
+        cursor.execute(weather_table_ddl(shadow, with_indexes=False, partitioned=partitioned,
+                                         columns=registered_extensions(cursor, EXTENSION_COLUMN)))
+        connection.commit()
+    finally:
+        cursor.close()
+    return shadow
+
+
+def build_secondary_indexes(connection, table):
+    """在資料寫入完成後一次建立所有次要索引（包含已登記的索引和所需的生成欄位），回傳建立的索引數"""
+    cursor = connection.cursor()
+    try:
+        indexes = secondary_indexes(cursor)
+        columns = {name: definition
+                   for name, definition in registered_extensions(cursor, EXTENSION_COLUMN).items()
+                   if not column_exists(cursor, table, name)}
+        missing = [name for name in indexes if not index_exists(cursor, table, name)]
+        if not missing and not columns:
+            return 0
+        if columns:
+            print(f"  新增生成欄位: {', '.join(columns)}")
+        if missing:
+            print(f"  建立索引: {', '.join(missing)}")
+        # 一個 ALTER TABLE 建立所有欄位和索引，資料只需掃描一次
+        cursor.execute(
+            f"ALTER TABLE {table} "
+            + ", ".join([f"ADD COLUMN {name} {definition}" for name, definition in columns.items()]
+                        + [f"ADD {indexes[name]}" for name in missing])
+        )
+        connection.commit()
+        return len(missing)
+    finally:
+        cursor.close()
+
+
+def swap_tables(connection, pairs):
+    """以一個 RENAME TABLE 同時將多組暫存資料表換成正式資料表，再刪除舊資料表
+
+    pairs: [(正式資料表, 暫存資料表), ...]
+    RENAME TABLE 是原子操作，查詢只會看到換表前或換表後的完整資料
+    """
+    cursor = connection.cursor()
+    try:
+        renames = []
+        old_tables = []
+        for table, shadow in pairs:
+            if table_exists(cursor, table):
+                old = table + OLD_SUFFIX
+                cursor.execute(f"DROP TABLE IF EXISTS {old}")
+                renames.append(f"{table} TO {old}")
+                old_tables.append(old)
+            renames.append(f"{shadow} TO {table}")
+        cursor.execute("RENAME TABLE " + ", ".join(renames))
+        for old in old_tables:
+            cursor.execute(f"DROP TABLE {old}")
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def status_values(cursor, names):
+    """MySQL 全域狀態值 -> {名稱: 整數}"""
+    cursor.execute(
+        "SHOW GLOBAL STATUS WHERE Variable_name IN (" + ", ".join(['%s'] * len(names)) + ")",
+        tuple(names)
+    )
+    return {name: int(value) for name, value in cursor.fetchall()}
+
+
+def measure_storage(connection, table=WEATHER_TABLE):
+    """測量資料表的空間使用和緩衝池命中率，回傳 dict
+
+    - bytes_per_row: (資料 + 索引) / 筆數，先 ANALYZE TABLE 更新 InnoDB 的統計
+    - hit_rate: 執行 WORKLOAD_QUERY 期間，緩衝池讀取請求中不必讀取磁碟的比例
+      （全域狀態值，其他連線同時執行的查詢也會計入；資料表小於緩衝池時通常接近 100%）
+    - buffer_pool_rows: 以 bytes_per_row 估計緩衝池可容納的資料筆數
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+        # MySQL 8.0 預設會快取 information_schema 的資料表大小
+        cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+        cursor.execute(
+            """
+            SELECT DATA_LENGTH, INDEX_LENGTH FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """,
+            (table,)
+        )
+        data_bytes, index_bytes = cursor.fetchone()
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        rows = cursor.fetchone()[0]
+
+        names = ('Innodb_buffer_pool_read_requests', 'Innodb_buffer_pool_reads')
+        before = status_values(cursor, names)
+        cursor.execute(WORKLOAD_QUERY.format(table=table))
+        cursor.fetchall()
+        after = status_values(cursor, names)
+        requests = after[names[0]] - before[names[0]]
+        reads = after[names[1]] - before[names[1]]
+
+        cursor.execute("SELECT @@innodb_buffer_pool_size")
+        pool_size = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+    bytes_per_row = (data_bytes + index_bytes) / rows if rows else None
+    return {
+        'rows': rows,
+        'data_mb': data_bytes / 1024 / 1024,
+        'index_mb': index_bytes / 1024 / 1024,
+        'bytes_per_row': bytes_per_row,
+        'hit_rate': 1 - reads / requests if requests else None,
+        'buffer_pool_rows': int(pool_size / bytes_per_row) if bytes_per_row else None,
+    }
+
+
+def print_storage(label, stats):
+    def show(value, fmt):
+        return format(value, fmt) if value is not None else '-'
+
+    print(f"{label:<8}{stats['rows']:>12}{stats['data_mb']:>10.1f}{stats['index_mb']:>10.1f}"
+          f"{show(stats['bytes_per_row'], '.1f'):>12}{show(stats['hit_rate'], '.2%'):>10}"
+          f"{show(stats['buffer_pool_rows'], ','):>16}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='gl860_weather_data 結構升級')
+    parser.add_argument('--measure', action='store_true', help='只測量空間使用和緩衝池命中率，不升級')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("gl860_weather_data 結構升級")
+    print("=" * 70)
+
+    try:
+        connection = get_connection()
+    except Error as e:
+        print(f"✗ 連接失敗: {e}")
+        return
+
+    try:
+        cursor = connection.cursor()
+        try:
+            exists = table_exists(cursor, WEATHER_TABLE)
+        finally:
+            cursor.close()
+        results = [('目前' if args.measure else '升級前', measure_storage(connection))] if exists else []
+        if not args.measure:
+            ensure_weather_table(connection)
+            print("✓ 資料表結構已是最新")
+            results.append(('升級後', measure_storage(connection)))
+        print(f"\n{'':<8}{'筆數':>12}{'資料(MB)':>10}{'索引(MB)':>10}{'bytes/筆':>12}"
+              f"{'命中率':>10}{'緩衝池可容納筆數':>16}")
+        print("-" * 78)
+        for label, stats in results:
+            print_storage(label, stats)
+    except (Error, ValueError) as e:
+        print(f"✗ 結構升級失敗: {e}")
+        connection.rollback()
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+待更新統計的日期清單
+導入資料時登記寫入過的日期，更新每日統計時只重新計算這些日期，
+統計更新的成本與新資料量成正比，而不是與全部歷史資料量成正比；
+同時遞增這些月份的資料版本（data_generations.py），查詢結果快取中這些月份的結果隨之失效
+"""
+from datetime import datetime, timedelta
+
+from data_generations import DataGenerations, months_of
+
+DIRTY_TABLE = 'gl860_dirty_dates'
+
+
+def date_ranges(dates):
+    """將日期合併成連續的區間，回傳 [(起始 datetime, 結束 datetime), ...]（結束不含）
+
+    例如 7/1, 7/2, 7/5 -> [(7/1 00:00, 7/3 00:00), (7/5 00:00, 7/6 00:00)]
+    以 record_time 的範圍查詢時可以使用 record_time 索引
+    """
+    ranges = []
+    for day in sorted(set(dates)):
+        start = datetime(day.year, day.month, day.day)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = start + timedelta(days=1)
+        else:
+            ranges.append([start, start + timedelta(days=1)])
+    return [tuple(r) for r in ranges]
+
+
+class DirtyDates:
+    """待更新統計日期資料表的存取"""
+
+    def __init__(self, connection, table=DIRTY_TABLE):
+        self.connection = connection
+        self.table = table
+        self.generations = DataGenerations(connection)
+
+    def ensure_table(self):
+        """建立資料表（若不存在）"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                date DATE NOT NULL PRIMARY KEY,
+                marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """)
+            self.connection.commit()
+        finally:
+            cursor.close()
+        self.generations.ensure_table()
+
+    def mark(self, dates, months=None):
+        """登記日期需要更新統計，並遞增資料版本（不 commit，與寫入的資料在同一個交易中提交）
+
+        months: 需要遞增版本的月份，預設為 dates 所屬的月份
+        """
+        self.generations.bump(months_of(dates) if months is None else months)
+        if not dates:
+            return
+        cursor = self.connection.cursor()
+        try:
+            cursor.executemany(
+                f"INSERT IGNORE INTO {self.table} (date) VALUES (%s)",
+                [(day,) for day in sorted(dates)]
+            )
+        finally:
+            cursor.close()
+
+    def pending(self):
+        """取得所有待更新的日期"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"SELECT date FROM {self.table} ORDER BY date")
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def remove(self, dates):
+        """移除已更新的日期（不 commit）"""
+        if not dates:
+            return
+        cursor = self.connection.cursor()
+        try:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE date = %s",
+                [(day,) for day in sorted(dates)]
+            )
+        finally:
+            cursor.close()
+
+    def clear(self):
+        """清空清單（全部重新計算統計之後使用）"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"TRUNCATE TABLE {self.table}")
+            self.connection.commit()
+        finally:
+            cursor.close()
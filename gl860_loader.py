@@ -0,0 +1,224 @@
+"""
+GL860 資料寫入引擎
+- executemany: 以 INSERT ... VALUES 批次寫入
+- load_data:   先寫成暫存 TSV 檔，再以 LOAD DATA LOCAL INFILE 一次載入
+
+重複資料（同一 logger_id + record_time）的處理方式：
+- insert: 一般 INSERT，遇到重複會發生錯誤
+- ignore: 跳過已存在的記錄
+- upsert: 以新資料覆蓋已存在的記錄
+
+寫入的欄位和自然鍵由批次的 fields / key_fields 決定，
+GL860RecordBatch 以外的批次（例如測站資料）也可以使用相同的寫入引擎
+"""
+import os
+import tempfile
+from datetime import date, datetime
+
+from data_generations import months_of
+from import_metrics import NO_METRICS
+
+DEFAULT_TABLE = 'gl860_weather_data'
+DEFAULT_ENGINE = 'executemany'
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_COMMIT_INTERVAL = 10
+DEFAULT_MODE = 'ignore'
+
+INSERT_MODES = ('insert', 'ignore', 'upsert')
+
+# LOAD DATA 檔案中代表 NULL 的字串
+TSV_NULL = '\\N'
+
+
+def check_insert_mode(mode):
+    """檢查重複資料處理方式是否有效"""
+    mode = (mode or DEFAULT_MODE).strip().lower()
+    if mode not in INSERT_MODES:
+        raise ValueError(f"未知的重複資料處理方式: {mode}（可用: {', '.join(INSERT_MODES)}）")
+    return mode
+
+
+def _upsert_clause(batch):
+    """ON DUPLICATE KEY UPDATE 子句：以新資料覆蓋自然鍵以外的欄位"""
+    return "ON DUPLICATE KEY UPDATE " + ", ".join(
+        f"{field} = VALUES({field})" for field in batch.fields if field not in batch.key_fields
+    )
+
+
+def insert_with_executemany(connection, batch, table=DEFAULT_TABLE, mode='insert'):
+    """以 executemany 寫入一個批次，回傳影響筆數（不 commit）
+
+    upsert 模式使用 ON DUPLICATE KEY UPDATE，
+    MySQL 對被更新的記錄回報 2 筆影響、內容相同的記錄回報 0 筆
+    """
+    mode = check_insert_mode(mode)
+    insert_query = f"""
+    INSERT {'IGNORE ' if mode == 'ignore' else ''}INTO {table}
+    ({', '.join(batch.fields)})
+    VALUES ({', '.join(['%s'] * len(batch.fields))})
+    """
+    if mode == 'upsert':
+        insert_query += _upsert_clause(batch)
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(insert_query, list(batch.rows()))
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def _format_column(values, formatter):
+    """將整欄轉換成 TSV 字串，None 轉為 \\N"""
+    return [TSV_NULL if v is None else formatter(v) for v in values]
+
+
+def _column_formatter(values):
+    """依欄位中第一個非空值的型別選擇格式：日期時間、日期、浮點數（repr 保留完整精度）或字串"""
+    sample = next((v for v in values if v is not None), None)
+    if isinstance(sample, datetime):
+        return lambda v: v.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(sample, date):
+        return date.isoformat
+    if isinstance(sample, float):
+        return repr
+    return str
+
+
+def write_batch_tsv(batch, fileobj):
+    """將批次以 TSV 格式寫入檔案物件（欄位順序同 batch.fields）"""
+    if len(batch) == 0:
+        return
+    columns = [_format_column(values, _column_formatter(values)) for values in batch.columns()]
+    fileobj.write('\n'.join(map('\t'.join, zip(*columns))))
+    fileobj.write('\n')
+
+
+def _load_tsv(cursor, path, table, fields, duplicate_clause=''):
+    """以 LOAD DATA LOCAL INFILE 載入 TSV 檔，回傳影響筆數"""
+    cursor.execute(f"""
+    LOAD DATA LOCAL INFILE %s
+    {duplicate_clause}INTO TABLE {table}
+    CHARACTER SET utf8mb4
+    FIELDS TERMINATED BY '\\t'
+    LINES TERMINATED BY '\\n'
+    ({', '.join(fields)})
+    """, (path,))
+    return cursor.rowcount
+
+
+def insert_with_load_data(connection, batch, table=DEFAULT_TABLE, mode='insert'):
+    """以 LOAD DATA LOCAL INFILE 寫入一個批次，回傳影響筆數（不 commit）
+
+    連線需以 allow_local_infile=True 建立，且 MySQL 伺服器需開啟 local_infile。
+    upsert 模式先載入暫存資料表，再以 INSERT ... SELECT ... ON DUPLICATE KEY UPDATE 寫入，
+    與 executemany 相同只更新已存在的記錄（LOAD DATA 的 REPLACE 會先刪除再寫入）
+    """
+    mode = check_insert_mode(mode)
+    if len(batch) == 0:
+        return 0
+
+    tmp = tempfile.NamedTemporaryFile(
+        mode='w', suffix='.tsv', delete=False, encoding='utf-8', newline='\n'
+    )
+    try:
+        with tmp:
+            write_batch_tsv(batch, tmp)
+        # MySQL 在 Windows 上也接受 / 作為路徑分隔符號
+        path = tmp.name.replace('\\', '/')
+        cursor = connection.cursor()
+        try:
+            if mode != 'upsert':
+                return _load_tsv(cursor, path, table, batch.fields, 'IGNORE ' if mode == 'ignore' else '')
+            # 暫存資料表只有寫入的欄位，沒有索引和分區；CREATE / DROP TEMPORARY TABLE 不會 commit 目前的交易
+            staging = f"{table}_load_staging"
+            fields = ', '.join(batch.fields)
+            cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+            cursor.execute(f"CREATE TEMPORARY TABLE {staging} SELECT {fields} FROM {table} LIMIT 0")
+            try:
+                _load_tsv(cursor, path, staging, batch.fields)
+                cursor.execute(
+                    f"INSERT INTO {table} ({fields}) SELECT {fields} FROM {staging} {_upsert_clause(batch)}"
+                )
+                return cursor.rowcount
+            finally:
+                cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+        finally:
+            cursor.close()
+    finally:
+        os.remove(tmp.name)
+
+
+LOAD_ENGINES = {
+    'executemany': insert_with_executemany,
+    'load_data': insert_with_load_data,
+}
+
+
+def get_load_engine(name):
+    """依名稱取得寫入引擎函式"""
+    name = (name or DEFAULT_ENGINE).strip().lower()
+    if name not in LOAD_ENGINES:
+        raise ValueError(f"未知的寫入引擎: {name}（可用: {', '.join(LOAD_ENGINES)}）")
+    return LOAD_ENGINES[name]
+
+
+class BatchLoader:
+    """逐批寫入資料，每寫入 commit_interval 批 commit 一次
+
+    批次來源可以是 generator，整個月份的資料不需要同時放在記憶體中。
+    發生錯誤時只會 rollback 尚未 commit 的批次，已 commit 的部分會保留
+
+    dirty_dates: DirtyDates 物件，寫入的日期會在同一個交易中登記為待更新統計，
+                 寫入的月份在每次 commit 時遞增資料版本
+    metrics: FileMetrics 物件，記錄寫入和 commit 的耗時
+    """
+
+    def __init__(self, connection, engine=DEFAULT_ENGINE, table=DEFAULT_TABLE,
+                 mode=DEFAULT_MODE, commit_interval=DEFAULT_COMMIT_INTERVAL, dirty_dates=None,
+                 metrics=None):
+        self.connection = connection
+        self.load = get_load_engine(engine)
+        self.table = table
+        self.mode = check_insert_mode(mode)
+        self.commit_interval = max(1, int(commit_interval or 1))
+        self.processed = 0   # 已送出的資料筆數
+        self.inserted = 0    # 實際寫入的筆數
+        self.committed = 0   # 已 commit 的寫入筆數
+        self.dirty_dates = dirty_dates
+        self.dates = set()   # 已 commit 的資料涵蓋的日期
+        self.metrics = metrics or NO_METRICS
+
+    def commit(self, dates):
+        """登記待更新統計的日期、遞增寫入月份的資料版本並 commit"""
+        with self.metrics.phase('commit'):
+            if self.dirty_dates is not None:
+                # 日期只需登記一次，資料版本每次 commit 都要遞增
+                self.dirty_dates.mark(dates - self.dates, months_of(dates))
+            self.connection.commit()
+        self.committed = self.inserted
+        self.dates |= dates
+
+    def load_batches(self, batches):
+        """寫入所有批次，回傳實際寫入筆數"""
+        pending = 0
+        pending_dates = set()
+        try:
+            for batch in batches:
+                if len(batch) == 0:
+                    continue
+                with self.metrics.phase('insert'):
+                    inserted = self.load(self.connection, batch, table=self.table, mode=self.mode)
+                self.inserted += inserted
+                self.metrics.count('inserted', inserted)
+                self.processed += len(batch)
+                pending_dates |= batch.dates()
+                pending += 1
+                if pending >= self.commit_interval:
+                    self.commit(pending_dates)
+                    pending = 0
+                    pending_dates = set()
+            self.commit(pending_dates)
+        except Exception:
+            self.connection.rollback()
+            raise
+        return self.inserted
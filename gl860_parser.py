@@ -0,0 +1,526 @@
+"""
+GL860 Excel / CSV 檔案解析工具
+使用 openpyxl 唯讀模式逐列讀取，一次掃描即可找到 Data 標記並取出資料列；
+CSV 匯出檔以相同介面逐行讀取
+"""
+import csv
+import os
+import zipfile
+from itertools import islice, repeat
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+from import_metrics import NO_METRICS
+
+# 通道編號對應的資料表欄位
+CHANNEL_FIELDS = {
+    1: 'channel1_temperature',
+    2: 'channel2_humidity',
+    3: 'channel3_uv',
+    4: 'channel4_lux',
+    5: 'channel5_device_temp',
+}
+
+# 記錄器代號，與 record_time 組成資料的自然鍵
+DEFAULT_LOGGER_ID = 'GL860'
+
+# gl860_weather_data 的寫入欄位順序（year / month 是由 record_time 計算的虛擬欄位，不寫入）
+RECORD_FIELDS = ('logger_id', 'record_time') + tuple(CHANNEL_FIELDS.values())
+
+# 資料夾中的 GL860 匯出檔（Excel 和 CSV）
+FILE_PATTERNS = ('GL860 RAWDATA_*.xlsx', 'GL860 RAWDATA_*.csv')
+
+# 尾端導入時往回讀取多少位元組來確認上次的最後一列
+CSV_LOOKBACK = 4096
+
+# 檔案無法讀取或格式不符時可能發生的例外，導入時視為該檔案解析失敗；
+# 其他例外（程式錯誤）不攔截，直接拋出。openpyxl 讀取損壞的 xlsx 時會發生 KeyError
+PARSE_ERRORS = (OSError, ValueError, KeyError, csv.Error, zipfile.BadZipFile, InvalidFileException)
+
+
+def extract_year_month_from_filename(filename):
+    """從檔名提取年份和月份
+    例如: GL860 RAWDATA_2508.xlsx -> year=2025, month=8
+          GL860 RAWDATA_2508.csv  -> year=2025, month=8
+    """
+    basename = os.path.basename(filename)
+    # 提取 YYMM 格式
+    parts = basename.split('_')
+    if len(parts) >= 2:
+        yymm = os.path.splitext(parts[1])[0]
+        if len(yymm) == 4:
+            year = 2000 + int(yymm[:2])  # 25 -> 2025
+            month = int(yymm[2:])         # 08 -> 8
+            return year, month
+    return None, None
+
+
+def make_column_names(header_row):
+    """將標題列轉換成欄位名稱
+
+    命名規則與 pandas 相同：空白欄位為 "Unnamed: N"，
+    重複名稱依序加上 .1、.2（例如第二個 degC 會變成 degC.1）
+    """
+    names = []
+    seen = {}
+    for i, value in enumerate(header_row):
+        name = f"Unnamed: {i}" if value is None else str(value)
+        if name in seen:
+            count = seen[name]
+            candidate = f"{name}.{count}"
+            while candidate in seen:
+                count += 1
+                candidate = f"{name}.{count}"
+            seen[name] = count + 1
+            name = candidate
+        seen[name] = 1
+        names.append(name)
+    return names
+
+
+def map_channel_columns(columns):
+    """根據欄位名稱識別日期欄位和各通道
+
+    回傳 (date_col, ch_cols, data_columns)，ch_cols 為 {通道編號: 欄位名稱}
+    """
+    date_col = None
+    ch_cols = {}
+
+    # 找出非 NO. 和 Time 的資料欄位
+    data_columns = []
+    for col in columns:
+        col_str = str(col).strip()
+        if 'time' in col_str.lower() or '時間' in col_str:
+            date_col = col
+        elif col_str not in ['NO.', 'Number'] and not col_str.startswith('Unnamed'):
+            data_columns.append(col)
+
+    # 根據欄位名稱和順序映射到通道
+    # 需要智能識別：有些檔案只有3個通道，有些有5個或更多
+    # 標準順序應該是：degC(溫度), %(濕度), W/m2(UV), lux(照度), 設備溫度
+
+    # 先統計有多少個 degC 欄位
+    degc_columns = [col for col in data_columns if 'degc' in str(col).lower()]
+
+    for col in data_columns:
+        col_str = str(col)
+        col_lower = col_str.lower()
+
+        # Channel 1: 第一個溫度欄位
+        if 'degc' in col_lower and '.1' not in col_str and 1 not in ch_cols:
+            ch_cols[1] = col
+        # Channel 2: 濕度
+        elif '%' in col_str or 'rh' in col_lower:
+            ch_cols[2] = col
+        # Channel 3: UV
+        elif 'w/m2' in col_lower and '.1' not in col_str:
+            ch_cols[3] = col
+        # Channel 4: 照度
+        elif 'lux' in col_lower:
+            ch_cols[4] = col
+        # Channel 5: 設備溫度 - 可能是 degC.1 或者是第二個 degC 欄位
+        elif 'degc.1' in col_lower:
+            ch_cols[5] = col
+        elif len(degc_columns) >= 2 and 'degc' in col_lower and 1 in ch_cols and col != ch_cols[1]:
+            # 如果有兩個 degC 欄位，第二個就是設備溫度
+            ch_cols[5] = col
+
+    return date_col, ch_cols, data_columns
+
+
+class GL860SheetReader:
+    """以串流方式讀取 GL860 匯出檔的第一個 sheet
+
+    檔案結構：
+      ... 設定資訊 ...
+      Data                               <- 標記列
+      Number, Date&Time, CH1, CH2 ...    <- 欄位名稱列
+      NO., Time, degC, %, W/m2 ...       <- 單位列（作為欄位名稱）
+      1, 2025-08-01 00:11:31, 25.46 ...  <- 實際資料
+
+    使用方式：
+        with GL860SheetReader(filepath) as reader:
+            reader.columns      # 欄位名稱（來自單位列）
+            for row in reader:  # 逐列取得資料 tuple
+                ...
+
+    header_offset: 標記列之後第幾列作為欄位名稱（GL860 為 2，即單位列；
+                   0 表示標記列本身就是欄位名稱，例如 C0AI10 測站資料的 ObsTime 列）
+    """
+
+    def __init__(self, filepath, marker='Data', metrics=None, header_offset=2):
+        self.filepath = filepath
+        self.marker = marker
+        self.header_offset = header_offset
+        self.metrics = metrics or NO_METRICS
+        self.workbook = None
+        self.columns = None
+        self.data_row = None
+        self._rows = None
+        # 已讀取的資料列數和最後一列，尾端導入時記錄到 manifest
+        self.rows_read = 0
+        self.last_row = None
+        self._start = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def open(self):
+        """開啟檔案並定位到資料區域（只掃描到單位列為止）"""
+        with self.metrics.phase('read'):
+            self.workbook = load_workbook(self.filepath, read_only=True, data_only=True)
+            sheet = self.workbook.worksheets[0]
+            self._rows = sheet.iter_rows(values_only=True)
+
+        with self.metrics.phase('marker_scan'):
+            header_row = None
+            for idx, row in enumerate(self._rows):
+                if row and row[0] == self.marker:
+                    self.data_row = idx
+                    header_row = row
+                    break
+
+            if self.data_row is None:
+                return
+
+            # 跳過欄位名稱列，使用單位列作為欄位名稱
+            for _ in range(self.header_offset):
+                header_row = next(self._rows, None) or ()
+            self.columns = make_column_names(header_row)
+
+    def __iter__(self):
+        """逐列產生資料（長度與 columns 一致）"""
+        if self.columns is None:
+            return
+        width = len(self.columns)
+        for row in self._rows:
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
+            elif len(row) > width:
+                row = row[:width]
+            self.rows_read += 1
+            self.last_row = row
+            yield row
+
+    def resume(self, position, date_index):
+        """略過已導入的 position.rows 列，之後只讀取新增的資料列
+
+        Excel 檔案無法直接跳到某一列，略過的資料列仍會被讀取，但不會轉換和寫入；
+        略過的最後一列與 position.last_time 不同（檔案前面的內容被修改）時回傳 False
+        """
+        last = None
+        for last in islice(self._rows, position.rows):
+            self.rows_read += 1
+        self._start = position
+        return self.rows_read == position.rows and row_time(last, date_index) == position.last_time
+
+    def position(self, date_index):
+        """目前讀取到的位置（TailPosition）"""
+        return _reader_position(self, 0, date_index)
+
+    def close(self):
+        """關閉檔案（唯讀模式需要明確關閉）"""
+        if self.workbook is not None:
+            self.workbook.close()
+            self.workbook = None
+
+
+class GL860CsvReader:
+    """以串流方式讀取 GL860 匯出的 CSV 檔，介面與 GL860SheetReader 相同
+
+    檔案結構與 Excel 匯出檔相同（設定資訊、Data 標記、欄位名稱列、單位列、資料）。
+    以二進位模式逐行讀取並記錄讀取到的位元組位置，尾端導入時直接跳到上次讀取的位置，
+    不需要重新讀取已導入的資料列；最後一行還沒寫完（沒有換行）時留到下次再讀取
+    """
+
+    def __init__(self, filepath, marker='Data', metrics=None, encoding='utf-8-sig'):
+        self.filepath = filepath
+        self.marker = marker
+        self.metrics = metrics or NO_METRICS
+        self.encoding = encoding
+        self.columns = None
+        self.data_row = None
+        self.data_offset = None
+        # 已讀取的資料列數、最後一列和讀取到的位元組位置
+        self.rows_read = 0
+        self.last_row = None
+        self.offset = 0
+        self._file = None
+        self._start = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def _parse(self, line):
+        """將一行轉換成欄位 list（空白欄位為 None）"""
+        text = line.decode(self.encoding, errors='replace').rstrip('\r\n')
+        if not text:
+            return []
+        return [value.strip() or None for value in next(csv.reader([text]))]
+
+    def open(self):
+        """開啟檔案並定位到資料區域（只讀取到單位列為止）"""
+        with self.metrics.phase('read'):
+            self._file = open(self.filepath, 'rb')
+
+        with self.metrics.phase('marker_scan'):
+            for idx, line in enumerate(iter(self._file.readline, b'')):
+                row = self._parse(line)
+                if row and row[0] == self.marker:
+                    self.data_row = idx
+                    break
+
+            if self.data_row is None:
+                return
+
+            # 跳過欄位名稱列，使用單位列作為欄位名稱
+            self._file.readline()
+            self.columns = make_column_names(self._parse(self._file.readline()))
+            self.data_offset = self.offset = self._file.tell()
+
+    def __iter__(self):
+        """逐列產生資料 tuple（長度與 columns 一致，略過空白行）"""
+        if self.columns is None:
+            return
+        width = len(self.columns)
+        for line in iter(self._file.readline, b''):
+            if not line.endswith(b'\n'):
+                # 檔案仍在寫入中，最後一行留到下次再讀取
+                break
+            self.offset += len(line)
+            row = self._parse(line)
+            if not row:
+                continue
+            if len(row) < width:
+                row += [None] * (width - len(row))
+            row = tuple(row[:width])
+            self.rows_read += 1
+            self.last_row = row
+            yield row
+
+    def resume(self, position, date_index):
+        """直接跳到上次讀取到的位元組位置，之後只讀取新增的資料列
+
+        先讀取該位置之前的最後一行，與 position.last_time 不同（檔案前面的內容被修改）時回傳 False
+        """
+        if not position.offset or position.offset <= self.data_offset:
+            return False
+        if position.offset > os.path.getsize(self.filepath):
+            return False
+        start = max(self.data_offset, position.offset - CSV_LOOKBACK)
+        self._file.seek(start)
+        tail = self._file.read(position.offset - start)
+        if not tail.endswith(b'\n'):
+            return False
+        last = self._parse(tail.rstrip(b'\r\n').rsplit(b'\n', 1)[-1])
+        if row_time(last, date_index) != position.last_time:
+            return False
+        self._file.seek(position.offset)
+        self.offset = position.offset
+        self.rows_read = position.rows
+        self._start = position
+        return True
+
+    def position(self, date_index):
+        """目前讀取到的位置（TailPosition）"""
+        return _reader_position(self, self.offset, date_index)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def open_sheet(filepath, marker='Data', metrics=None):
+    """依副檔名選擇讀取器：.csv 使用 GL860CsvReader，其他使用 GL860SheetReader"""
+    if filepath.lower().endswith('.csv'):
+        return GL860CsvReader(filepath, marker, metrics)
+    return GL860SheetReader(filepath, marker, metrics)
+
+
+class TailPosition:
+    """檔案已導入到的位置（尾端導入用，記錄在 manifest）
+
+    rows:      已讀取的資料列數（包含無法轉換的列）
+    offset:    CSV 檔案已讀取到的位元組位置（Excel 檔案為 0）
+    last_time: 最後一列的日期時間，用來確認檔案前面的內容沒有被修改
+    resumed:   嘗試從此位置繼續讀取後，是否成功（None 為沒有嘗試）
+    """
+
+    def __init__(self, rows=0, offset=0, last_time=None):
+        self.rows = rows
+        self.offset = offset
+        self.last_time = last_time
+        self.resumed = None
+
+    @classmethod
+    def from_entry(cls, entry):
+        """由 manifest 記錄建立，沒有記錄時為檔案開頭"""
+        if not entry:
+            return cls()
+        return cls(entry.get('row_offset') or 0, entry.get('byte_offset') or 0,
+                   entry.get('last_record_time'))
+
+    def update(self, other):
+        """更新為另一個位置（保留 resumed）"""
+        self.rows, self.offset, self.last_time = other.rows, other.offset, other.last_time
+
+
+def row_time(row, date_index):
+    """資料列的日期時間（datetime，取到秒，與資料庫的 DATETIME 相同），沒有或無法轉換時為 None"""
+    if not row or date_index >= len(row) or row[date_index] is None:
+        return None
+    value = pd.to_datetime(row[date_index], errors='coerce', format='mixed')
+    return None if pd.isna(value) else value.round('s').to_pydatetime()
+
+
+def _reader_position(reader, offset, date_index):
+    """讀取器目前的位置；從上次的位置繼續讀取但沒有新資料列時，最後一列沿用上次的記錄"""
+    if reader.last_row is None and reader._start is not None:
+        last_time = reader._start.last_time
+    else:
+        last_time = row_time(reader.last_row, date_index)
+    return TailPosition(reader.rows_read, offset, last_time)
+
+
+class GL860RecordBatch:
+    """欄式資料批次
+
+    每個欄位各自存成一個 list（空值為 None），logger_id / year / month 為整批共用的值
+    （year / month 不寫入資料表，用於分區和導入清單），
+    寫入資料庫時再依 RECORD_FIELDS 的順序組成 tuple，不需要逐筆建立 dict
+
+    寫入引擎（gl860_loader.py）只使用 fields / key_fields / rows() / columns() / dates()，
+    其他資料表的批次（例如 c0ai10_parser.StationRecordBatch）提供相同介面即可共用
+    """
+
+    # 寫入的欄位和自然鍵（upsert 時不更新的欄位）
+    fields = RECORD_FIELDS
+    key_fields = ('logger_id', 'record_time')
+
+    def __init__(self, year, month, record_time, channels, logger_id=DEFAULT_LOGGER_ID):
+        self.logger_id = logger_id
+        self.year = year
+        self.month = month
+        self.record_time = record_time
+        self.channels = channels
+
+    def __len__(self):
+        return len(self.record_time)
+
+    def rows(self):
+        """依 RECORD_FIELDS 順序產生每一筆資料的 tuple"""
+        n = len(self.record_time)
+        return zip(
+            repeat(self.logger_id, n),
+            self.record_time,
+            *(self.channels[field] for field in CHANNEL_FIELDS.values())
+        )
+
+    def columns(self):
+        """依 RECORD_FIELDS 順序回傳每個欄位的值 list"""
+        n = len(self.record_time)
+        return [[self.logger_id] * n, self.record_time] + [
+            self.channels[field] for field in CHANNEL_FIELDS.values()
+        ]
+
+    def dates(self):
+        """批次中出現的日期"""
+        return {t.date() for t in self.record_time}
+
+    def to_records(self):
+        """轉換成 dict 列表（檢視或除錯用，包含 year / month）"""
+        return [
+            {'logger_id': row[0], 'year': self.year, 'month': self.month,
+             **dict(zip(RECORD_FIELDS[1:], row[1:]))}
+            for row in self.rows()
+        ]
+
+
+def _to_nullable_list(series):
+    """將數值欄位轉成 Python list，NaN 轉為 None（寫入資料庫時為 NULL）"""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def convert_rows_to_batch(rows, columns, date_col, ch_cols, year, month,
+                          logger_id=DEFAULT_LOGGER_ID):
+    """以欄為單位轉換資料列
+
+    日期時間與各通道數值都是整欄一次轉換：
+    - 沒有日期時間的列直接略過
+    - 日期時間或通道數值無法轉換的列視為錯誤列並略過
+    - 空值轉為 None
+
+    回傳 (batch, invalid_count)
+    """
+    used_cols = [date_col] + [ch_cols[ch] for ch in sorted(ch_cols)]
+    df = pd.DataFrame.from_records(iter(rows), columns=columns)[used_cols]
+
+    raw_time = df[date_col]
+    has_time = raw_time.notna()
+    record_time = pd.to_datetime(raw_time, errors='coerce', format='mixed')
+    invalid = has_time & record_time.isna()
+
+    values = {}
+    for ch, col in ch_cols.items():
+        raw = df[col]
+        numeric = pd.to_numeric(raw, errors='coerce')
+        invalid |= raw.notna() & numeric.isna()
+        values[ch] = numeric
+
+    keep = has_time & ~invalid
+    record_time = record_time[keep]
+
+    channels = {}
+    for ch, field in CHANNEL_FIELDS.items():
+        if ch in values:
+            channels[field] = _to_nullable_list(values[ch][keep].astype('float64'))
+        else:
+            channels[field] = [None] * len(record_time)
+
+    batch = GL860RecordBatch(
+        year,
+        month,
+        record_time.to_numpy().astype('datetime64[us]').tolist(),
+        channels,
+        logger_id=logger_id,
+    )
+    return batch, int(invalid.sum())
+
+
+def iter_record_batches(rows, columns, date_col, ch_cols, year, month, chunk_size=None,
+                        logger_id=DEFAULT_LOGGER_ID, metrics=None):
+    """將資料列分段轉換成批次，每段最多 chunk_size 列
+
+    chunk_size 為 None 或 0 時整個檔案轉成一個批次。
+    每次產生 (batch, invalid_count)
+    metrics: FileMetrics 物件，分別記錄讀取和轉換的耗時
+    """
+    metrics = metrics or NO_METRICS
+    rows = iter(rows)
+    while True:
+        # 先讀取整段資料列再轉換，讀取和轉換的耗時可以分開計算
+        with metrics.phase('read'):
+            chunk = list(islice(rows, chunk_size) if chunk_size else rows)
+        if chunk_size and not chunk:
+            break
+        with metrics.phase('conversion'):
+            batch, invalid_count = convert_rows_to_batch(
+                chunk, columns, date_col, ch_cols, year, month, logger_id)
+        metrics.count('rows', len(batch))
+        metrics.count('invalid_rows', invalid_count)
+        yield batch, invalid_count
+        if not chunk_size:
+            break
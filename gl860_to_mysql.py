@@ -1,48 +1,62 @@
-import pandas as pd
-import mysql.connector
 from mysql.connector import Error
 import os
-from datetime import datetime
 import glob
 
+from db import bulk_load_session, get_connection, import_config, mysql_config
+from db_schema import ensure_weather_table
+from gl860_loader import (
+    DEFAULT_BATCH_SIZE, DEFAULT_COMMIT_INTERVAL, DEFAULT_ENGINE, DEFAULT_MODE, DEFAULT_TABLE,
+    BatchLoader
+)
+from gl860_parser import (
+    DEFAULT_LOGGER_ID, FILE_PATTERNS, PARSE_ERRORS, TailPosition, extract_year_month_from_filename,
+    iter_record_batches, map_channel_columns, open_sheet
+)
+from dirty_dates import DirtyDates
+from import_manifest import MANIFEST_TABLE, STATUS_UNCHANGED, ImportManifest
+from import_metrics import NO_METRICS, ImportRun
+from parallel_import import iter_parsed_workbooks
+from parse_cache import ParseCache, iter_cached_batches
+from partitions import prepare_month
+from result_cache import month_range, month_summaries
+
 class GL860DataImporter:
-    def __init__(self, host='localhost', database='weather_data', user='root', password=''):
-        """初始化資料庫連接參數"""
-        self.host = host
-        self.database = database
-        self.user = user
-        self.password = password
-        self.connection = None
+    def __init__(self, connection=None, load_engine=None, batch_size=None, commit_interval=None,
+                 duplicate_mode=None, logger_id=None, workers=None,
+                 table=DEFAULT_TABLE, manifest_table=MANIFEST_TABLE):
+        """初始化導入設定，未指定的項目使用 config.ini [Import] 的設定
+        connection: 可傳入現有的連線，否則由 create_connection 從連線池取得
+        table / manifest_table: 寫入的資料表和導入清單（重建時寫入暫存資料表）
+        """
+        settings = import_config()
+        self.database = mysql_config()['database']
+        self.load_engine = load_engine or settings.get('load_engine', DEFAULT_ENGINE)
+        self.batch_size = batch_size or settings.getint('batch_size', fallback=DEFAULT_BATCH_SIZE)
+        self.commit_interval = commit_interval or settings.getint(
+            'commit_interval', fallback=DEFAULT_COMMIT_INTERVAL)
+        self.duplicate_mode = duplicate_mode or settings.get('duplicate_mode', DEFAULT_MODE)
+        self.logger_id = logger_id or settings.get('logger_id', DEFAULT_LOGGER_ID)
+        self.workers = workers or settings.getint('workers', fallback=1)
+        self.table = table
+        self.manifest_table = manifest_table
+        self.connection = connection
+        self.owns_connection = connection is None
+        # 上次 import_all_files 導入失敗（解析或寫入失敗、沒有解析出任何記錄）的檔案
+        self.failed_files = []
+        # 解析結果快取（config.ini 的 parse_cache 關閉或沒有安裝 pyarrow 時為 None）
+        self.cache = ParseCache.from_config()
     
     def create_connection(self):
-        """建立 MySQL 連接"""
+        """從共用連線池取得 MySQL 連接（資料庫不存在時會自動創建）"""
         try:
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                database=self.database,
-                user=self.user,
-                password=self.password
-            )
+            self.connection = get_connection(create_database=True)
+            self.owns_connection = True
             if self.connection.is_connected():
                 print(f"成功連接到 MySQL 資料庫: {self.database}")
                 return True
         except Error as e:
             print(f"連接錯誤: {e}")
-            # 如果資料庫不存在，嘗試創建
-            try:
-                connection = mysql.connector.connect(
-                    host=self.host,
-                    user=self.user,
-                    password=self.password
-                )
-                cursor = connection.cursor()
-                cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.database}")
-                print(f"已創建資料庫: {self.database}")
-                connection.close()
-                return self.create_connection()
-            except Error as e2:
-                print(f"創建資料庫錯誤: {e2}")
-                return False
+            return False
     
     def create_table(self):
         """創建天氣資料表"""
@@ -50,30 +64,14 @@ class GL860DataImporter:
             print("請先建立資料庫連接")
             return False
         
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS gl860_weather_data (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            year INT NOT NULL,
-            month INT NOT NULL,
-            record_time DATETIME NOT NULL,
-            channel1_temperature DECIMAL(10, 2),
-            channel2_humidity DECIMAL(10, 2),
-            channel3_uv DECIMAL(10, 2),
-            channel4_lux DECIMAL(10, 2),
-            channel5_device_temp DECIMAL(10, 2),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            INDEX idx_year_month (year, month),
-            INDEX idx_record_time (record_time)
-        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """
-        
         try:
-            cursor = self.connection.cursor()
-            cursor.execute(create_table_query)
-            self.connection.commit()
+            # 建立資料表，舊版資料表會自動轉換成精簡結構
+            ensure_weather_table(self.connection)
+            # 導入時登記寫入過的日期，更新每日統計時只重新計算這些日期
+            DirtyDates(self.connection).ensure_table()
             print("資料表創建成功或已存在")
             return True
-        except Error as e:
+        except (Error, ValueError) as e:
             print(f"創建資料表錯誤: {e}")
             return False
     
@@ -81,104 +79,40 @@ class GL860DataImporter:
         """從檔名提取年份和月份
         例如: GL860 RAWDATA_2508.xlsx -> year=2025, month=8
         """
-        basename = os.path.basename(filename)
-        # 提取 YYMM 格式
-        parts = basename.split('_')
-        if len(parts) >= 2:
-            yymm = parts[1].replace('.xlsx', '')
-            if len(yymm) == 4:
-                year = 2000 + int(yymm[:2])  # 25 -> 2025
-                month = int(yymm[2:])         # 08 -> 8
-                return year, month
-        return None, None
+        return extract_year_month_from_filename(filename)
     
-    def parse_excel_file(self, filepath):
-        """解析 Excel 檔案"""
+    def iter_excel_batches(self, filepath, chunk_size=None, metrics=None, position=None):
+        """逐批解析 Excel 或 CSV 檔案
+        每批最多 chunk_size 筆資料列，chunk_size 為 None 時整個檔案為一批
+        metrics: FileMetrics 物件，記錄各階段的耗時
+        position: TailPosition 物件，結束時更新為檔案讀取到的位置（之後可以只導入新增的資料列）
+        """
         year, month = self.extract_year_month_from_filename(filepath)
         if not year or not month:
             print(f"無法從檔名提取年月: {filepath}")
-            return None
+            return
         
         print(f"\n處理檔案: {os.path.basename(filepath)}")
         print(f"年份: {year}, 月份: {month}")
         
-        try:
-            # 讀取第一個 sheet（通常是 YYMM 格式的 sheet name）
-            df = pd.read_excel(filepath, sheet_name=0, header=None)
-            
-            # 找到 "Data" 標記的位置
-            data_row = None
-            for idx, row in df.iterrows():
-                if row[0] == 'Data':
-                    data_row = idx
-                    break
-            
-            if data_row is None:
+        metrics = metrics or NO_METRICS
+        # 以唯讀串流方式讀取第一個 sheet（或 CSV 檔），一次掃描同時找到 Data 標記和資料列
+        with open_sheet(filepath, metrics=metrics) as reader:
+            if reader.data_row is None:
                 print("找不到資料區域")
-                return None
+                return
             
-            print(f"找到 Data 標記在第 {data_row} 行")
+            print(f"找到 Data 標記在第 {reader.data_row} 行")
             
-            # 讀取資料，跳過標題行
             # Data 標記後的第 1 行是欄位名稱（Number, Date&Time, CH1...）
             # Data 標記後的第 2 行是單位（NO., Time, degC, %, W/m2, lux, degC）
-            # 實際資料從第 3 行開始
-            # 直接從 Data 行之後讀取，使用第一行作為 header
-            df_data = pd.read_excel(
-                filepath, 
-                sheet_name=0,
-                skiprows=data_row + 2  # 跳過 Data 行和欄位名稱行，從單位行開始
-            )
-            
-            print(f"讀取到的欄位: {df_data.columns.tolist()}")
-            print(f"前 3 筆資料:\n{df_data.head(3)}")
-            
-            # 準備資料
-            records = []
+            # 以單位行作為欄位名稱，實際資料從第 3 行開始
+            columns = reader.columns
+            print(f"讀取到的欄位: {columns}")
             
             # 找到日期時間和通道欄位
-            # 根據欄位順序和名稱識別各通道
-            date_col = None
-            ch_cols = {}
-            
-            # 找出非 NO. 和 Time 的資料欄位
-            data_columns = []
-            for col in df_data.columns:
-                col_str = str(col).strip()
-                if 'time' in col_str.lower() or '時間' in col_str:
-                    date_col = col
-                elif col_str not in ['NO.', 'Number'] and not col_str.startswith('Unnamed'):
-                    data_columns.append(col)
-            
-            # 根據欄位名稱和順序映射到通道
-            # 需要智能識別：有些檔案只有3個通道，有些有5個或更多
-            # 標準順序應該是：degC(溫度), %(濕度), W/m2(UV), lux(照度), 設備溫度
-            
-            # 先統計有多少個 degC 欄位
-            degc_columns = [col for col in data_columns if 'degc' in str(col).lower()]
-            
-            for i, col in enumerate(data_columns):
-                col_str = str(col)
-                col_lower = col_str.lower()
-                
-                # Channel 1: 第一個溫度欄位
-                if 'degc' in col_lower and '.1' not in col_str and 1 not in ch_cols:
-                    ch_cols[1] = col
-                # Channel 2: 濕度
-                elif '%' in col_str or 'rh' in col_lower:
-                    ch_cols[2] = col
-                # Channel 3: UV
-                elif 'w/m2' in col_lower and '.1' not in col_str:
-                    ch_cols[3] = col
-                # Channel 4: 照度
-                elif 'lux' in col_lower:
-                    ch_cols[4] = col
-                # Channel 5: 設備溫度 - 可能是 degC.1 或者是第二個 degC 欄位
-                elif 'degc.1' in col_lower:
-                    ch_cols[5] = col
-                elif len(degc_columns) >= 2 and 'degc' in col_lower and 1 in ch_cols and col != ch_cols[1]:
-                    # 如果有兩個 degC 欄位，第二個就是設備溫度
-                    ch_cols[5] = col
+            with metrics.phase('column_mapping'):
+                date_col, ch_cols, data_columns = map_channel_columns(columns)
             
             print(f"日期欄位: {date_col}")
             print(f"資料欄位: {data_columns}")
@@ -186,117 +120,214 @@ class GL860DataImporter:
             
             if date_col is None:
                 print("警告：找不到日期時間欄位")
-                return None
-            
-            for idx, row in df_data.iterrows():
-                try:
-                    # 檢查是否有 Date&Time 資料
-                    if pd.isna(row.get(date_col)):
-                        continue
-                    
-                    # 解析日期時間
-                    date_time = row[date_col]
-                    if isinstance(date_time, str):
-                        # 如果是字串，嘗試解析
-                        date_time = pd.to_datetime(date_time)
-                    
-                    # 組合完整的 datetime
-                    record_time = date_time
-                    
-                    # 提取各通道資料，處理空值
-                    ch1_temp = float(row[ch_cols.get(1)]) if 1 in ch_cols and pd.notna(row.get(ch_cols.get(1))) else None
-                    ch2_humidity = float(row[ch_cols.get(2)]) if 2 in ch_cols and pd.notna(row.get(ch_cols.get(2))) else None
-                    ch3_uv = float(row[ch_cols.get(3)]) if 3 in ch_cols and pd.notna(row.get(ch_cols.get(3))) else None
-                    ch4_lux = float(row[ch_cols.get(4)]) if 4 in ch_cols and pd.notna(row.get(ch_cols.get(4))) else None
-                    ch5_device_temp = float(row[ch_cols.get(5)]) if 5 in ch_cols and pd.notna(row.get(ch_cols.get(5))) else None
-                    
-                    records.append({
-                        'year': year,
-                        'month': month,
-                        'record_time': record_time,
-                        'channel1_temperature': ch1_temp,
-                        'channel2_humidity': ch2_humidity,
-                        'channel3_uv': ch3_uv,
-                        'channel4_lux': ch4_lux,
-                        'channel5_device_temp': ch5_device_temp
-                    })
-                    
-                except Exception as e:
-                    print(f"處理第 {idx} 行時發生錯誤: {e}")
-                    continue
+                return
             
-            print(f"成功解析 {len(records)} 筆記錄")
-            return records
+            # 以欄為單位轉換日期時間和各通道數值
+            total = 0
+            invalid_total = 0
+            for batch, invalid_count in iter_record_batches(
+                reader, columns, date_col, ch_cols, year, month, chunk_size, self.logger_id, metrics
+            ):
+                total += len(batch)
+                invalid_total += invalid_count
+                yield batch
             
-        except Exception as e:
+            if position is not None:
+                position.update(reader.position(columns.index(date_col)))
+        
+        if invalid_total:
+            print(f"略過 {invalid_total} 筆無法轉換的資料列")
+        
+        print(f"成功解析 {total} 筆記錄")
+    
+    def iter_file_batches(self, filepath, content_hash, chunk_size=None, metrics=None, position=None):
+        """逐批取得檔案的資料：有解析快取時直接讀取，否則解析檔案並同時寫入快取"""
+        return iter_cached_batches(
+            self.cache, filepath, content_hash,
+            lambda: self.iter_excel_batches(filepath, chunk_size, metrics, position),
+            chunk_size, self.logger_id, metrics, position
+        )
+    
+    def parse_excel_file(self, filepath):
+        """解析 Excel 檔案（整個檔案為一個批次）"""
+        try:
+            batches = list(self.iter_excel_batches(filepath))
+        except PARSE_ERRORS as e:
             print(f"解析 Excel 檔案錯誤: {e}")
             return None
+        return batches[0] if batches else None
     
-    def insert_records(self, records):
-        """插入記錄到資料庫"""
-        if not self.connection or not records:
-            return False
-        
-        insert_query = """
-        INSERT INTO gl860_weather_data 
-        (year, month, record_time, channel1_temperature, channel2_humidity, 
-         channel3_uv, channel4_lux, channel5_device_temp)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    def insert_batches(self, batches, metrics=None):
+        """逐批插入記錄到資料庫，成功時回傳 BatchLoader（含筆數統計），失敗時回傳 None
+        metrics: FileMetrics 物件，記錄寫入和 commit 的耗時
         """
+        if not self.connection:
+            return None
         
+        # 依設定的寫入引擎分批插入，每 commit_interval 批 commit 一次
+        loader = BatchLoader(
+            self.connection,
+            engine=self.load_engine,
+            table=self.table,
+            mode=self.duplicate_mode,
+            commit_interval=self.commit_interval,
+            dirty_dates=DirtyDates(self.connection),
+            metrics=metrics
+        )
         try:
-            cursor = self.connection.cursor()
-            
-            # 批量插入
-            values = [
-                (
-                    r['year'],
-                    r['month'],
-                    r['record_time'],
-                    r['channel1_temperature'],
-                    r['channel2_humidity'],
-                    r['channel3_uv'],
-                    r['channel4_lux'],
-                    r['channel5_device_temp']
-                )
-                for r in records
-            ]
-            
-            cursor.executemany(insert_query, values)
-            self.connection.commit()
-            print(f"成功插入 {cursor.rowcount} 筆記錄")
-            return True
-            
+            with bulk_load_session(self.connection):
+                loader.load_batches(batches)
+            print(f"成功插入 {loader.inserted} 筆記錄")
+            return loader
         except Error as e:
             print(f"插入資料錯誤: {e}")
-            self.connection.rollback()
+            print(f"已提交 {loader.committed} 筆記錄，未提交的部分已復原")
+        except PARSE_ERRORS as e:
+            print(f"解析 Excel 檔案錯誤: {e}")
+            print(f"已提交 {loader.committed} 筆記錄，未提交的部分已復原")
+        return None
+    
+    def insert_records(self, records):
+        """插入記錄到資料庫"""
+        if not self.connection or not records:
             return False
+        return self.insert_batches([records]) is not None
     
     def import_all_files(self, folder_path='GL860'):
-        """導入指定資料夾中的所有 Excel 檔案"""
-        pattern = os.path.join(folder_path, 'GL860 RAWDATA_*.xlsx')
-        files = glob.glob(pattern)
+        """導入指定資料夾中的所有 Excel 和 CSV 檔案，回傳導入筆數
+        導入失敗的檔案記錄在 self.failed_files
+        """
+        self.failed_files = []
+        files = []
+        for pattern in FILE_PATTERNS:
+            files.extend(glob.glob(os.path.join(folder_path, pattern)))
         
         # 排除暫存檔
         files = [f for f in files if not os.path.basename(f).startswith('~$')]
         
         if not files:
             print(f"在 {folder_path} 中找不到符合條件的檔案")
-            return
+            return 0
         
         print(f"找到 {len(files)} 個檔案")
         
         # 按檔名排序
         files.sort()
         
+        manifest = ImportManifest(self.connection, self.manifest_table)
+        manifest.ensure_table()
+        files, fingerprints = self.skip_unchanged(files, manifest)
+        # 記錄每個檔案各階段的耗時，結束後寫入 import_runs
+        run = ImportRun('gl860_to_mysql')
+        
         total_records = 0
-        for filepath in files:
-            records = self.parse_excel_file(filepath)
-            if records:
-                if self.insert_records(records):
-                    total_records += len(records)
+        if not files:
+            print("所有檔案都未變更，不需要重新導入")
+        elif self.workers > 1:
+            total_records = self.import_files_parallel(files, manifest, run)
+        else:
+            # 每個檔案邊解析邊寫入，記憶體中最多只有一批資料
+            for filepath in files:
+                metrics = run.file(filepath)
+                metrics.track_connection(self.connection)
+                # 解析前已取得檔案指紋，導入成功後登記到 manifest
+                fingerprint = fingerprints[filepath]
+                year, month = self.extract_year_month_from_filename(filepath)
+                if year and month:
+                    # 分區資料表需要先有該月份的分區
+                    prepare_month(self.connection, self.table, year, month)
+                position = TailPosition()
+                loader = self.insert_batches(
+                    self.iter_file_batches(filepath, fingerprint['content_hash'], self.batch_size,
+                                           metrics, position),
+                    metrics
+                )
+                metrics.finish(self.connection)
+                metrics.print_summary()
+                if not self.loaded(filepath, loader):
+                    continue
+                total_records += loader.inserted
+                manifest.record(filepath, fingerprint, year, month, loader.processed, position)
         
         print(f"\n總共導入 {total_records} 筆記錄")
+        if self.failed_files:
+            print(f"✗ {len(self.failed_files)} 個檔案導入失敗: "
+                  + ", ".join(os.path.basename(f) for f in self.failed_files))
+        run.report(self.connection)
+        return total_records
+    
+    def month_loaded(self, year, month):
+        """資料表中是否已有該月份的資料（以 record_time 範圍查詢，只讀取主鍵的一段）"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                f"SELECT 1 FROM {self.table} WHERE record_time >= %s AND record_time < %s LIMIT 1",
+                month_range(year, month)
+            )
+            return cursor.fetchone() is not None
+        finally:
+            cursor.close()
+    
+    def skip_unchanged(self, files, manifest):
+        """排除 manifest 中未變更、且資料表中已有該月份資料的檔案，回傳 (要導入的檔案, {檔案: 指紋})
+        重建時暫存資料表的 manifest 是空的，所有檔案都會導入
+        """
+        remaining = []
+        fingerprints = {}
+        for filepath in files:
+            status, fingerprint = manifest.check(filepath)
+            year, month = self.extract_year_month_from_filename(filepath)
+            if status == STATUS_UNCHANGED and year and month and self.month_loaded(year, month):
+                print(f"✓ 未變更，略過: {os.path.basename(filepath)}")
+                continue
+            remaining.append(filepath)
+            fingerprints[filepath] = fingerprint
+        return remaining, fingerprints
+    
+    def loaded(self, filepath, loader):
+        """檔案是否導入成功，失敗（寫入失敗或沒有解析出任何記錄）時記錄到 self.failed_files"""
+        if loader is not None and loader.processed:
+            return True
+        if loader is not None:
+            print("✗ 檔案沒有解析出任何記錄")
+        self.failed_files.append(filepath)
+        return False
+    
+    def import_files_parallel(self, files, manifest, run):
+        """以多個子程序平行解析檔案，由目前的連線依檔名順序寫入，回傳導入筆數
+        run: ImportRun 物件，解析的耗時由子程序記錄，寫入的耗時由目前的程序記錄
+        """
+        print(f"平行解析模式：{self.workers} 個子程序")
+        
+        total_records = 0
+        cache_folder = self.cache.folder if self.cache is not None else None
+        for filepath, parsed, error in iter_parsed_workbooks(
+            files, self.workers, self.batch_size, self.logger_id, cache_folder=cache_folder
+        ):
+            print(f"\n處理檔案: {os.path.basename(filepath)}")
+            if error is not None:
+                print(f"解析 Excel 檔案錯誤: {error}")
+                self.failed_files.append(filepath)
+                continue
+            
+            print(f"年份: {parsed.year}, 月份: {parsed.month}")
+            if parsed.invalid_count:
+                print(f"略過 {parsed.invalid_count} 筆無法轉換的資料列")
+            print(f"成功解析 {parsed.row_count} 筆記錄")
+            
+            metrics = run.add(parsed.metrics)
+            metrics.track_connection(self.connection)
+            prepare_month(self.connection, self.table, parsed.year, parsed.month)
+            loader = self.insert_batches(parsed.batches, metrics)
+            metrics.finish(self.connection)
+            metrics.print_summary()
+            if not self.loaded(filepath, loader):
+                continue
+            total_records += loader.inserted
+            manifest.record(filepath, parsed.fingerprint, parsed.year, parsed.month, loader.processed,
+                            parsed.position)
+        
+        return total_records
     
     def verify_data(self):
         """驗證導入的資料"""
@@ -304,42 +335,19 @@ class GL860DataImporter:
             return
         
         try:
-            cursor = self.connection.cursor()
-            
-            # 統計各月份的記錄數
-            query = """
-            SELECT year, month, COUNT(*) as record_count,
-                   MIN(record_time) as first_record,
-                   MAX(record_time) as last_record
-            FROM gl860_weather_data
-            GROUP BY year, month
-            ORDER BY year, month
-            """
-            
-            cursor.execute(query)
-            results = cursor.fetchall()
+            # 各月份的彙總（兩次導入之間由結果快取回答）
+            summaries = month_summaries(self.connection)
             
             print("\n=== 資料驗證 ===")
             print(f"{'年份':<6} {'月份':<6} {'記錄數':<10} {'第一筆':<20} {'最後一筆':<20}")
             print("-" * 70)
             
-            for row in results:
-                print(f"{row[0]:<6} {row[1]:<6} {row[2]:<10} {row[3]:<20} {row[4]:<20}")
+            for row in summaries:
+                print(f"{row['year']:<6} {row['month']:<6} {row['total']:<10} {row['first_time']:<20} {row['last_time']:<20}")
             
-            # 統計各欄位的完整性
-            query2 = """
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN channel1_temperature IS NOT NULL THEN 1 ELSE 0 END) as ch1_count,
-                SUM(CASE WHEN channel2_humidity IS NOT NULL THEN 1 ELSE 0 END) as ch2_count,
-                SUM(CASE WHEN channel3_uv IS NOT NULL THEN 1 ELSE 0 END) as ch3_count,
-                SUM(CASE WHEN channel4_lux IS NOT NULL THEN 1 ELSE 0 END) as ch4_count,
-                SUM(CASE WHEN channel5_device_temp IS NOT NULL THEN 1 ELSE 0 END) as ch5_count
-            FROM gl860_weather_data
-            """
-            
-            cursor.execute(query2)
-            result = cursor.fetchone()
+            # 統計各欄位的完整性（各月份的筆數相加）
+            fields = ('total', 'ch1_count', 'ch2_count', 'ch3_count', 'ch4_count', 'ch5_count')
+            result = [sum(row[field] for row in summaries) for field in fields]
             
             print("\n=== 欄位完整性 ===")
             print(f"總記錄數: {result[0]}")
@@ -356,25 +364,29 @@ class GL860DataImporter:
             print(f"驗證資料錯誤: {e}")
     
     def close(self):
-        """關閉資料庫連接"""
-        if self.connection and self.connection.is_connected():
+        """關閉資料庫連接（歸還連線池；外部傳入的連線由呼叫端負責關閉）"""
+        if self.owns_connection and self.connection and self.connection.is_connected():
             self.connection.close()
             print("\n資料庫連接已關閉")
 
 
+def run_import(connection, folder_path='GL860'):
+    """以現有的連線導入資料夾中的所有檔案（給 pipeline.py 使用），所有檔案都導入成功時回傳 True"""
+    importer = GL860DataImporter(connection=connection)
+    if not importer.create_table():
+        return False
+    importer.import_all_files(folder_path)
+    return not importer.failed_files
+
+
 def main():
     """主程式"""
     print("=" * 70)
     print("GL860 天氣資料導入 MySQL 系統")
     print("=" * 70)
     
-    # 設定資料庫連接參數（請根據實際情況修改）
-    importer = GL860DataImporter(
-        host='localhost',
-        database='weather_data',
-        user='root',
-        password=''  # 請輸入您的 MySQL 密碼
-    )
+    # 資料庫連線和導入設定請修改 config.ini
+    importer = GL860DataImporter()
     
     # 建立連接
     if not importer.create_connection():
@@ -0,0 +1,180 @@
+"""
+導入檔案清單（manifest）
+記錄每個已導入檔案的大小、修改時間、內容雜湊和筆數，
+用來判斷檔案是新檔案、未變更或已變更，未變更的檔案不需要重新解析；
+另外記錄檔案已導入到的位置（資料列數、CSV 的位元組位置、最後一筆的時間），
+檔案只在後面增加資料時可以只導入新增的部分
+"""
+import hashlib
+import os
+
+from db_schema import column_exists
+
+MANIFEST_TABLE = 'gl860_import_manifest'
+
+# 檔案狀態
+STATUS_NEW = 'new'
+STATUS_UNCHANGED = 'unchanged'
+STATUS_CHANGED = 'changed'
+
+# 尾端導入記錄的欄位
+TAIL_COLUMNS = (
+    ('row_offset', 'INT NOT NULL DEFAULT 0 AFTER row_count'),
+    ('byte_offset', 'BIGINT NOT NULL DEFAULT 0 AFTER row_offset'),
+    ('last_record_time', 'DATETIME NULL AFTER byte_offset'),
+)
+
+
+def normalize_path(filepath):
+    """統一路徑格式作為 manifest 的鍵（使用 / 分隔）"""
+    return os.path.normpath(filepath).replace('\\', '/')
+
+
+def file_hash(filepath, chunk_size=1024 * 1024):
+    """計算檔案內容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(filepath, with_hash=True):
+    """取得檔案指紋：大小、修改時間、內容雜湊"""
+    stat = os.stat(filepath)
+    return {
+        'file_size': stat.st_size,
+        'file_mtime': stat.st_mtime,
+        'content_hash': file_hash(filepath) if with_hash else None,
+    }
+
+
+class ImportManifest:
+    """導入檔案清單資料表的存取"""
+
+    def __init__(self, connection, table=MANIFEST_TABLE):
+        self.connection = connection
+        self.table = table
+
+    def ensure_table(self):
+        """建立 manifest 資料表（若不存在）"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                file_path VARCHAR(512) NOT NULL PRIMARY KEY,
+                file_size BIGINT NOT NULL,
+                file_mtime DOUBLE NOT NULL,
+                content_hash CHAR(64) NOT NULL,
+                year INT,
+                month INT,
+                row_count INT NOT NULL DEFAULT 0,
+                row_offset INT NOT NULL DEFAULT 0,
+                byte_offset BIGINT NOT NULL DEFAULT 0,
+                last_record_time DATETIME NULL,
+                imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                INDEX idx_year_month (year, month)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """)
+            # 舊版的 manifest 沒有記錄導入位置
+            for column, definition in TAIL_COLUMNS:
+                if not column_exists(cursor, self.table, column):
+                    cursor.execute(f"ALTER TABLE {self.table} ADD COLUMN {column} {definition}")
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def get(self, filepath):
+        """取得檔案的 manifest 記錄，沒有記錄時回傳 None"""
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            cursor.execute(
+                f"SELECT * FROM {self.table} WHERE file_path = %s",
+                (normalize_path(filepath),)
+            )
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+    def check(self, filepath):
+        """判斷檔案狀態，回傳 (狀態, 指紋)
+
+        大小和修改時間都相同時視為未變更，不需要計算雜湊；
+        否則比對內容雜湊（只是被重新存檔但內容相同也視為未變更）
+        """
+        entry = self.get(filepath)
+        if entry is None:
+            return STATUS_NEW, file_fingerprint(filepath)
+
+        fingerprint = file_fingerprint(filepath, with_hash=False)
+        if (fingerprint['file_size'] == entry['file_size']
+                and fingerprint['file_mtime'] == entry['file_mtime']):
+            fingerprint['content_hash'] = entry['content_hash']
+            return STATUS_UNCHANGED, fingerprint
+
+        fingerprint['content_hash'] = file_hash(filepath)
+        if fingerprint['content_hash'] == entry['content_hash']:
+            # 內容相同，只更新修改時間，下次就不必再計算雜湊
+            self.touch(filepath, fingerprint)
+            return STATUS_UNCHANGED, fingerprint
+        return STATUS_CHANGED, fingerprint
+
+    def record(self, filepath, fingerprint, year, month, row_count, position=None):
+        """登記檔案已導入
+        position: 檔案已導入到的位置（TailPosition），沒有時下次無法只導入新增的部分
+        """
+        row_offset, byte_offset, last_time = (
+            (position.rows, position.offset, position.last_time) if position else (0, 0, None)
+        )
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                f"""
+                INSERT INTO {self.table}
+                (file_path, file_size, file_mtime, content_hash, year, month, row_count,
+                 row_offset, byte_offset, last_record_time)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    file_size = VALUES(file_size),
+                    file_mtime = VALUES(file_mtime),
+                    content_hash = VALUES(content_hash),
+                    year = VALUES(year),
+                    month = VALUES(month),
+                    row_count = VALUES(row_count),
+                    row_offset = VALUES(row_offset),
+                    byte_offset = VALUES(byte_offset),
+                    last_record_time = VALUES(last_record_time),
+                    imported_at = CURRENT_TIMESTAMP
+                """,
+                (normalize_path(filepath), fingerprint['file_size'], fingerprint['file_mtime'],
+                 fingerprint['content_hash'], year, month, row_count,
+                 row_offset, byte_offset, last_time)
+            )
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def touch(self, filepath, fingerprint):
+        """只更新檔案的修改時間和大小（內容未變更）"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                f"""
+                UPDATE {self.table}
+                SET file_size = %s, file_mtime = %s, imported_at = imported_at
+                WHERE file_path = %s
+                """,
+                (fingerprint['file_size'], fingerprint['file_mtime'], normalize_path(filepath))
+            )
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def clear(self):
+        """清空 manifest（資料表被清空重建時使用）"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"TRUNCATE TABLE {self.table}")
+            self.connection.commit()
+        finally:
+            cursor.close()
@@ -0,0 +1,283 @@
+"""
+導入過程的計時和計數
+每個檔案分別記錄各階段的耗時和筆數、讀取的位元組數、資料庫往返次數、記憶體峰值，
+整次導入的摘要存成 JSON，並寫入 import_runs 資料表，
+某個月份的導入突然變慢時可以看出是哪個階段變慢：
+
+- read:           開啟檔案、讀取資料列
+- marker_scan:    尋找 Data 標記和單位列
+- column_mapping: 識別日期欄位和各通道
+- conversion:     轉換日期時間和數值
+- insert:         寫入資料庫
+- commit:         登記待更新統計的日期並 commit
+"""
+import json
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from mysql.connector import Error
+
+RUNS_TABLE = 'import_runs'
+RUNS_FOLDER = 'import_runs'
+PHASES = ('read', 'marker_scan', 'column_mapping', 'conversion', 'insert', 'commit')
+PHASE_LABELS = {
+    'read': '讀取',
+    'marker_scan': '尋找標記',
+    'column_mapping': '欄位對應',
+    'conversion': '轉換',
+    'insert': '寫入',
+    'commit': 'commit',
+}
+
+
+def peak_rss_mb():
+    """目前程序的記憶體峰值（MB），無法取得時為 None"""
+    try:
+        import resource
+    except ImportError:
+        # Windows 沒有 resource 模組
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 的單位是 KB，macOS 是 bytes
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def session_round_trips(connection):
+    """目前連線送出的查詢數（MySQL 的 Questions 狀態值，本身也算一次）"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SHOW SESSION STATUS LIKE 'Questions'")
+        return int(cursor.fetchone()[1])
+    finally:
+        cursor.close()
+
+
+def _rate(rows, seconds):
+    return round(rows / seconds) if seconds else None
+
+
+class NullMetrics:
+    """不記錄任何資料（沒有指定 metrics 時使用）"""
+
+    def phase(self, name):
+        return nullcontext()
+
+    def count(self, name, value=1):
+        pass
+
+    def track_connection(self, connection):
+        pass
+
+    def finish(self, connection=None):
+        pass
+
+    def print_summary(self):
+        pass
+
+
+NO_METRICS = NullMetrics()
+
+
+class FileMetrics:
+    """單一檔案的各階段耗時和計數
+
+        metrics = FileMetrics(filepath)
+        with metrics.phase('read'):
+            ...
+        metrics.count('rows', len(batch))
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.counters = Counter()
+        self.peak_memory_mb = None
+        self._round_trips = None
+        if os.path.exists(filepath):
+            self.counters['bytes_read'] = os.path.getsize(filepath)
+
+    @contextmanager
+    def phase(self, name):
+        """累計 with 區塊的耗時到指定階段"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def track_connection(self, connection):
+        """開始計算資料庫往返次數"""
+        self._round_trips = session_round_trips(connection)
+
+    def finish(self, connection=None):
+        """結束記錄：計算資料庫往返次數和記憶體峰值"""
+        if connection is not None and self._round_trips is not None:
+            # 扣除開始和結束時查詢 Questions 本身
+            self.counters['db_round_trips'] = session_round_trips(connection) - self._round_trips - 1
+        # 在子程序解析時保留子程序的記憶體峰值
+        peaks = [v for v in (self.peak_memory_mb, peak_rss_mb()) if v is not None]
+        self.peak_memory_mb = max(peaks) if peaks else None
+
+    @property
+    def seconds(self):
+        return sum(self.phases.values())
+
+    def to_dict(self):
+        rows = self.counters['rows']
+        return {
+            'file': os.path.basename(self.filepath),
+            'seconds': round(self.seconds, 3),
+            'rows': rows,
+            'rows_per_second': _rate(rows, self.seconds),
+            'phases': {name: round(value, 3) for name, value in self.phases.items()},
+            'counters': dict(self.counters),
+            'peak_memory_mb': self.peak_memory_mb,
+        }
+
+    def print_summary(self):
+        """顯示各階段的耗時（一行）"""
+        phases = "，".join(
+            f"{PHASE_LABELS.get(name, name)} {value:.2f}" for name, value in self.phases.items()
+        )
+        rate = _rate(self.counters['rows'], self.seconds)
+        print(f"  階段耗時（秒）: {phases}" + (f"（{rate} 筆/秒）" if rate else ""))
+
+
+class ImportRun:
+    """整次導入的記錄，包含每個檔案的 FileMetrics"""
+
+    def __init__(self, script):
+        self.script = script
+        self.started_at = datetime.now()
+        self.finished_at = None
+        self._start = time.perf_counter()
+        self.seconds = None
+        self.files = []
+
+    def file(self, filepath):
+        """開始記錄一個檔案"""
+        metrics = FileMetrics(filepath)
+        self.files.append(metrics)
+        return metrics
+
+    def add(self, metrics):
+        """加入在其他地方建立的 FileMetrics（例如子程序解析的結果）"""
+        self.files.append(metrics)
+        return metrics
+
+    def finish(self):
+        self.finished_at = datetime.now()
+        self.seconds = time.perf_counter() - self._start
+
+    def summary(self):
+        """整次導入的摘要 dict"""
+        if self.finished_at is None:
+            self.finish()
+        phases = dict.fromkeys(PHASES, 0.0)
+        counters = Counter()
+        for metrics in self.files:
+            for name, value in metrics.phases.items():
+                phases[name] = phases.get(name, 0.0) + value
+            counters.update(metrics.counters)
+        peaks = [m.peak_memory_mb for m in self.files if m.peak_memory_mb is not None]
+        return {
+            'script': self.script,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': self.finished_at.isoformat(timespec='seconds'),
+            'seconds': round(self.seconds, 3),
+            'files': len(self.files),
+            'rows': counters['rows'],
+            'rows_per_second': _rate(counters['rows'], self.seconds),
+            'phases': {name: round(value, 3) for name, value in phases.items()},
+            'counters': dict(counters),
+            'peak_memory_mb': max(peaks) if peaks else peak_rss_mb(),
+            'per_file': [metrics.to_dict() for metrics in self.files],
+        }
+
+    def print_summary(self, summary=None):
+        """顯示各階段的總耗時"""
+        summary = summary or self.summary()
+        print("\n=== 導入耗時 ===")
+        print(f"{'階段':<16}{'秒':>10}")
+        print("-" * 26)
+        for name, value in summary['phases'].items():
+            print(f"{PHASE_LABELS.get(name, name):<16}{value:>10.2f}")
+        print("-" * 26)
+        print(f"{'總計':<16}{summary['seconds']:>10.2f}")
+        print(f"共 {summary['files']} 個檔案、{summary['rows']} 筆記錄"
+              f"（{summary['rows_per_second'] or 0} 筆/秒），"
+              f"資料庫往返 {summary['counters'].get('db_round_trips', 0)} 次，"
+              f"記憶體峰值 {summary['peak_memory_mb']} MB")
+
+    def write_json(self, summary=None, folder=RUNS_FOLDER):
+        """將摘要存成 import_runs/YYYYmmdd-HHMMSS-<script>.json，回傳檔案路徑"""
+        summary = summary or self.summary()
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(
+            folder, f"{self.started_at.strftime('%Y%m%d-%H%M%S')}-{self.script}.json"
+        )
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return path
+
+    def save(self, connection, summary=None, table=RUNS_TABLE):
+        """將摘要寫入 import_runs 資料表"""
+        summary = summary or self.summary()
+        ensure_runs_table(connection, table)
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                f"""
+                INSERT INTO {table}
+                (script, started_at, finished_at, file_count, row_count, seconds,
+                 rows_per_second, peak_memory_mb, summary)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """,
+                (self.script, self.started_at, self.finished_at, summary['files'], summary['rows'],
+                 summary['seconds'], summary['rows_per_second'], summary['peak_memory_mb'],
+                 json.dumps(summary, ensure_ascii=False))
+            )
+            connection.commit()
+        finally:
+            cursor.close()
+
+    def report(self, connection):
+        """顯示摘要並存成 JSON 和寫入 import_runs（記錄失敗不影響導入結果）"""
+        summary = self.summary()
+        self.print_summary(summary)
+        print(f"導入記錄已寫入 {self.write_json(summary)}")
+        try:
+            self.save(connection, summary)
+        except Error as e:
+            print(f"✗ 無法寫入 {RUNS_TABLE}: {e}")
+
+
+def ensure_runs_table(connection, table=RUNS_TABLE):
+    """建立 import_runs 資料表（若不存在）"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            script VARCHAR(64) NOT NULL,
+            started_at DATETIME NOT NULL,
+            finished_at DATETIME NOT NULL,
+            file_count INT NOT NULL,
+            row_count INT NOT NULL,
+            seconds DOUBLE NOT NULL,
+            rows_per_second DOUBLE,
+            peak_memory_mb DOUBLE,
+            summary JSON NOT NULL,
+            INDEX idx_started_at (started_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
+        connection.commit()
+    finally:
+        cursor.close()
@@ -0,0 +1,369 @@
+"""
+索引建議工具
+對 MySQL_deployment.sql 中的每個查詢執行 EXPLAIN FORMAT=JSON，
+列出全表掃描、filesort、暫存表，並建議（或直接建立）能改善這些查詢的索引：
+
+- 生成欄位 record_date = DATE(record_time)、hour_of_day = HOUR(record_time)（STORED），
+  查詢中的 DATE(record_time) / HOUR(record_time) 可以直接使用生成欄位上的索引
+- (year, month, 數值欄位) 索引，極端值子查詢和 > 門檻值 + ORDER BY 不必掃描整個月份並排序
+
+    python index_advisor.py              # 只分析並列出建議
+    python index_advisor.py --apply      # 建立建議的索引，並比較建立前後每個查詢的耗時
+    python index_advisor.py --seed       # 資料表是空的時先導入 GL860 資料夾
+
+結果會寫入 index_advisor_report.json
+--apply 建立的生成欄位和索引會登記在 gl860_schema_extensions（見 db_schema.py），
+之後 pipeline.py --shadow 或結構轉換重建資料表時會一併建立
+"""
+import argparse
+import json
+import re
+import time
+from datetime import datetime
+
+from mysql.connector import Error
+
+from db import get_connection
+from db_schema import (
+    EXTENSION_COLUMN, EXTENSION_INDEX, WEATHER_TABLE, column_exists, index_exists, register_extension,
+)
+
+CATALOG_PATH = 'MySQL_deployment.sql'
+REPORT_PATH = 'index_advisor_report.json'
+DEFAULT_REPEAT = 3
+
+
+class IndexCandidate:
+    """建議的索引
+
+    columns: 需要先建立的生成欄位 [(欄位名稱, 欄位定義), ...]
+    pattern: 查詢內容符合此正規表示式、且有全表掃描或 filesort 時才建議
+    """
+
+    def __init__(self, name, definition, pattern, reason, columns=()):
+        self.name = name
+        self.definition = definition
+        self.pattern = re.compile(pattern, re.IGNORECASE)
+        self.reason = reason
+        self.columns = list(columns)
+
+
+CANDIDATES = [
+    IndexCandidate(
+        'idx_ym_record_date', '(year, month, record_date)',
+        r'DATE\(record_time\)',
+        '依日期分組的查詢（DATE(record_time)）',
+        columns=[('record_date', 'DATE AS (DATE(record_time)) STORED')],
+    ),
+    IndexCandidate(
+        'idx_ym_hour', '(year, month, hour_of_day, channel1_temperature, channel2_humidity)',
+        r'HOUR\(record_time\)',
+        '時段分析（HOUR(record_time)），同時涵蓋溫度和濕度，不必讀取資料列',
+        columns=[('hour_of_day', 'TINYINT AS (HOUR(record_time)) STORED')],
+    ),
+    IndexCandidate(
+        'idx_ym_temperature', '(year, month, channel1_temperature)',
+        r'(MAX|MIN)\(channel1_temperature\)|channel1_temperature\s*[<>=]',
+        '溫度極端值子查詢和溫度門檻查詢',
+    ),
+    IndexCandidate(
+        'idx_ym_humidity', '(year, month, channel2_humidity)',
+        r'channel2_humidity\s*[<>]',
+        '濕度門檻查詢',
+    ),
+    IndexCandidate(
+        'idx_ym_uv', '(year, month, channel3_uv)',
+        r'channel3_uv\s*[<>]',
+        'UV 門檻查詢',
+    ),
+]
+
+
+def load_catalog(path=CATALOG_PATH):
+    """讀取查詢範例，回傳 [(標題, SQL), ...]（只保留 SELECT）
+
+    標題為查詢前最後一行註解
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+
+    queries = []
+    title = None
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('--'):
+            comment = stripped.lstrip('-').strip()
+            if comment and not set(comment) <= set('='):
+                title = comment
+            continue
+        if not stripped and not lines:
+            continue
+        lines.append(line)
+        if stripped.endswith(';'):
+            sql = '\n'.join(lines).strip().rstrip(';').strip()
+            lines = []
+            if sql.upper().startswith('SELECT'):
+                queries.append((title or sql.splitlines()[0], sql))
+    return queries
+
+
+def _walk(node):
+    """走訪 EXPLAIN JSON 的所有節點"""
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def analyze_plan(plan):
+    """從 EXPLAIN FORMAT=JSON 的結果找出全表掃描、全索引掃描、filesort、暫存表"""
+    result = {
+        'full_scans': [],
+        'index_scans': [],
+        'filesort': False,
+        'temporary': False,
+        'rows_examined': 0,
+    }
+    for node in _walk(plan):
+        if node.get('using_filesort'):
+            result['filesort'] = True
+        if node.get('using_temporary_table'):
+            result['temporary'] = True
+        table = node.get('table')
+        if isinstance(table, dict) and 'access_type' in table:
+            name = table.get('table_name')
+            if table['access_type'] == 'ALL':
+                result['full_scans'].append(name)
+            elif table['access_type'] == 'index':
+                result['index_scans'].append(name)
+            result['rows_examined'] += int(table.get('rows_examined_per_scan', 0) or 0)
+    return result
+
+
+def explain(cursor, sql):
+    """執行 EXPLAIN FORMAT=JSON，回傳 (分析結果, 原始計畫)"""
+    cursor.execute("EXPLAIN FORMAT=JSON " + sql)
+    plan = json.loads(cursor.fetchone()[0])
+    return analyze_plan(plan), plan
+
+
+def time_query(cursor, sql, repeat=DEFAULT_REPEAT):
+    """執行查詢 repeat 次，回傳最佳耗時（秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql)
+        cursor.fetchall()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def measure(connection, queries, repeat=DEFAULT_REPEAT):
+    """分析並計時每個查詢，回傳與 queries 順序相同的結果列表（標題可能重複）"""
+    cursor = connection.cursor()
+    results = []
+    try:
+        for _, sql in queries:
+            try:
+                analysis, _ = explain(cursor, sql)
+                analysis['seconds'] = time_query(cursor, sql, repeat)
+            except Error as e:
+                analysis = {'error': str(e)}
+            results.append(analysis)
+    finally:
+        cursor.close()
+    return results
+
+
+def needs_help(analysis):
+    """查詢是否有全表掃描或 filesort"""
+    return bool(analysis.get('full_scans') or analysis.get('filesort'))
+
+
+def propose(connection, queries, results):
+    """依查詢內容和分析結果建議索引，回傳 [(候選索引, 受影響的查詢標題), ...]（已存在的索引不列入）"""
+    cursor = connection.cursor()
+    try:
+        proposals = []
+        for candidate in CANDIDATES:
+            if index_exists(cursor, WEATHER_TABLE, candidate.name):
+                continue
+            titles = [title for (title, sql), analysis in zip(queries, results)
+                      if candidate.pattern.search(sql) and needs_help(analysis)]
+            if titles:
+                proposals.append((candidate, titles))
+        return proposals
+    finally:
+        cursor.close()
+
+
+def register_candidate(connection, candidate):
+    """把候選索引和它的生成欄位登記到 db_schema，之後重建資料表時一併建立"""
+    for name, definition in candidate.columns:
+        register_extension(connection, EXTENSION_COLUMN, name, definition)
+    register_extension(connection, EXTENSION_INDEX, candidate.name,
+                       f"INDEX {candidate.name} {candidate.definition}")
+
+
+def apply_candidate(connection, candidate):
+    """建立生成欄位和索引（一個 ALTER TABLE 完成），並登記到 db_schema 讓重建資料表時保留"""
+    cursor = connection.cursor()
+    try:
+        clauses = [
+            f"ADD COLUMN {name} {definition}"
+            for name, definition in candidate.columns
+            if not column_exists(cursor, WEATHER_TABLE, name)
+        ]
+        clauses.append(f"ADD INDEX {candidate.name} {candidate.definition}")
+        cursor.execute(f"ALTER TABLE {WEATHER_TABLE} " + ", ".join(clauses))
+        cursor.execute(f"ANALYZE TABLE {WEATHER_TABLE}")
+        cursor.fetchall()
+    finally:
+        cursor.close()
+    register_candidate(connection, candidate)
+
+
+def register_existing(connection):
+    """登記之前已建立（但還沒登記）的建議索引，回傳登記的索引名稱"""
+    cursor = connection.cursor()
+    try:
+        existing = [candidate for candidate in CANDIDATES
+                    if index_exists(cursor, WEATHER_TABLE, candidate.name)]
+    finally:
+        cursor.close()
+    for candidate in existing:
+        register_candidate(connection, candidate)
+    return [candidate.name for candidate in existing]
+
+
+def print_results(queries, results, previous=None):
+    """顯示每個查詢的分析結果（有 previous 時一併顯示建立索引前的耗時）"""
+    for i, ((title, _), analysis) in enumerate(zip(queries, results), 1):
+        if 'error' in analysis:
+            print(f"{i:>2}. {title}\n    ✗ {analysis['error']}")
+            continue
+        flags = []
+        if analysis['full_scans']:
+            flags.append("全表掃描")
+        if analysis['index_scans']:
+            flags.append("全索引掃描")
+        if analysis['filesort']:
+            flags.append("filesort")
+        if analysis['temporary']:
+            flags.append("暫存表")
+        timing = f"{analysis['seconds'] * 1000:.1f} ms"
+        if previous and 'seconds' in previous[i - 1]:
+            before = previous[i - 1]['seconds']
+            timing = f"{before * 1000:.1f} ms -> {timing}"
+        print(f"{i:>2}. {title}")
+        print(f"    {timing}，檢查 {analysis['rows_examined']} 筆"
+              f"{'，' + '、'.join(flags) if flags else ''}")
+
+
+def seed_if_empty(connection):
+    """資料表是空的時導入 GL860 資料夾"""
+    from gl860_to_mysql import run_import
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT COUNT(*) FROM {WEATHER_TABLE}")
+        count = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if count == 0:
+        print("資料表是空的，先導入 GL860 資料夾")
+        run_import(connection)
+
+
+def write_report(path, queries, before, proposals, applied, after):
+    """將分析結果寫入 JSON"""
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'proposals': [
+            {'index': c.name, 'definition': c.definition, 'reason': c.reason,
+             'generated_columns': [name for name, _ in c.columns], 'queries': titles}
+            for c, titles in proposals
+        ],
+        'applied': applied,
+        'queries': [
+            {'title': title, 'sql': sql, 'before': before[i],
+             'after': after[i] if after else None}
+            for i, (title, sql) in enumerate(queries)
+        ],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MySQL_deployment.sql 查詢的索引建議')
+    parser.add_argument('--catalog', default=CATALOG_PATH, help='查詢範例檔案')
+    parser.add_argument('--apply', action='store_true', help='建立建議的索引並比較前後耗時')
+    parser.add_argument('--seed', action='store_true', help='資料表是空的時先導入 GL860 資料夾')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='每個查詢執行次數')
+    parser.add_argument('--output', default=REPORT_PATH, help='結果 JSON 檔案')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("索引建議")
+    print("=" * 70)
+
+    queries = load_catalog(args.catalog)
+    print(f"從 {args.catalog} 讀取 {len(queries)} 個查詢")
+
+    try:
+        connection = get_connection()
+    except Error as e:
+        print(f"✗ 連接失敗: {e}")
+        return
+
+    try:
+        if args.seed:
+            seed_if_empty(connection)
+
+        print("\n=== 目前的執行計畫 ===")
+        before = measure(connection, queries, args.repeat)
+        print_results(queries, before)
+
+        proposals = propose(connection, queries, before)
+        print("\n=== 建議的索引 ===")
+        if not proposals:
+            print("沒有需要新增的索引")
+        for candidate, titles in proposals:
+            columns = ''.join(f"\n    生成欄位: {name} {definition}" for name, definition in candidate.columns)
+            print(f"- {candidate.name} {candidate.definition}：{candidate.reason}{columns}")
+            print(f"    影響 {len(titles)} 個查詢")
+
+        applied = []
+        after = []
+        if args.apply:
+            registered = register_existing(connection)
+            if registered:
+                print(f"\n已登記既有的索引: {', '.join(registered)}")
+        if args.apply and proposals:
+            print("\n=== 建立索引 ===")
+            for candidate, _ in proposals:
+                try:
+                    start = time.perf_counter()
+                    apply_candidate(connection, candidate)
+                    print(f"✓ {candidate.name}（{time.perf_counter() - start:.1f} 秒）")
+                    applied.append(candidate.name)
+                except Error as e:
+                    print(f"✗ {candidate.name}: {e}")
+
+            print("\n=== 建立索引後 ===")
+            after = measure(connection, queries, args.repeat)
+            print_results(queries, after, previous=before)
+
+        write_report(args.output, queries, before, proposals, applied, after)
+        print(f"\n結果已寫入 {args.output}")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
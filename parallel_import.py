@@ -0,0 +1,111 @@
+"""
+平行解析 GL860 檔案
+由多個子程序同時解析 Excel（CPU 密集），主程序依檔名順序取得結果並寫入資料庫，
+確保每個月份仍依序 commit
+"""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from gl860_parser import (
+    DEFAULT_LOGGER_ID, PARSE_ERRORS, TailPosition, extract_year_month_from_filename,
+    iter_record_batches, map_channel_columns, open_sheet
+)
+from import_manifest import file_fingerprint
+from import_metrics import FileMetrics
+from parse_cache import ParseCache, iter_cached_batches, parquet_available
+
+
+class ParsedWorkbook:
+    """子程序解析一個檔案的結果"""
+
+    def __init__(self, filepath, year, month, fingerprint, batches, invalid_count, metrics=None,
+                 position=None):
+        self.filepath = filepath
+        self.year = year
+        self.month = month
+        self.fingerprint = fingerprint
+        self.batches = batches
+        self.invalid_count = invalid_count
+        self.metrics = metrics
+        # 檔案讀取到的位置（TailPosition），登記到 manifest 供之後只導入新增的資料列
+        self.position = position
+
+    @property
+    def row_count(self):
+        return sum(len(batch) for batch in self.batches)
+
+
+def parse_workbook(filepath, chunk_size=None, logger_id=DEFAULT_LOGGER_ID, cache_folder=None):
+    """解析一個檔案（在子程序中執行），回傳 ParsedWorkbook
+
+    解析前先取得檔案指紋，供寫入成功後登記到 manifest；
+    解析各階段的耗時記錄在 metrics 中，由主程序繼續記錄寫入的耗時
+    cache_folder: 解析結果快取的資料夾，有快取時直接讀取（見 parse_cache.py）
+    """
+    year, month = extract_year_month_from_filename(filepath)
+    if not year or not month:
+        raise ValueError(f"無法從檔名提取年月: {filepath}")
+
+    fingerprint = file_fingerprint(filepath)
+    metrics = FileMetrics(filepath)
+    cache = ParseCache(cache_folder) if cache_folder and parquet_available() else None
+    position = TailPosition()
+    invalid_counts = []
+
+    def parse():
+        with open_sheet(filepath, metrics=metrics) as reader:
+            if reader.data_row is None:
+                raise ValueError("找不到資料區域")
+
+            with metrics.phase('column_mapping'):
+                date_col, ch_cols, _ = map_channel_columns(reader.columns)
+            if date_col is None:
+                raise ValueError("找不到日期時間欄位")
+
+            for batch, invalid_count in iter_record_batches(
+                reader, reader.columns, date_col, ch_cols, year, month, chunk_size, logger_id, metrics
+            ):
+                invalid_counts.append(invalid_count)
+                yield batch
+            position.update(reader.position(reader.columns.index(date_col)))
+
+    batches = list(iter_cached_batches(
+        cache, filepath, fingerprint['content_hash'], parse, chunk_size, logger_id, metrics, position
+    ))
+
+    # 子程序的記憶體峰值
+    metrics.finish()
+    return ParsedWorkbook(filepath, year, month, fingerprint, batches, sum(invalid_counts), metrics,
+                          position)
+
+
+def iter_parsed_workbooks(files, workers, chunk_size=None, logger_id=DEFAULT_LOGGER_ID,
+                          max_pending=None, cache_folder=None):
+    """以 workers 個子程序平行解析檔案，依 files 的順序產生 (filepath, 結果, 錯誤)
+
+    同時在解析中或等待寫入的檔案最多 max_pending 個（預設為 workers 的 2 倍），
+    寫入速度跟不上時不會無限制地佔用記憶體
+    """
+    max_pending = max_pending or workers * 2
+    files = iter(files)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+
+        def submit_next():
+            filepath = next(files, None)
+            if filepath is not None:
+                pending.append(
+                    (filepath, executor.submit(parse_workbook, filepath, chunk_size, logger_id, cache_folder))
+                )
+
+        for _ in range(max_pending):
+            submit_next()
+
+        while pending:
+            filepath, future = pending.popleft()
+            submit_next()
+            try:
+                yield filepath, future.result(), None
+            except PARSE_ERRORS as e:
+                yield filepath, None, e
@@ -0,0 +1,282 @@
+"""
+解析結果快取
+將 GL860 檔案解析後的資料（year, month, record_time, channel1~5）存成 Parquet 檔，
+以檔案內容的 SHA-256 作為鍵。舊月份的檔案不會再變更，重建資料庫、結構遷移或補資料時
+直接讀取快取，不必再以 openpyxl / pandas 解析 Excel，導入速度只受資料庫寫入速度限制：
+
+    parse_cache/<內容雜湊>.parquet   解析結果
+    parse_cache/<內容雜湊>.json      年月、筆數、檔案讀取到的位置（最後寫入，代表快取完整）
+
+鍵只有檔案內容，年月一律由讀取時的檔名決定（內容相同但檔名不同的檔案不會沿用快取中的年月）
+
+需要安裝 pyarrow（選用套件，沒有安裝時照常解析 Excel）：
+    pip install pyarrow
+
+    python parse_cache.py            # 顯示快取的檔案數和大小
+    python parse_cache.py --prune    # 刪除 GL860 資料夾中已經沒有對應檔案的快取
+"""
+import argparse
+import glob
+import json
+import os
+from datetime import datetime
+
+from db import import_config
+from gl860_parser import (
+    CHANNEL_FIELDS, DEFAULT_LOGGER_ID, FILE_PATTERNS, GL860RecordBatch, TailPosition,
+    extract_year_month_from_filename
+)
+from import_manifest import file_hash
+from import_metrics import NO_METRICS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # pyarrow 為選用套件
+    pa = pq = None
+
+DEFAULT_CACHE_FOLDER = 'parse_cache'
+
+# 解析規則改變時（例如欄位對應或數值轉換的方式）增加版本，舊的快取就不再使用
+CACHE_VERSION = 1
+
+
+def parquet_available():
+    """是否已安裝 pyarrow"""
+    return pq is not None
+
+
+def _schema():
+    return pa.schema(
+        [('year', pa.int16()), ('month', pa.int8()), ('record_time', pa.timestamp('us'))]
+        + [(field, pa.float64()) for field in CHANNEL_FIELDS.values()]
+    )
+
+
+class CacheWriter:
+    """邊解析邊寫入快取，全部寫完才以 commit 讓快取生效（寫到一半失敗時 abort 刪除暫存檔）"""
+
+    def __init__(self, cache, content_hash):
+        self.cache = cache
+        self.content_hash = content_hash
+        self.tmp_path = cache.data_path(content_hash) + '.tmp'
+        self.writer = pq.ParquetWriter(self.tmp_path, _schema())
+        self.rows = 0
+        self.year = None
+        self.month = None
+
+    def write(self, batch):
+        n = len(batch)
+        self.year, self.month = batch.year, batch.month
+        if n == 0:
+            return
+        columns = {
+            'year': [batch.year] * n,
+            'month': [batch.month] * n,
+            'record_time': batch.record_time,
+        }
+        columns.update(batch.channels)
+        self.writer.write_table(pa.table(columns, schema=_schema()))
+        self.rows += n
+
+    def commit(self, position=None):
+        """寫入完成：Parquet 檔改為正式名稱，再寫入描述檔"""
+        self.writer.close()
+        os.replace(self.tmp_path, self.cache.data_path(self.content_hash))
+        meta = {
+            'version': CACHE_VERSION,
+            'year': self.year,
+            'month': self.month,
+            'rows': self.rows,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        if position is not None:
+            meta['position'] = {
+                'rows': position.rows,
+                'offset': position.offset,
+                'last_time': position.last_time.isoformat() if position.last_time else None,
+            }
+        meta_path = self.cache.meta_path(self.content_hash)
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def abort(self):
+        self.writer.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class ParseCache:
+    """以檔案內容雜湊為鍵的解析結果快取"""
+
+    def __init__(self, folder=DEFAULT_CACHE_FOLDER):
+        self.folder = folder
+
+    @classmethod
+    def from_config(cls):
+        """依 config.ini [Import] 的 parse_cache / cache_folder 建立，關閉或沒有 pyarrow 時回傳 None"""
+        settings = import_config()
+        if not settings.getboolean('parse_cache', fallback=True) or not parquet_available():
+            return None
+        return cls(settings.get('cache_folder', DEFAULT_CACHE_FOLDER))
+
+    def data_path(self, content_hash):
+        return os.path.join(self.folder, f"{content_hash}.parquet")
+
+    def meta_path(self, content_hash):
+        return os.path.join(self.folder, f"{content_hash}.json")
+
+    def lookup(self, content_hash):
+        """快取的描述資料，沒有快取或版本不同時回傳 None"""
+        try:
+            with open(self.meta_path(content_hash), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != CACHE_VERSION or not os.path.exists(self.data_path(content_hash)):
+            return None
+        return meta
+
+    def writer(self, content_hash):
+        os.makedirs(self.folder, exist_ok=True)
+        return CacheWriter(self, content_hash)
+
+    def read_batches(self, content_hash, meta, chunk_size=None, logger_id=DEFAULT_LOGGER_ID,
+                     year=None, month=None):
+        """讀取快取，產生 GL860RecordBatch（chunk_size 為 None 時整個檔案為一批）
+        year / month: 批次的年月（由目前的檔名取得），未指定時使用快取記錄的年月
+        """
+        if year is None or month is None:
+            year, month = meta['year'], meta['month']
+        parquet = pq.ParquetFile(self.data_path(content_hash))
+        columns = ['record_time'] + list(CHANNEL_FIELDS.values())
+        if chunk_size:
+            tables = parquet.iter_batches(batch_size=chunk_size, columns=columns)
+        else:
+            tables = [parquet.read(columns=columns)]
+        for table in tables:
+            yield GL860RecordBatch(
+                year,
+                month,
+                table.column('record_time').to_pylist(),
+                {field: table.column(field).to_pylist() for field in CHANNEL_FIELDS.values()},
+                logger_id=logger_id,
+            )
+
+    def entries(self):
+        """快取中的所有內容雜湊"""
+        return sorted(
+            os.path.basename(path)[:-len('.json')]
+            for path in glob.glob(os.path.join(self.folder, '*.json'))
+        )
+
+    def remove(self, content_hash):
+        for path in (self.meta_path(content_hash), self.data_path(content_hash)):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def position_from_meta(meta):
+    """快取記錄的檔案讀取位置（TailPosition），沒有記錄時為 None"""
+    saved = meta.get('position')
+    if not saved:
+        return None
+    last_time = datetime.fromisoformat(saved['last_time']) if saved['last_time'] else None
+    return TailPosition(saved['rows'], saved['offset'], last_time)
+
+
+def iter_cached_batches(cache, filepath, content_hash, parse, chunk_size=None,
+                        logger_id=DEFAULT_LOGGER_ID, metrics=None, position=None):
+    """有快取時讀取快取，否則呼叫 parse() 解析並同時寫入快取
+
+    parse: 不需要參數、產生 GL860RecordBatch 的函式（例如 importer.iter_excel_batches 的 partial）；
+           解析結束時會更新 position（檔案讀取到的位置），一併記錄在快取中
+    position: TailPosition 物件，讀取快取時更新為快取記錄的位置
+    """
+    metrics = metrics or NO_METRICS
+    # 年月由目前的檔名決定，無法從檔名取得時照常解析（由 parse 顯示錯誤）
+    year, month = extract_year_month_from_filename(filepath)
+    if cache is None or content_hash is None or not year or not month:
+        yield from parse()
+        return
+
+    meta = cache.lookup(content_hash)
+    if meta is not None:
+        print(f"\n{os.path.basename(filepath)}: 從解析快取讀取 {meta['rows']} 筆記錄")
+        metrics.count('cache_hits')
+        batches = cache.read_batches(content_hash, meta, chunk_size, logger_id, year, month)
+        while True:
+            with metrics.phase('read'):
+                batch = next(batches, None)
+            if batch is None:
+                break
+            metrics.count('rows', len(batch))
+            yield batch
+        cached_position = position_from_meta(meta)
+        if position is not None and cached_position is not None:
+            position.update(cached_position)
+        return
+
+    metrics.count('cache_misses')
+    writer = cache.writer(content_hash)
+    try:
+        for batch in parse():
+            writer.write(batch)
+            yield batch
+    except BaseException:
+        # 解析或寫入資料庫失敗（或沒有讀完）時不留下不完整的快取
+        writer.abort()
+        raise
+    if writer.year is None:
+        # 沒有解析出任何批次（例如找不到資料區域），不建立快取
+        writer.abort()
+        return
+    writer.commit(position)
+
+
+def hash_files(files):
+    """檔案的內容雜湊 -> 檔案路徑"""
+    return {file_hash(filepath): filepath for filepath in files}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GL860 解析結果快取')
+    parser.add_argument('--folder', default='GL860', help='GL860 檔案所在資料夾')
+    parser.add_argument('--prune', action='store_true', help='刪除已經沒有對應檔案的快取')
+    args = parser.parse_args()
+
+    if not parquet_available():
+        print("✗ 未安裝 pyarrow，無法使用解析快取（pip install pyarrow）")
+        return
+
+    settings = import_config()
+    cache = ParseCache(settings.get('cache_folder', DEFAULT_CACHE_FOLDER))
+    entries = cache.entries()
+    size = sum(
+        os.path.getsize(path) for h in entries
+        for path in (cache.data_path(h), cache.meta_path(h)) if os.path.exists(path)
+    )
+    print(f"快取資料夾 {cache.folder}：{len(entries)} 個檔案，{size / 1024 / 1024:.1f} MB")
+
+    files = []
+    for pattern in FILE_PATTERNS:
+        files.extend(f for f in glob.glob(os.path.join(args.folder, pattern))
+                     if not os.path.basename(f).startswith('~$'))
+    current = hash_files(files)
+    for content_hash in entries:
+        meta = cache.lookup(content_hash)
+        label = os.path.basename(current[content_hash]) if content_hash in current else '（沒有對應的檔案）'
+        rows = meta['rows'] if meta else '舊版本'
+        print(f"  {content_hash[:12]}  {label}  {rows} 筆")
+
+    if args.prune:
+        stale = [h for h in entries if h not in current or cache.lookup(h) is None]
+        for content_hash in stale:
+            cache.remove(content_hash)
+        print(f"✓ 已刪除 {len(stale)} 個快取")
+
+
+if __name__ == "__main__":
+    main()
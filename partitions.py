@@ -0,0 +1,336 @@
+"""
+gl860_weather_data 依月份分區（RANGE COLUMNS(record_time)）
+每個月一個分區 pYYYYMM，另有 p_before（最早月份之前）和 pmax（最後月份之後）：
+
+- 以月份篩選的查詢只會讀取相關的分區（partition pruning）
+- 以 replace 重新導入某個月份時，以 EXCHANGE PARTITION 或 TRUNCATE PARTITION 整個替換，
+  成本只與該月份的資料量有關，也不會留下刪除造成的碎片
+- 導入前會自動補上需要的月份分區，並預先建立未來幾個月的分區
+
+將現有的資料表轉換成分區資料表（資料量大時需要一些時間）：
+    python partitions.py
+"""
+import argparse
+from datetime import date, datetime
+
+from mysql.connector import Error
+
+from db import get_connection, import_config
+from dirty_dates import DirtyDates
+from gl860_loader import DEFAULT_TABLE
+
+BEFORE_PARTITION = 'p_before'
+MAX_PARTITION = 'pmax'
+DEFAULT_MONTHS_AHEAD = 3
+
+# 建立分區資料表時的分區定義（只有 pmax，導入時再依月份切分）
+PARTITION_CLAUSE = f"PARTITION BY RANGE COLUMNS(record_time) (PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE))"
+
+
+def partitioning_enabled():
+    """config.ini 是否設定以月份分區"""
+    return import_config().getboolean('partition_by_month', fallback=False)
+
+
+def months_ahead():
+    """預先建立未來幾個月的分區"""
+    return import_config().getint('partitions_ahead', fallback=DEFAULT_MONTHS_AHEAD)
+
+
+def partition_name(year, month):
+    """月份分區名稱，例如 2025 年 7 月 -> p202507"""
+    return f"p{year:04d}{month:02d}"
+
+
+def add_months(year, month, count):
+    """(year, month) 加上 count 個月"""
+    index = year * 12 + (month - 1) + count
+    return index // 12, index % 12 + 1
+
+
+def month_range(first, last):
+    """first 到 last（含）之間的所有 (year, month)"""
+    months = []
+    current = first
+    while current <= last:
+        months.append(current)
+        current = add_months(*current, 1)
+    return months
+
+
+def month_bound(year, month):
+    """月份分區的上限（下個月第一天）"""
+    return "'%04d-%02d-01'" % add_months(year, month, 1)
+
+
+def month_days(year, month):
+    """月份中的所有日期"""
+    next_year, next_month = add_months(year, month, 1)
+    days = (date(next_year, next_month, 1) - date(year, month, 1)).days
+    return {date(year, month, day) for day in range(1, days + 1)}
+
+
+def list_partitions(cursor, table):
+    """資料表的分區名稱（依範圍排序），沒有分區時回傳空列表"""
+    cursor.execute(
+        """
+        SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+        """,
+        (table,)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def is_partitioned(connection, table):
+    """資料表是否已分區"""
+    cursor = connection.cursor()
+    try:
+        return bool(list_partitions(cursor, table))
+    finally:
+        cursor.close()
+
+
+def _month_partitions(names):
+    """分區名稱中的月份分區 -> [(year, month), ...]"""
+    months = []
+    for name in names:
+        if name.startswith('p') and name[1:].isdigit() and len(name) == 7:
+            months.append((int(name[1:5]), int(name[5:7])))
+    return sorted(months)
+
+
+def _partition_definitions(months):
+    return ", ".join(
+        f"PARTITION {partition_name(*m)} VALUES LESS THAN ({month_bound(*m)})" for m in months
+    )
+
+
+def ensure_partitions(connection, table, first, last):
+    """確保 first 到 last（含）的每個月份都有自己的分區
+
+    較晚的月份由 pmax 切分，較早的月份由 p_before 切分；
+    這兩個分區平常沒有資料，切分時幾乎不需要搬移資料。
+    資料表沒有分區時不做任何事，回傳新增的分區數
+    """
+    cursor = connection.cursor()
+    try:
+        names = list_partitions(cursor, table)
+        if not names:
+            return 0
+        existing = _month_partitions(names)
+
+        if not existing:
+            # 只有 pmax：切成 p_before + 月份分區 + pmax
+            added = month_range(first, last)
+            year, month = first
+            cursor.execute(
+                f"ALTER TABLE {table} REORGANIZE PARTITION {MAX_PARTITION} INTO ("
+                f"PARTITION {BEFORE_PARTITION} VALUES LESS THAN ('{year:04d}-{month:02d}-01'), "
+                f"{_partition_definitions(added)}, "
+                f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE))"
+            )
+            return len(added)
+
+        added = 0
+        lowest, highest = existing[0], existing[-1]
+        if last > highest:
+            later = month_range(add_months(*highest, 1), last)
+            cursor.execute(
+                f"ALTER TABLE {table} REORGANIZE PARTITION {MAX_PARTITION} INTO ("
+                f"{_partition_definitions(later)}, "
+                f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE))"
+            )
+            added += len(later)
+        if first < lowest and BEFORE_PARTITION in names:
+            earlier = month_range(first, add_months(*lowest, -1))
+            year, month = first
+            cursor.execute(
+                f"ALTER TABLE {table} REORGANIZE PARTITION {BEFORE_PARTITION} INTO ("
+                f"PARTITION {BEFORE_PARTITION} VALUES LESS THAN ('{year:04d}-{month:02d}-01'), "
+                f"{_partition_definitions(earlier)})"
+            )
+            added += len(earlier)
+        return added
+    finally:
+        cursor.close()
+
+
+def prepare_month(connection, table, year, month):
+    """導入某個月份前，確保該月份到未來幾個月都有分區（資料表沒有分區時不做任何事）"""
+    today = date.today()
+    last = max((year, month), add_months(today.year, today.month, months_ahead()))
+    added = ensure_partitions(connection, table, (year, month), last)
+    if added:
+        print(f"  新增 {added} 個月份分區到 {table}")
+    return added
+
+
+def partition_table(connection, table):
+    """將現有的資料表轉換成依月份分區
+
+    分區資料表的每個唯一鍵都必須包含分區欄位；主鍵 (record_time, logger_id) 本來就包含 record_time，
+    尚未轉換成精簡結構的舊版資料表主鍵改為 (id, record_time)
+    """
+    cursor = connection.cursor()
+    try:
+        if list_partitions(cursor, table):
+            print(f"{table} 已經是分區資料表")
+            return False
+
+        cursor.execute(f"SELECT MIN(record_time), MAX(record_time) FROM {table}")
+        first_time, last_time = cursor.fetchone()
+        today = date.today()
+        first = (first_time.year, first_time.month) if first_time else (today.year, today.month)
+        last = max((last_time.year, last_time.month) if last_time else first,
+                   add_months(today.year, today.month, months_ahead()))
+
+        cursor.execute(
+            """
+            SELECT COUNT(*) FROM information_schema.KEY_COLUMN_USAGE
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+              AND CONSTRAINT_NAME = 'PRIMARY' AND COLUMN_NAME = 'record_time'
+            """,
+            (table,)
+        )
+        if not cursor.fetchone()[0]:
+            print("  主鍵改為 (id, record_time)")
+            cursor.execute(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, record_time)")
+        print(f"  建立分區 {partition_name(*first)} ~ {partition_name(*last)}")
+        year, month = first
+        cursor.execute(
+            f"ALTER TABLE {table} PARTITION BY RANGE COLUMNS(record_time) ("
+            f"PARTITION {BEFORE_PARTITION} VALUES LESS THAN ('{year:04d}-{month:02d}-01'), "
+            f"{_partition_definitions(month_range(first, last))}, "
+            f"PARTITION {MAX_PARTITION} VALUES LESS THAN (MAXVALUE))"
+        )
+        return True
+    finally:
+        cursor.close()
+
+
+def has_other_loggers(connection, table, year, month, logger_id):
+    """某個月份是否有其他 logger_id 的資料（這時不能以分區交換替換整個月份）"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            f"SELECT 1 FROM {table} WHERE record_time >= %s AND record_time < %s AND logger_id <> %s LIMIT 1",
+            (datetime(year, month, 1), datetime(*add_months(year, month, 1), 1), logger_id)
+        )
+        return cursor.fetchone() is not None
+    finally:
+        cursor.close()
+
+
+def truncate_month(connection, table, year, month, dirty_dates=None):
+    """清空某個月份的分區（只影響該月份）
+
+    dirty_dates: DirtyDates 物件，該月份的所有日期會登記為待更新統計
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"ALTER TABLE {table} TRUNCATE PARTITION {partition_name(year, month)}")
+        if dirty_dates is not None:
+            dirty_dates.mark(month_days(year, month))
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def replace_month(connection, table, year, month, load, dirty_dates=None):
+    """以新資料整個替換某個月份的分區
+
+    load: 接收暫存資料表名稱的函式，將該月份的資料寫入暫存資料表，回傳任意結果
+    先寫入結構相同、沒有分區的暫存資料表，再以 EXCHANGE PARTITION 交換，
+    舊資料（該月份所有 logger_id 的資料）隨暫存資料表一起刪除。新資料有不屬於該月份的記錄時交換會失敗，
+    暫存資料表沒有資料時不交換（ValueError），原資料都不受影響。
+    回傳 load 的結果
+    """
+    staging = f"{table}_{partition_name(year, month)}"
+    prepare_month(connection, table, year, month)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(f"CREATE TABLE {staging} LIKE {table}")
+        cursor.execute(f"ALTER TABLE {staging} REMOVE PARTITIONING")
+
+        result = load(staging)
+
+        # 暫存資料表沒有資料時不交換，避免清空整個月份
+        cursor.execute(f"SELECT 1 FROM {staging} LIMIT 1")
+        if cursor.fetchone() is None:
+            raise ValueError(f"暫存資料表 {staging} 沒有資料，{year}年{month}月 的分區維持不變")
+
+        cursor.execute(
+            f"ALTER TABLE {table} EXCHANGE PARTITION {partition_name(year, month)} WITH TABLE {staging}"
+        )
+        if dirty_dates is not None:
+            # 舊資料有、新資料沒有的日期也需要重新計算
+            dirty_dates.mark(month_days(year, month))
+        connection.commit()
+        return result
+    finally:
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        finally:
+            cursor.close()
+
+
+def show_partitions(connection, table):
+    """顯示每個分區的資料筆數（InnoDB 的估計值）"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            """
+            SELECT PARTITION_NAME, PARTITION_DESCRIPTION, TABLE_ROWS
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+            """,
+            (table,)
+        )
+        print(f"\n{'分區':<12}{'上限':<16}{'筆數(估計)':>12}")
+        print("-" * 40)
+        for name, bound, rows in cursor.fetchall():
+            print(f"{name:<12}{str(bound).strip(chr(39)):<16}{rows:>12}")
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='gl860_weather_data 月份分區管理')
+    parser.add_argument('--truncate', metavar='YYYY-MM', help='清空指定月份的分區')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("gl860_weather_data 月份分區")
+    print("=" * 70)
+
+    try:
+        connection = get_connection()
+    except Error as e:
+        print(f"✗ 連接失敗: {e}")
+        return
+
+    try:
+        if args.truncate:
+            year, month = (int(v) for v in args.truncate.split('-'))
+            dirty_dates = DirtyDates(connection)
+            dirty_dates.ensure_table()
+            truncate_month(connection, DEFAULT_TABLE, year, month, dirty_dates)
+            print(f"✓ 已清空 {year}年{month}月 的分區")
+        else:
+            if partition_table(connection, DEFAULT_TABLE):
+                print("✓ 已轉換成分區資料表")
+            today = date.today()
+            prepare_month(connection, DEFAULT_TABLE, today.year, today.month)
+        show_partitions(connection, DEFAULT_TABLE)
+    except Error as e:
+        print(f"✗ 分區操作失敗: {e}")
+    finally:
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+資料庫更新流程
+在同一個程序中依序執行各步驟，所有步驟共用同一個連線，模組也只載入一次：
+
+    clear  清除資料表中的舊資料
+    import 重新導入所有 GL860 檔案
+    verify 驗證導入結果          （需要 import）
+    stats  更新統計資料表和視圖  （需要 import）
+
+某個步驟失敗時，依賴它的步驟會被略過，其他步驟照常執行。
+例如統計步驟失敗後，只要重新執行統計即可，不必重新導入：
+
+    python pipeline.py --only stats
+    python pipeline.py --from-step verify
+
+加上 --shadow 時不清空正式資料表，改為寫入暫存資料表後換表，
+重建期間查詢仍看得到完整的舊資料：
+
+    load   將所有檔案導入暫存資料表 gl860_weather_data_new（只有主鍵）
+    index  資料寫入完成後一次建立次要索引
+    swap   以一個 RENAME TABLE 換成正式資料表，並刪除舊資料表
+
+會清除資料時需要確認，排程執行時加上 --yes：
+
+    python pipeline.py --yes
+"""
+import argparse
+import sys
+import time
+
+from mysql.connector import Error
+
+from clear_data import clear_table
+from create_statistics import update_statistics
+from data_generations import DataGenerations
+from db import get_connection
+from db_schema import (
+    WEATHER_TABLE, build_secondary_indexes, create_shadow_table, ensure_weather_table,
+    shadow_name, swap_tables
+)
+from dirty_dates import DirtyDates
+from gl860_to_mysql import GL860DataImporter, run_import
+from import_manifest import MANIFEST_TABLE, ImportManifest
+from verify_import import verify_import
+
+# 步驟執行結果
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+STATUS_SKIPPED = 'skipped'
+
+STATUS_LABELS = {
+    STATUS_OK: '✓ 成功',
+    STATUS_FAILED: '✗ 失敗',
+    STATUS_SKIPPED: '- 略過',
+}
+
+
+class PipelineStep:
+    """流程中的一個步驟
+
+    run: 接收連線的函式，成功時回傳 True
+    depends: 必須先成功的步驟名稱
+    """
+
+    def __init__(self, name, title, run, depends=()):
+        self.name = name
+        self.title = title
+        self.run = run
+        self.depends = tuple(depends)
+
+
+def clear_step(connection):
+    """清除舊資料（資料表不存在時先建立，全新的資料庫也能執行）"""
+    ensure_weather_table(connection)
+    return clear_table(connection)
+
+
+def load_shadow_step(connection, folder_path='GL860'):
+    """建立空的暫存資料表和暫存導入清單，將所有檔案導入暫存資料表
+    任何檔案導入失敗時回傳 False，不會以不完整的暫存資料表換表
+    """
+    table = create_shadow_table(connection, WEATHER_TABLE)
+    manifest = ImportManifest(connection, shadow_name(MANIFEST_TABLE))
+    manifest.ensure_table()
+    manifest.clear()
+    DirtyDates(connection).ensure_table()
+    print(f"寫入暫存資料表: {table}")
+
+    importer = GL860DataImporter(connection=connection, table=table, manifest_table=manifest.table)
+    importer.import_all_files(folder_path)
+    return not importer.failed_files
+
+
+def index_step(connection):
+    """在暫存資料表建立次要索引"""
+    build_secondary_indexes(connection, shadow_name(WEATHER_TABLE))
+    return True
+
+
+def swap_step(connection):
+    """將暫存資料表和暫存導入清單一起換成正式資料表"""
+    swap_tables(connection, [
+        (WEATHER_TABLE, shadow_name(WEATHER_TABLE)),
+        (MANIFEST_TABLE, shadow_name(MANIFEST_TABLE)),
+    ])
+    # 換表後所有月份的快取結果一起失效
+    DataGenerations(connection).bump_all()
+    connection.commit()
+    print(f"已換表: {shadow_name(WEATHER_TABLE)} -> {WEATHER_TABLE}")
+    return True
+
+
+STEPS = [
+    PipelineStep('clear', '清除資料表中的舊資料', clear_step),
+    PipelineStep('import', '重新導入所有 GL860 檔案的資料', run_import, depends=('clear',)),
+    PipelineStep('verify', '驗證導入結果', verify_import, depends=('import',)),
+    PipelineStep('stats', '更新統計資料表和視圖', update_statistics, depends=('import',)),
+]
+
+# 不清空正式資料表的重建流程：寫入暫存資料表，建立索引後換表
+SHADOW_STEPS = [
+    PipelineStep('load', '將所有 GL860 檔案導入暫存資料表', load_shadow_step),
+    PipelineStep('index', '在暫存資料表建立索引', index_step, depends=('load',)),
+    PipelineStep('swap', '以暫存資料表取代正式資料表', swap_step, depends=('index',)),
+    PipelineStep('verify', '驗證導入結果', verify_import, depends=('swap',)),
+    PipelineStep('stats', '更新統計資料表和視圖', update_statistics, depends=('swap',)),
+]
+
+
+def ordered_steps(steps=STEPS):
+    """依相依關係排序步驟（相依的步驟一定排在前面，其餘維持定義順序）"""
+    by_name = {step.name: step for step in steps}
+    ordered = []
+    visiting = set()
+    done = set()
+
+    def visit(step):
+        if step.name in done:
+            return
+        if step.name in visiting:
+            raise ValueError(f"步驟相依關係有循環: {step.name}")
+        visiting.add(step.name)
+        for name in step.depends:
+            if name not in by_name:
+                raise ValueError(f"步驟 {step.name} 依賴不存在的步驟: {name}")
+            visit(by_name[name])
+        visiting.discard(step.name)
+        done.add(step.name)
+        ordered.append(step)
+
+    for step in steps:
+        visit(step)
+    return ordered
+
+
+def select_steps(only=None, from_step=None, steps=STEPS):
+    """選出要執行的步驟
+
+    only: 只執行這些步驟
+    from_step: 從這個步驟開始執行到最後
+    """
+    ordered = ordered_steps(steps)
+    names = [step.name for step in ordered]
+    for name in list(only or []) + ([from_step] if from_step else []):
+        if name not in names:
+            raise ValueError(f"未知的步驟: {name}（可用: {', '.join(names)}）")
+
+    if only:
+        return [step for step in ordered if step.name in only]
+    if from_step:
+        return ordered[names.index(from_step):]
+    return ordered
+
+
+def run_pipeline(connection, steps):
+    """依序執行步驟，回傳每個步驟的 (步驟, 狀態, 耗時秒數)
+
+    依賴的步驟在這次執行中失敗或被略過時，這個步驟會被略過；
+    不在這次執行範圍內的相依步驟視為已完成
+    """
+    results = []
+    status_by_name = {}
+    for step in steps:
+        blocked = [name for name in step.depends
+                   if status_by_name.get(name, STATUS_OK) != STATUS_OK]
+        if blocked:
+            print(f"\n略過 {step.name}：{', '.join(blocked)} 未成功")
+            status_by_name[step.name] = STATUS_SKIPPED
+            results.append((step, STATUS_SKIPPED, 0.0))
+            continue
+
+        print(f"\n{'='*70}")
+        print(f"執行: {step.name} - {step.title}")
+        print('='*70)
+
+        start = time.perf_counter()
+        try:
+            ok = step.run(connection)
+        except Exception as e:
+            print(f"\n錯誤: {e}")
+            connection.rollback()
+            ok = False
+        elapsed = time.perf_counter() - start
+
+        status = STATUS_OK if ok else STATUS_FAILED
+        print(f"\n{STATUS_LABELS[status]}: {step.name}（{elapsed:.2f} 秒）")
+        status_by_name[step.name] = status
+        results.append((step, status, elapsed))
+    return results
+
+
+def print_timings(results):
+    """顯示每個步驟的結果和耗時"""
+    print("\n" + "="*70)
+    print("各步驟耗時")
+    print("="*70)
+    print(f"{'步驟':<10}{'結果':<10}{'耗時(秒)':>10}")
+    print("-" * 32)
+    for step, status, elapsed in results:
+        print(f"{step.name:<10}{STATUS_LABELS[status]:<10}{elapsed:>10.2f}")
+    print("-" * 32)
+    print(f"{'合計':<20}{sum(r[2] for r in results):>10.2f}")
+
+
+def build_parser():
+    """命令列參數"""
+    names = sorted({step.name for step in STEPS + SHADOW_STEPS})
+    parser = argparse.ArgumentParser(description='GL860 資料庫更新流程')
+    parser.add_argument('--shadow', action='store_true',
+                        help='寫入暫存資料表後再換表，重建期間不清空正式資料表')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--only', nargs='+', metavar='STEP', choices=names,
+                       help=f"只執行指定的步驟（{', '.join(names)}）")
+    group.add_argument('--from-step', metavar='STEP', choices=names,
+                       help='從指定的步驟開始執行到最後')
+    parser.add_argument('--yes', '-y', action='store_true', help='不詢問，直接清除資料')
+    return parser
+
+
+def run(steps):
+    """執行選出的步驟，全部成功時回傳 True"""
+    try:
+        connection = get_connection(create_database=True)
+    except Error as e:
+        print(f"連接錯誤: {e}")
+        return False
+
+    try:
+        results = run_pipeline(connection, steps)
+    finally:
+        connection.close()
+
+    print_timings(results)
+    return all(status == STATUS_OK for _, status, _ in results)
+
+
+def main():
+    """主程式，全部步驟成功時回傳 True（參數錯誤、用戶取消或有步驟失敗時回傳 False）"""
+    args = build_parser().parse_args()
+    try:
+        steps = select_steps(only=args.only, from_step=args.from_step,
+                             steps=SHADOW_STEPS if args.shadow else STEPS)
+    except ValueError as e:
+        print(e)
+        return False
+
+    print("="*70)
+    print("GL860 資料庫更新程式")
+    print("="*70)
+    print("\n此程式會執行以下步驟：")
+    for i, step in enumerate(steps, 1):
+        print(f"{i}. {step.title}")
+    print("\n" + "="*70)
+
+    # 會清除資料時先詢問用戶確認；沒有終端機（排程執行）時必須加上 --yes
+    if any(step.name == 'clear' for step in steps) and not args.yes:
+        if not sys.stdin.isatty():
+            print("\n會清除資料表中的資料，排程執行時請加上 --yes")
+            return False
+        response = input("\n是否繼續？(y/n): ").strip().lower()
+        if response != 'y':
+            print("\n已取消操作")
+            return False
+
+    return run(steps)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,394 @@
+"""
+讀取 API
+以 asyncio 提供 HTTP/JSON 查詢服務，儀表板和其他程式透過 API 讀取資料，不必各自連接 MySQL：
+
+    python read_api.py                          # http://127.0.0.1:8860
+    python read_api.py --host 0.0.0.0 --port 8080
+
+    GET /daily?start=2025-07-01&end=2025-08-01&channels=temperature,humidity
+    GET /hourly?start=2025-07-01&end=2025-07-02
+    GET /monthly?start=2025-07-01&end=2025-10-01&logger_id=GL860
+    GET /range?start=2025-07-01&end=2025-07-02&logger_id=GL860     原始資料
+    GET /latest?logger_id=GL860&limit=10                            最新的資料列
+
+- /daily、/hourly、/monthly 由彙總資料表（rollups.py）回答，每個時間單位、每個記錄器一筆
+  （加上 logger_id 時只查詢該記錄器），
+  範圍沒有對齊整天 / 整點時才讀取原始資料；還沒建立彙總資料表時也改為讀取原始資料
+- /range 分段讀取並以 chunked 編碼串流回傳，長時間範圍不必整個放在記憶體中
+- 同時執行的查詢數不超過連線池大小（config.ini [MySQL] pool_size），其餘請求排隊等待
+- 資料庫查詢在執行緒中執行，不會阻塞其他連線
+- /daily、/hourly、/monthly 的結果存入查詢結果快取（result_cache.py），資料版本改變之前重複的請求不必再讀取資料表
+
+ReadAPI 的 connect 參數可以換成任何回傳 DB-API 連線的函式（例如測試用的資料庫），
+查詢結果也可以不經過 HTTP，直接呼叫 ReadAPI.query 取得
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from mysql.connector import Error, errorcode
+
+from data_generations import RAW_SOURCE, STATISTICS_SOURCE, DataGenerations
+from db import DEFAULT_POOL_SIZE, get_connection, mysql_config
+from gl860_parser import RECORD_FIELDS
+from result_cache import default_cache
+from rollups import RAW_TABLE, SOURCE_RAW, build_query
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8860
+
+# /range 每次從資料庫讀取、送出的筆數
+STREAM_ROWS = 2000
+
+# /latest 最多回傳的筆數
+MAX_LATEST = 1000
+
+# 各端點對應的統計時間單位
+RESOLUTION_PATHS = {
+    '/hourly': 'hour',
+    '/daily': 'day',
+    '/monthly': 'month',
+}
+
+
+class RequestError(Exception):
+    """請求參數錯誤（回傳 400）"""
+
+
+def json_default(value):
+    """JSON 無法直接表示的資料庫型別"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    raise TypeError(f"無法轉換成 JSON: {type(value).__name__}")
+
+
+def to_json(value):
+    return json.dumps(value, ensure_ascii=False, default=json_default)
+
+
+def parse_time(params, name):
+    """查詢參數中的時間（2025-07-01 或 2025-07-01 12:00），沒有提供時為 None"""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise RequestError(f"{name} 的時間格式錯誤: {value}") from None
+
+
+def parse_limit(params, default, maximum):
+    value = params.get('limit')
+    if not value:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise RequestError(f"limit 必須是整數: {value}") from None
+    if not 1 <= limit <= maximum:
+        raise RequestError(f"limit 必須介於 1 和 {maximum} 之間")
+    return limit
+
+
+def range_query(start, end, logger_id=None, after=None, limit=STREAM_ROWS):
+    """原始資料時間範圍的一頁（依主鍵 (record_time, logger_id) 的順序）
+
+    after: 上一頁最後一筆的 (record_time, logger_id)，由主鍵接著往後讀取，不必跳過前面的資料列
+    """
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append("record_time >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("record_time < %s")
+        params.append(end)
+    if logger_id:
+        conditions.append("logger_id = %s")
+        params.append(logger_id)
+    if after is not None:
+        conditions.append("(record_time, logger_id) > (%s, %s)")
+        params.extend(after)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return f"""
+        SELECT {', '.join(RECORD_FIELDS)}
+        FROM {RAW_TABLE}
+        {where}
+        ORDER BY record_time, logger_id
+        LIMIT %s
+    """, tuple(params) + (limit,)
+
+
+def latest_query(logger_id, limit):
+    """最新的資料列（由主鍵的尾端往回讀取）"""
+    where = "WHERE logger_id = %s" if logger_id else ""
+    params = (logger_id,) if logger_id else ()
+    return f"""
+        SELECT {', '.join(RECORD_FIELDS)}
+        FROM {RAW_TABLE}
+        {where}
+        ORDER BY record_time DESC
+        LIMIT %s
+    """, params + (limit,)
+
+
+class ReadAPI:
+    """查詢服務：以有上限的連線數執行查詢
+
+    connect: 取得資料庫連線的函式（預設從共用連線池取得），close() 時歸還連線
+    max_connections: 同時使用的連線數上限（預設為連線池大小）；使用共用連線池時不超過連線池大小，
+                     超過的請求在 Semaphore 上排隊，而不是從連線池取得連線時失敗（PoolError）
+    """
+
+    def __init__(self, connect=get_connection, max_connections=None):
+        self.connect = connect
+        pool_size = mysql_config().getint('pool_size', fallback=DEFAULT_POOL_SIZE)
+        self.max_connections = max_connections or pool_size
+        if connect is get_connection and self.max_connections > pool_size:
+            print(f"⚠ 同時連線數 {self.max_connections} 超過連線池大小，改為 {pool_size}"
+                  f"（請調整 config.ini [MySQL] pool_size）")
+            self.max_connections = pool_size
+        self.slots = None
+        self.executor = ThreadPoolExecutor(max_workers=self.max_connections,
+                                           thread_name_prefix='read_api')
+
+    def _slots(self):
+        # Semaphore 需要在事件迴圈中建立
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_connections)
+        return self.slots
+
+    async def run(self, function, *args):
+        """在執行緒中執行會阻塞的資料庫操作"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    def _fetch(self, query, params, dictionary=False):
+        """以一個連線執行查詢並取回所有結果"""
+        connection = self.connect()
+        try:
+            cursor = connection.cursor(dictionary=dictionary)
+            try:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+        finally:
+            connection.close()
+
+    def _generation(self, source):
+        """資料庫的識別和資料來源目前的版本（結果快取的鍵）"""
+        connection = self.connect()
+        try:
+            generations = DataGenerations(connection)
+            return generations.scope(), tuple(sorted(generations.snapshot(source).items()))
+        finally:
+            connection.close()
+
+    def _cached_fetch(self, query, params, source):
+        """彙總查詢的結果在資料版本改變之前由結果快取回答，重新整理儀表板時不必再讀取資料表"""
+        scope, version = self._generation(RAW_SOURCE if source == SOURCE_RAW else STATISTICS_SOURCE)
+        return default_cache().cached(
+            ('read_api', scope, query, tuple(params)), version,
+            lambda: self._fetch(query, params, dictionary=True),
+        )
+
+    def _statistics(self, params, resolution):
+        start = parse_time(params, 'start')
+        end = parse_time(params, 'end')
+        channels = [c for c in params.get('channels', '').split(',') if c] or None
+        logger_id = params.get('logger_id') or None
+        try:
+            query, query_params, source = build_query(start, end, resolution, channels, logger_id=logger_id)
+        except ValueError as e:
+            raise RequestError(str(e)) from None
+        try:
+            rows = self._cached_fetch(query, query_params, source)
+        except Error as e:
+            if source == SOURCE_RAW or e.errno != errorcode.ER_NO_SUCH_TABLE:
+                raise
+            # 還沒建立彙總資料表
+            query, query_params, source = build_query(start, end, resolution, channels, SOURCE_RAW, logger_id)
+            rows = self._cached_fetch(query, query_params, source)
+        return {'source': source, 'rows': rows}
+
+    def _latest(self, params):
+        limit = parse_limit(params, 1, MAX_LATEST)
+        query, query_params = latest_query(params.get('logger_id'), limit)
+        return {'rows': self._fetch(query, query_params, dictionary=True)}
+
+    async def query(self, path, params):
+        """執行 /hourly、/daily、/monthly、/latest 查詢，回傳可轉換成 JSON 的 dict"""
+        if path in RESOLUTION_PATHS:
+            function, args = self._statistics, (params, RESOLUTION_PATHS[path])
+        elif path == '/latest':
+            function, args = self._latest, (params,)
+        else:
+            raise LookupError(path)
+        async with self._slots():
+            return await self.run(function, *args)
+
+    async def stream_range(self, params):
+        """逐頁產生 /range 的 JSON 內容（字串）
+
+        每一頁各自取得和歸還連線，長時間範圍的串流不會一直佔用連線，其他請求可以在頁與頁之間執行
+        """
+        start = parse_time(params, 'start')
+        end = parse_time(params, 'end')
+        if start is not None and end is not None and start >= end:
+            raise RequestError("start 必須早於 end")
+        logger_id = params.get('logger_id')
+
+        after = None
+        opening = '{"source": "raw", "rows": ['
+        first = True
+        while True:
+            query, query_params = range_query(start, end, logger_id, after)
+            async with self._slots():
+                rows = await self.run(self._fetch, query, query_params)
+            if rows:
+                body = ', '.join(to_json(dict(zip(RECORD_FIELDS, row))) for row in rows)
+                yield (opening if first else ', ') + body
+                first = False
+            if len(rows) < STREAM_ROWS:
+                break
+            # RECORD_FIELDS 的前兩個欄位為 logger_id, record_time
+            after = (rows[-1][1], rows[-1][0])
+        yield (opening if first else '') + ']}'
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class HttpServer:
+    """最小的 HTTP/1.1 伺服器：只處理 GET，每個請求回應後關閉連線"""
+
+    def __init__(self, api, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.api = api
+        self.host = host
+        self.port = port
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        print(f"✓ 讀取 API 已啟動: http://{self.host}:{self.port}（按 Ctrl+C 結束）")
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        started = time.perf_counter()
+        method = path = '-'
+        status = HTTPStatus.INTERNAL_SERVER_ERROR
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            # 讀取並略過標頭
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+            if len(request_line) != 3:
+                status = HTTPStatus.BAD_REQUEST
+                await self.send_json(writer, status, {'error': '無效的請求'})
+                return
+            method, target, _ = request_line
+            url = urlsplit(target)
+            path = url.path.rstrip('/') or '/'
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            status = await self.dispatch(writer, method, path, params)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # 用戶端提前斷線
+            pass
+        finally:
+            print(f"[{time.strftime('%H:%M:%S')}] {method} {path} {int(status)} "
+                  f"{time.perf_counter() - started:.3f}s")
+            writer.close()
+
+    async def dispatch(self, writer, method, path, params):
+        """處理請求並回應，回傳 HTTP 狀態碼"""
+        if method != 'GET':
+            await self.send_json(writer, HTTPStatus.METHOD_NOT_ALLOWED, {'error': '只支援 GET'})
+            return HTTPStatus.METHOD_NOT_ALLOWED
+        try:
+            if path == '/range':
+                return await self.send_stream(writer, self.api.stream_range(params))
+            result = await self.api.query(path, params)
+        except RequestError as e:
+            await self.send_json(writer, HTTPStatus.BAD_REQUEST, {'error': str(e)})
+            return HTTPStatus.BAD_REQUEST
+        except LookupError:
+            endpoints = ['/range', '/latest'] + list(RESOLUTION_PATHS)
+            await self.send_json(writer, HTTPStatus.NOT_FOUND,
+                                 {'error': f"找不到 {path}", 'endpoints': endpoints})
+            return HTTPStatus.NOT_FOUND
+        except Error as e:
+            await self.send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"資料庫錯誤: {e}"})
+            return HTTPStatus.INTERNAL_SERVER_ERROR
+        await self.send_json(writer, HTTPStatus.OK, result)
+        return HTTPStatus.OK
+
+    @staticmethod
+    def _head(status, headers):
+        lines = [f"HTTP/1.1 {int(status)} {status.phrase}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def send_json(self, writer, status, body):
+        data = to_json(body).encode('utf-8')
+        writer.write(self._head(status, {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Content-Length': len(data),
+            'Connection': 'close',
+        }) + data)
+        await writer.drain()
+
+    async def send_stream(self, writer, chunks):
+        """以 chunked 編碼逐段送出
+
+        第一段產生前的錯誤（參數或查詢錯誤）仍可回傳一般的錯誤回應；
+        送出途中發生錯誤時直接中斷連線，用戶端會收到不完整的回應而不是錯誤的資料
+        """
+        chunk = await anext(chunks)
+        writer.write(self._head(HTTPStatus.OK, {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Transfer-Encoding': 'chunked',
+            'Connection': 'close',
+        }))
+        try:
+            while chunk is not None:
+                data = chunk.encode('utf-8')
+                writer.write(f"{len(data):X}\r\n".encode('latin-1') + data + b'\r\n')
+                # 等待用戶端接收，送出速度不會超過用戶端讀取的速度
+                await writer.drain()
+                chunk = await anext(chunks, None)
+        except Error as e:
+            print(f"✗ 串流中斷: {e}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR
+        finally:
+            await chunks.aclose()
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+        return HTTPStatus.OK
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GL860 讀取 API（HTTP/JSON）')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='監聽位址')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='監聽埠號')
+    parser.add_argument('--max-connections', type=int, help='同時使用的資料庫連線數（預設為連線池大小，不能超過連線池大小）')
+    args = parser.parse_args()
+
+    api = ReadAPI(max_connections=args.max_connections)
+    try:
+        asyncio.run(HttpServer(api, args.host, args.port).serve())
+    except KeyboardInterrupt:
+        print("\n已停止讀取 API")
+    finally:
+        api.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+查詢結果快取
+驗證和統計樣本的彙總查詢（verify_import.py、verify_data、verify_channel5_data、show_statistics_sample）
+在兩次導入之間結果都相同，快取後重複執行幾乎不需要讀取資料表：
+
+- 程序內以 LRU 保存最近使用的結果，可選擇同時存到磁碟（config.ini [Import] result_cache_folder），
+  下次執行的程式也能使用
+- 每個月份有一個資料版本（data_generations.py），導入程式 commit 時遞增寫入過的月份的版本，
+  快取的鍵包含版本，資料變更後自然不會讀到舊的結果；只有被導入的月份需要重新計算
+- 清空資料表、換表、結構轉換時遞增整個資料表的版本（year = month = 0），所有月份一起失效
+- 快取的鍵也包含資料庫的識別（主機、資料庫名稱、建立版本表時記錄的 epoch），
+  不同的資料庫或刪除重建後的資料庫不會讀到彼此的結果
+
+    python result_cache.py           # 顯示磁碟快取
+    python result_cache.py --clear   # 清空磁碟快取
+"""
+import argparse
+import glob
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from data_generations import ALL_MONTHS, RAW_SOURCE, STATISTICS_SOURCE, DataGenerations
+from db import import_config
+
+DEFAULT_MAX_ENTRIES = 256
+CACHE_SUFFIX = '.pickle'
+
+_default_cache = None
+
+
+class ResultCache:
+    """查詢結果快取
+
+    每個結果以 slot（例如 ('month_summary', 資料庫識別, 2025, 7)）識別，同時記錄計算時的資料版本；
+    同一個 slot 只保留最新的版本，版本不同時視為沒有快取
+
+    max_entries: 程序內最多保留的結果數（LRU）
+    folder: 磁碟快取資料夾，None 時只使用程序內快取
+    可以在多個執行緒中共用（例如 read_api.py）
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, folder=None):
+        self.max_entries = max_entries
+        self.folder = folder
+        self.entries = OrderedDict()   # slot -> (版本, 結果)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls):
+        """依 config.ini [Import] 的 result_cache_size / result_cache_folder 建立"""
+        settings = import_config()
+        return cls(
+            settings.getint('result_cache_size', fallback=DEFAULT_MAX_ENTRIES),
+            settings.get('result_cache_folder', '').strip() or None,
+        )
+
+    def path(self, slot):
+        name = hashlib.sha256(repr(slot).encode('utf-8')).hexdigest()
+        return os.path.join(self.folder, name + CACHE_SUFFIX)
+
+    def _load(self, slot):
+        """讀取磁碟快取，沒有或無法讀取時回傳 None"""
+        if self.folder is None:
+            return None
+        try:
+            with open(self.path(slot), 'rb') as f:
+                stored_slot, version, value = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError, ValueError):
+            return None
+        return (version, value) if stored_slot == slot else None
+
+    def _store(self, slot, version, value):
+        if self.folder is None:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        path = self.path(slot)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump((slot, version, value), f)
+        os.replace(path + '.tmp', path)
+
+    def get(self, slot, version):
+        """回傳 (是否有快取, 結果)"""
+        with self.lock:
+            entry = self.entries.get(slot)
+            if entry is None:
+                entry = self._load(slot)
+            if entry is not None and entry[0] == version:
+                self._remember(slot, entry)
+                self.hits += 1
+                return True, entry[1]
+            self.misses += 1
+            return False, None
+
+    def put(self, slot, version, value):
+        with self.lock:
+            self._remember(slot, (version, value))
+            self._store(slot, version, value)
+
+    def _remember(self, slot, entry):
+        self.entries[slot] = entry
+        self.entries.move_to_end(slot)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def cached(self, slot, version, compute):
+        """有相同版本的快取時直接回傳，否則呼叫 compute() 計算並存入快取"""
+        hit, value = self.get(slot, version)
+        if not hit:
+            value = compute()
+            self.put(slot, version, value)
+        return value
+
+    def clear(self):
+        """清空程序內和磁碟快取，回傳刪除的檔案數"""
+        with self.lock:
+            self.entries.clear()
+        if self.folder is None:
+            return 0
+        paths = glob.glob(os.path.join(self.folder, '*' + CACHE_SUFFIX))
+        for path in paths:
+            os.remove(path)
+        return len(paths)
+
+
+def default_cache():
+    """程序共用的結果快取（第一次呼叫時依 config.ini 建立）"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache.from_config()
+    return _default_cache
+
+
+def month_range(year, month):
+    """月份的 record_time 範圍 [起始, 結束)"""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+# 每個月份的彙總，涵蓋各驗證報告需要的欄位；以 record_time 範圍讀取，只掃描主鍵的一段
+MONTH_SUMMARY_QUERY = f"""
+    SELECT
+        COUNT(*) AS total,
+        MIN(record_time) AS first_time,
+        MAX(record_time) AS last_time,
+        ROUND(AVG(channel1_temperature), 2) AS avg_temp,
+        ROUND(AVG(channel2_humidity), 2) AS avg_humidity,
+        COUNT(channel1_temperature) AS ch1_count,
+        COUNT(channel2_humidity) AS ch2_count,
+        COUNT(channel3_uv) AS ch3_count,
+        COUNT(channel4_lux) AS ch4_count,
+        COUNT(channel5_device_temp) AS ch5_count,
+        MIN(channel1_temperature) AS min_temp,
+        MAX(channel1_temperature) AS max_temp,
+        MIN(CASE WHEN channel1_temperature IS NOT NULL THEN channel2_humidity END) AS min_humidity,
+        MAX(CASE WHEN channel1_temperature IS NOT NULL THEN channel2_humidity END) AS max_humidity,
+        MIN(CASE WHEN channel3_uv IS NOT NULL THEN record_time END) AS first_uv_time,
+        COUNT(DISTINCT CASE WHEN channel3_uv IS NOT NULL THEN DATE(record_time) END) AS uv_days,
+        ROUND(MIN(channel5_device_temp), 2) AS ch5_min,
+        ROUND(MAX(channel5_device_temp), 2) AS ch5_max,
+        ROUND(AVG(channel5_device_temp), 2) AS ch5_avg
+    FROM {RAW_SOURCE}
+    WHERE record_time >= %s AND record_time < %s
+"""
+
+
+def _fetch_dict(connection, query, params=()):
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def month_summaries(connection, cache=None):
+    """各月份的彙總（dict 列表，依年月排序，不含沒有資料的月份）
+
+    只有版本改變的月份（上次之後有導入）才會重新查詢
+    """
+    cache = cache or default_cache()
+    data_generations = DataGenerations(connection)
+    scope = data_generations.scope()
+    generations = data_generations.snapshot(RAW_SOURCE)
+    base = generations.get(ALL_MONTHS, 0)
+    summaries = []
+    for year, month in sorted(generations):
+        if (year, month) == ALL_MONTHS:
+            continue
+        summary = cache.cached(
+            ('month_summary', scope, RAW_SOURCE, year, month),
+            (base, generations[(year, month)]),
+            lambda: _fetch_dict(connection, MONTH_SUMMARY_QUERY, month_range(year, month))[0],
+        )
+        if summary['total']:
+            summaries.append({'year': year, 'month': month, **summary})
+    return summaries
+
+
+def month_sample(connection, year, month, query, cache=None):
+    """某個月份的樣本查詢（query 的參數為該月份的 record_time 範圍），回傳 tuple 列表"""
+    cache = cache or default_cache()
+    data_generations = DataGenerations(connection)
+    scope = data_generations.scope()
+    generations = data_generations.snapshot(RAW_SOURCE)
+    version = (generations.get(ALL_MONTHS, 0), generations.get((year, month), 0))
+
+    def compute():
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, month_range(year, month))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    return cache.cached(('month_sample', scope, year, month, query), version, compute)
+
+
+def statistics_result(connection, query, params=(), cache=None):
+    """統計資料表的查詢，統計更新後才重新查詢，回傳 tuple 列表"""
+    cache = cache or default_cache()
+    data_generations = DataGenerations(connection)
+    scope = data_generations.scope()
+    version = tuple(sorted(data_generations.snapshot(STATISTICS_SOURCE).items()))
+
+    def compute():
+        cursor = connection.cursor()
+        try:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    return cache.cached(('statistics', scope, query, params), version, compute)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='查詢結果快取')
+    parser.add_argument('--clear', action='store_true', help='清空磁碟快取')
+    args = parser.parse_args()
+
+    cache = ResultCache.from_config()
+    if cache.folder is None:
+        print("未設定磁碟快取（config.ini [Import] result_cache_folder），只使用程序內快取")
+        return
+    paths = glob.glob(os.path.join(cache.folder, '*' + CACHE_SUFFIX))
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"快取資料夾 {cache.folder}：{len(paths)} 個結果，{size / 1024:.1f} KB")
+    if args.clear:
+        print(f"✓ 已刪除 {cache.clear()} 個快取")
+
+
+if __name__ == "__main__":
+    main()
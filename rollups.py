@@ -0,0 +1,445 @@
+"""
+每小時 / 每日 / 每月彙總資料表
+彙總表涵蓋全部五個通道，每個通道存放可合併的統計狀態（筆數、總和、平方和、最小值、最大值，
+見 aggregates.py），較粗的時間單位由較細的彙總合併：
+
+    原始資料 -> 每小時 -> 每日 -> 每月
+
+平均值和變異數都可以由合併後的狀態精確算出，整月或整年的統計只需讀取每日彙總（O(天數)）。
+每個記錄器（logger_id）各自彙總，不同記錄器的資料不會合併在同一筆彙總中。
+
+查詢長時間範圍時使用 query_statistics，會自動選擇能回答該查詢的最粗彙總表：
+    query_statistics(connection, datetime(2025, 7, 1), datetime(2025, 10, 1), 'month')
+    -> 讀取 gl860_monthly_rollup 每個記錄器 3 筆資料，而不是數十萬筆原始資料
+"""
+from datetime import datetime, timedelta
+
+from mysql.connector import Error
+
+from aggregates import STATE_FIELDS, AggregateState, combine, merge_columns, raw_columns
+from db_schema import column_exists, table_exists
+from gl860_parser import CHANNEL_FIELDS
+
+HOURLY_TABLE = 'gl860_hourly_rollup'
+DAILY_TABLE = 'gl860_daily_rollup'
+MONTHLY_TABLE = 'gl860_monthly_rollup'
+RAW_TABLE = 'gl860_weather_data'
+
+# 彙總欄位名稱 -> 原始資料欄位，例如 temperature -> channel1_temperature
+ROLLUP_CHANNELS = {field.split('_', 1)[1]: field for field in CHANNEL_FIELDS.values()}
+
+RESOLUTIONS = ('hour', 'day', 'month')
+
+# 資料來源
+SOURCE_MONTHLY = 'monthly'
+SOURCE_DAILY = 'daily'
+SOURCE_HOURLY = 'hourly'
+SOURCE_RAW = 'raw'
+
+# 每個通道狀態欄位的型別
+STATE_COLUMN_TYPES = {
+    'count': 'INT NOT NULL DEFAULT 0',
+    'sum': 'DECIMAL(18, 2)',
+    'sumsq': 'DECIMAL(24, 4)',
+    'min': 'DECIMAL(10, 2)',
+    'max': 'DECIMAL(10, 2)',
+}
+
+
+def _channel_columns_ddl():
+    """每個通道的彙總欄位定義"""
+    return ''.join(
+        f"""
+            {name}_{field} {STATE_COLUMN_TYPES[field]},"""
+        for name in ROLLUP_CHANNELS for field in STATE_FIELDS
+    )
+
+
+def _channel_column_names():
+    return [f"{name}_{field}" for name in ROLLUP_CHANNELS for field in STATE_FIELDS]
+
+
+def _range_condition(column, start, end, logger_id=None):
+    """時間範圍條件（直接比較欄位，可以使用索引），start / end 為 None 表示沒有限制
+
+    指定 logger_id 時只包含該記錄器
+    """
+    conditions = []
+    params = []
+    if logger_id is not None:
+        conditions.append("logger_id = %s")
+        params.append(logger_id)
+    if start is not None:
+        conditions.append(f"{column} >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append(f"{column} < %s")
+        params.append(end)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, tuple(params)
+
+
+def day_start(value):
+    """value 當天 00:00"""
+    return datetime(value.year, value.month, value.day)
+
+
+def next_day(value):
+    """value 隔天 00:00（value 剛好是 00:00 時回傳 value）"""
+    start = day_start(value)
+    return start if start == value else start + timedelta(days=1)
+
+
+def month_start(value):
+    """value 所在月份的第一天 00:00"""
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(value):
+    """value 所在月份的下個月第一天 00:00"""
+    if value.month == 12:
+        return datetime(value.year + 1, 1, 1)
+    return datetime(value.year, value.month + 1, 1)
+
+
+def _drop_legacy_rollups(cursor):
+    """舊版彙總表沒有 logger_id（不同記錄器合併在同一筆）時刪除，回傳刪除的資料表
+
+    彙總表可以由原始資料重新計算，建立新的彙總表後會計算全部彙總
+    """
+    dropped = []
+    for table in (HOURLY_TABLE, DAILY_TABLE, MONTHLY_TABLE):
+        if table_exists(cursor, table) and not column_exists(cursor, table, 'logger_id'):
+            cursor.execute(f"DROP TABLE {table}")
+            dropped.append(table)
+    return dropped
+
+
+def _migrate_state_columns(cursor, table):
+    """舊版彙總表沒有平方和欄位時補上，回傳是否有新增欄位"""
+    added = False
+    for name in ROLLUP_CHANNELS:
+        for field in STATE_FIELDS:
+            column = f"{name}_{field}"
+            if not column_exists(cursor, table, column):
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {STATE_COLUMN_TYPES[field]}")
+                added = True
+    return added
+
+
+def _is_empty(cursor, table):
+    cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+    return cursor.fetchone() is None
+
+
+def create_rollup_tables(connection):
+    """建立每小時、每日、每月彙總資料表（若不存在）
+
+    舊版彙總表缺少狀態欄位時會補上欄位並重新計算全部彙總，沒有 logger_id 時會刪除後重新建立；
+    彙總表是新建立的或沒有資料、原始資料表卻已有資料時，也會計算全部彙總，
+    之後的增量更新（只重新計算待更新的日期）才不會漏掉較早的資料
+    """
+    cursor = connection.cursor()
+    try:
+        dropped = _drop_legacy_rollups(cursor)
+        if dropped:
+            print(f"  {', '.join(dropped)} 沒有 logger_id，重新建立並計算全部彙總")
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {HOURLY_TABLE} (
+            hour_start DATETIME NOT NULL,
+            logger_id VARCHAR(32) NOT NULL,
+            year INT NOT NULL,
+            month INT NOT NULL,
+            day INT NOT NULL,
+            hour TINYINT NOT NULL,
+            weekday TINYINT NOT NULL COMMENT 'DAYOFWEEK：1=星期日 ... 7=星期六',
+            record_count INT NOT NULL,{_channel_columns_ddl()}
+            PRIMARY KEY (hour_start, logger_id),
+            INDEX idx_year_month (year, month)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DAILY_TABLE} (
+            date DATE NOT NULL,
+            logger_id VARCHAR(32) NOT NULL,
+            year INT NOT NULL,
+            month INT NOT NULL,
+            day INT NOT NULL,
+            weekday TINYINT NOT NULL COMMENT 'DAYOFWEEK：1=星期日 ... 7=星期六',
+            record_count INT NOT NULL,{_channel_columns_ddl()}
+            PRIMARY KEY (date, logger_id),
+            INDEX idx_year_month (year, month)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MONTHLY_TABLE} (
+            month_start DATE NOT NULL,
+            logger_id VARCHAR(32) NOT NULL,
+            year INT NOT NULL,
+            month INT NOT NULL,
+            record_count INT NOT NULL,{_channel_columns_ddl()}
+            PRIMARY KEY (month_start, logger_id),
+            UNIQUE KEY uk_year_month (year, month, logger_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
+
+        migrated = [table for table in (HOURLY_TABLE, MONTHLY_TABLE)
+                    if _migrate_state_columns(cursor, table)]
+        empty = [table for table in (HOURLY_TABLE, DAILY_TABLE, MONTHLY_TABLE)
+                 if _is_empty(cursor, table)]
+        if migrated:
+            print(f"  已新增統計狀態欄位到 {', '.join(migrated)}，重新計算全部彙總")
+            refresh_rollup_ranges(cursor, [(None, None)])
+        elif empty and table_exists(cursor, RAW_TABLE) and not _is_empty(cursor, RAW_TABLE):
+            print(f"  {', '.join(empty)} 沒有資料，計算全部彙總")
+            refresh_rollup_ranges(cursor, [(None, None)])
+        connection.commit()
+        print(f"✓ 彙總資料表創建成功 ({HOURLY_TABLE}, {DAILY_TABLE}, {MONTHLY_TABLE})")
+        return True
+    except Error as e:
+        print(f"✗ 創建彙總資料表失敗: {e}")
+        connection.rollback()
+        return False
+    finally:
+        cursor.close()
+
+
+def _state_aggregates(columns_for):
+    """所有通道狀態欄位的 SQL 運算式（接在其他欄位之後）"""
+    return ''.join(
+        f""",
+            {', '.join(columns_for(name))}"""
+        for name in ROLLUP_CHANNELS
+    )
+
+
+def _refresh_hourly(cursor, start, end):
+    """由原始資料重新計算範圍內的每小時彙總，回傳寫入的小時數"""
+    where, params = _range_condition('hour_start', start, end)
+    cursor.execute(f"DELETE FROM {HOURLY_TABLE} {where}", params)
+
+    aggregates = _state_aggregates(lambda name: raw_columns(ROLLUP_CHANNELS[name]))
+    where, params = _range_condition('record_time', start, end)
+    cursor.execute(f"""
+        INSERT INTO {HOURLY_TABLE}
+        (hour_start, logger_id, year, month, day, hour, weekday, record_count,
+         {', '.join(_channel_column_names())})
+        SELECT
+            TIMESTAMP(DATE(record_time), MAKETIME(HOUR(record_time), 0, 0)) AS hour_start, logger_id,
+            YEAR(record_time), MONTH(record_time), DAY(record_time), HOUR(record_time),
+            DAYOFWEEK(record_time),
+            COUNT(*){aggregates}
+        FROM {RAW_TABLE}
+        {where}
+        GROUP BY hour_start, logger_id, YEAR(record_time), MONTH(record_time), DAY(record_time),
+                 HOUR(record_time), DAYOFWEEK(record_time)
+    """, params)
+    return cursor.rowcount
+
+
+def _refresh_daily(cursor, start, end):
+    """由每小時彙總重新計算範圍內的每日彙總，回傳寫入的天數
+
+    start / end 需為 00:00（None 表示沒有限制）
+    """
+    where, params = _range_condition('date', start, end)
+    cursor.execute(f"DELETE FROM {DAILY_TABLE} {where}", params)
+
+    aggregates = _state_aggregates(merge_columns)
+    where, params = _range_condition('hour_start', start, end)
+    cursor.execute(f"""
+        INSERT INTO {DAILY_TABLE}
+        (date, logger_id, year, month, day, weekday, record_count, {', '.join(_channel_column_names())})
+        SELECT
+            DATE(hour_start) AS date, logger_id, year, month, day, weekday,
+            SUM(record_count){aggregates}
+        FROM {HOURLY_TABLE}
+        {where}
+        GROUP BY DATE(hour_start), logger_id, year, month, day, weekday
+    """, params)
+    return cursor.rowcount
+
+
+def _refresh_monthly(cursor, start, end):
+    """由每日彙總重新計算範圍內的每月彙總，回傳寫入的月數
+
+    start / end 需為月初（None 表示沒有限制）
+    """
+    where, params = _range_condition('month_start', start, end)
+    cursor.execute(f"DELETE FROM {MONTHLY_TABLE} {where}", params)
+
+    aggregates = _state_aggregates(merge_columns)
+    where, params = _range_condition('date', start, end)
+    cursor.execute(f"""
+        INSERT INTO {MONTHLY_TABLE}
+        (month_start, logger_id, year, month, record_count, {', '.join(_channel_column_names())})
+        SELECT
+            MAKEDATE(year, 1) + INTERVAL (month - 1) MONTH AS month_start, logger_id,
+            year, month,
+            SUM(record_count){aggregates}
+        FROM {DAILY_TABLE}
+        {where}
+        GROUP BY logger_id, year, month
+    """, params)
+    return cursor.rowcount
+
+
+def refresh_rollup_ranges(cursor, ranges):
+    """重新計算 record_time 範圍內的每小時彙總，以及涵蓋這些範圍的整天、整個月份的彙總（不 commit）
+
+    ranges: [(起始, 結束), ...]，None 表示沒有限制；起始 / 結束需為整點
+    回傳 (寫入的小時數, 寫入的天數, 寫入的月數)
+    """
+    hours = days = months = 0
+    for start, end in ranges:
+        hours += _refresh_hourly(cursor, start, end)
+        days += _refresh_daily(
+            cursor,
+            day_start(start) if start is not None else None,
+            next_day(end) if end is not None else None
+        )
+        months += _refresh_monthly(
+            cursor,
+            month_start(start) if start is not None else None,
+            # 結束時間若剛好是月初，該月份不受影響
+            (end if end == month_start(end) else next_month(end)) if end is not None else None
+        )
+    return hours, days, months
+
+
+def choose_source(start, end, resolution):
+    """選擇能回答查詢的最粗資料來源
+
+    - 以月為單位且範圍對齊月初：每月彙總
+    - 以日或月為單位且範圍對齊 00:00：每日彙總
+    - 範圍對齊整點：每小時彙總
+    - 其他：原始資料
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"未知的時間單位: {resolution}（可用: {', '.join(RESOLUTIONS)}）")
+
+    def aligned(value, floor):
+        return value is None or value == floor(value)
+
+    def hour_floor(value):
+        return value.replace(minute=0, second=0, microsecond=0)
+
+    if resolution == 'month' and aligned(start, month_start) and aligned(end, month_start):
+        return SOURCE_MONTHLY
+    if resolution != 'hour' and aligned(start, day_start) and aligned(end, day_start):
+        return SOURCE_DAILY
+    if aligned(start, hour_floor) and aligned(end, hour_floor):
+        return SOURCE_HOURLY
+    return SOURCE_RAW
+
+
+# 各資料來源的資料表和時間欄位
+SOURCE_TABLES = {
+    SOURCE_MONTHLY: (MONTHLY_TABLE, 'month_start'),
+    SOURCE_DAILY: (DAILY_TABLE, 'date'),
+    SOURCE_HOURLY: (HOURLY_TABLE, 'hour_start'),
+    SOURCE_RAW: (RAW_TABLE, 'record_time'),
+}
+
+
+def _period_expression(source, resolution):
+    """各資料來源的時間分組運算式（分組的起始時間）"""
+    column = SOURCE_TABLES[source][1]
+    if resolution == 'hour':
+        return column if source == SOURCE_HOURLY else \
+            f"TIMESTAMP(DATE({column}), MAKETIME(HOUR({column}), 0, 0))"
+    if resolution == 'day':
+        return column if source == SOURCE_DAILY else f"DATE({column})"
+    if source == SOURCE_MONTHLY:
+        return column
+    return f"DATE({column}) - INTERVAL (DAY({column}) - 1) DAY"
+
+
+def build_query(start, end, resolution='day', channels=None, source=None, logger_id=None):
+    """產生查詢語法，回傳 (SQL, 參數, 資料來源)
+
+    每個時間單位、每個記錄器一筆，每個通道回傳平均值、母體標準差、最小值、最大值，由合併後的狀態計算；
+    指定 logger_id 時只查詢該記錄器
+    """
+    channels = list(channels or ROLLUP_CHANNELS)
+    for name in channels:
+        if name not in ROLLUP_CHANNELS:
+            raise ValueError(f"未知的通道: {name}（可用: {', '.join(ROLLUP_CHANNELS)}）")
+    source = source or choose_source(start, end, resolution)
+    table, time_column = SOURCE_TABLES[source]
+    period = _period_expression(source, resolution)
+
+    if source == SOURCE_RAW:
+        record_count = 'COUNT(*)'
+        states = {name: raw_columns(field) for name, field in ROLLUP_CHANNELS.items()}
+    else:
+        record_count = 'SUM(record_count)'
+        states = {name: merge_columns(name) for name in ROLLUP_CHANNELS}
+
+    columns = [f"{period} AS period", "logger_id", f"{record_count} AS record_count"]
+    for name in channels:
+        count, total, total_sq, minimum, maximum = states[name]
+        mean = f"{total} / NULLIF({count}, 0)"
+        columns += [
+            f"ROUND({mean}, 2) AS {name}_avg",
+            f"ROUND(SQRT(GREATEST({total_sq} / NULLIF({count}, 0) - POW({mean}, 2), 0)), 2) "
+            f"AS {name}_stddev",
+            f"{minimum} AS {name}_min",
+            f"{maximum} AS {name}_max",
+        ]
+    where, params = _range_condition(time_column, start, end, logger_id)
+    query = f"""
+        SELECT {', '.join(columns)}
+        FROM {table}
+        {where}
+        GROUP BY period, logger_id
+        ORDER BY period, logger_id
+    """
+    return query, params, source
+
+
+def query_statistics(connection, start, end, resolution='day', channels=None, source=None,
+                     logger_id=None):
+    """查詢 [start, end) 範圍內每個時間單位、每個記錄器的統計，回傳 dict 列表
+
+    resolution: hour / day / month
+    channels: 要查詢的通道（temperature, humidity, uv, lux, device_temp），預設全部
+    source: 指定資料來源（monthly / daily / hourly / raw），預設自動選擇最粗的彙總表
+    logger_id: 只查詢指定的記錄器，預設全部（每個記錄器各自一筆）
+
+    彙總表的內容在執行 create_statistics.py（或更新流程的 stats 步驟）時更新
+    """
+    query, params, source = build_query(start, end, resolution, channels, source, logger_id)
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def summarize_days(connection, start_date, end_date, channels=None, logger_id=None):
+    """合併 [start_date, end_date) 每日彙總的狀態，回傳 {記錄器: {通道: AggregateState}}
+
+    只讀取每日彙總（每個記錄器每天一筆），整月或整年的統計成本與天數成正比，
+    不同記錄器的資料各自合併；指定 logger_id 時只讀取該記錄器：
+        summary = summarize_days(connection, date(2025, 7, 1), date(2025, 10, 1), logger_id='GL860')
+        summary['GL860']['temperature'].mean(), summary['GL860']['temperature'].variance()
+    """
+    channels = list(channels or ROLLUP_CHANNELS)
+    where, params = _range_condition('date', start_date, end_date, logger_id)
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"SELECT logger_id, {', '.join(_channel_column_names())} FROM {DAILY_TABLE} {where}", params)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    by_logger = {}
+    for row in rows:
+        by_logger.setdefault(row['logger_id'], []).append(row)
+    return {
+        logger: {name: combine(AggregateState.from_row(row, name) for row in logger_rows)
+                 for name in channels}
+        for logger, logger_rows in by_logger.items()
+    }
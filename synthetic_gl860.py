@@ -0,0 +1,146 @@
+"""
+產生模擬的 GL860 匯出檔
+格式與 GL860 資料夾中的檔案相同（設定資訊、Data 標記、欄位名稱列、單位列
+NO. / Time / degC / % / W/m2 / lux / degC），用來測試大量資料時的導入和統計效能：
+
+    python synthetic_gl860.py --start 2023-01 --months 24 --interval 1 --loggers 3
+
+每個記錄器一個子資料夾，例如 synthetic/GL860-01/GL860 RAWDATA_2301.xlsx，
+相同的 --seed 會產生相同的資料
+"""
+import argparse
+import math
+import os
+import random
+from datetime import datetime, timedelta
+
+from openpyxl import Workbook
+
+from partitions import add_months
+
+DEFAULT_OUTPUT = 'synthetic'
+DEFAULT_INTERVAL = 1
+UNIT_ROW = ('NO.', 'Time', 'degC', '%', 'W/m2', 'lux', 'degC')
+CHANNEL_SETTINGS = (
+    ('CH1', ' degC', 'M2', 'TEMP', 'TC_K', '[degC]'),
+    ('CH2', ' RH(%)', 'M2', 'RH', 1, '[%]'),
+    ('CH3', ' UV', 'M2', 'DC', '5V', '[W/m2]'),
+    ('CH4', ' Lux', 'M2', 'DC', '10V', '[lux]'),
+    ('CH5', ' Temp(in)', 'M2', 'TEMP', 'TC_K', '[degC]'),
+)
+
+
+def logger_name(index):
+    """模擬記錄器的代號，例如 GL860-01"""
+    return f"GL860-{index:02d}"
+
+
+def workbook_name(year, month):
+    """與實際檔案相同的檔名，例如 GL860 RAWDATA_2508.xlsx"""
+    return f"GL860 RAWDATA_{year % 100:02d}{month:02d}.xlsx"
+
+
+def synthetic_rows(year, month, interval=DEFAULT_INTERVAL, rng=None):
+    """產生一個月份的資料列 (編號, 時間, 溫度, 濕度, UV, 照度, 設備溫度)
+
+    溫度以日夜週期和季節變化為主，濕度與溫度相反；UV 和照度只有白天有值，
+    偶爾會有缺少的數值，與實際檔案一樣
+    """
+    rng = rng or random.Random()
+    start = datetime(year, month, 1)
+    end = datetime(*add_months(year, month, 1), 1)
+    step = timedelta(minutes=interval)
+    # 記錄器不是整點開始記錄
+    current = start + timedelta(seconds=rng.randrange(interval * 60))
+    season = 6 * math.cos((month - 7) / 12 * 2 * math.pi)
+    number = 0
+    while current < end:
+        number += 1
+        hour = current.hour + current.minute / 60
+        daylight = max(math.sin((hour - 6) / 12 * math.pi), 0)
+        temperature = 22 + season + 7 * math.sin((hour - 9) / 24 * 2 * math.pi) + rng.gauss(0, 0.6)
+        humidity = min(max(80 - (temperature - 22 - season) * 4 + rng.gauss(0, 3), 20), 100)
+        uv = round(daylight * 1.1 + abs(rng.gauss(0, 0.05)), 3) if daylight > 0 else None
+        lux = round(daylight * 90000 * rng.uniform(0.4, 1.0)) if daylight > 0 else None
+        device_temp = temperature + 0.8 + daylight * 4 + rng.gauss(0, 0.3)
+        row = [number, current, round(temperature, 2), round(humidity, 2), uv, lux, round(device_temp, 2)]
+        if rng.random() < 0.001:
+            row[rng.randrange(2, 7)] = None
+        yield tuple(row)
+        current += step
+
+
+def write_workbook(filepath, year, month, interval=DEFAULT_INTERVAL, rng=None):
+    """寫入一個月份的模擬匯出檔（write-only 模式，不會把整個檔案放在記憶體中），回傳資料筆數"""
+    start = datetime(year, month, 1)
+    end = datetime(*add_months(year, month, 1), 1) - timedelta(days=1)
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(f"{year % 100:02d}{month:02d}")
+    sheet.append(('Model', 'GRAPHTEC GL860'))
+    sheet.append(('MaxChannel', 20))
+    sheet.append(('Sampling interval', f'{interval}min'))
+    sheet.append(('Start time', start))
+    sheet.append(('End time', end))
+    sheet.append(())
+    sheet.append(('AMP settings',))
+    sheet.append(('CH', 'Signal name', 'Amp', 'Input', 'Range', 'Unit'))
+    for setting in CHANNEL_SETTINGS:
+        sheet.append(setting)
+    sheet.append(())
+    sheet.append(('Data',))
+    sheet.append(('Number', 'Date&Time', 'CH1', 'CH2', 'CH3', 'CH4', 'CH5'))
+    sheet.append(UNIT_ROW)
+
+    count = 0
+    for row in synthetic_rows(year, month, interval, rng):
+        sheet.append(row)
+        count += 1
+    workbook.save(filepath)
+    return count
+
+
+def generate(output=DEFAULT_OUTPUT, start=(2023, 1), months=12, interval=DEFAULT_INTERVAL,
+             loggers=1, seed=0):
+    """產生所有記錄器、所有月份的模擬匯出檔，回傳 {記錄器代號: [檔案路徑, ...]}"""
+    files = {}
+    for index in range(1, loggers + 1):
+        name = logger_name(index)
+        folder = os.path.join(output, name)
+        os.makedirs(folder, exist_ok=True)
+        files[name] = []
+        for offset in range(months):
+            year, month = add_months(*start, offset)
+            filepath = os.path.join(folder, workbook_name(year, month))
+            # 每個記錄器、每個月份有自己的亂數種子，單獨重新產生某個檔案時內容不變
+            rng = random.Random(f"{seed}-{name}-{year}-{month}")
+            count = write_workbook(filepath, year, month, interval, rng)
+            print(f"✓ {filepath}（{count} 筆）")
+            files[name].append(filepath)
+    return files
+
+
+def parse_month(value):
+    """解析 YYYY-MM"""
+    year, month = (int(v) for v in value.split('-'))
+    return year, month
+
+
+def main():
+    parser = argparse.ArgumentParser(description='產生模擬的 GL860 匯出檔')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='輸出資料夾')
+    parser.add_argument('--start', type=parse_month, default=(2023, 1), metavar='YYYY-MM', help='第一個月份')
+    parser.add_argument('--months', type=int, default=12, help='月份數')
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL, help='記錄間隔（分鐘）')
+    parser.add_argument('--loggers', type=int, default=1, help='記錄器數量')
+    parser.add_argument('--seed', type=int, default=0, help='亂數種子')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("產生模擬的 GL860 匯出檔")
+    print("=" * 70)
+    generate(args.output, args.start, args.months, args.interval, args.loggers, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+可合併統計狀態（aggregates.py）和每日彙總合併（rollups.summarize_days）的測試，不需要 MySQL
+
+    python -m pytest tests
+"""
+import os
+import statistics
+import sys
+import unittest
+from datetime import date
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rollups  # noqa: E402
+from aggregates import AggregateState, combine  # noqa: E402
+
+JULY = [Decimal('20.50'), Decimal('21.00'), Decimal('22.25')]
+AUGUST = [Decimal('18.00'), Decimal('19.50'), None]
+
+
+class AggregateStateTest(unittest.TestCase):
+
+    def test_merge_matches_all_values(self):
+        merged = AggregateState.from_values(JULY) + AggregateState.from_values(AUGUST)
+        values = [v for v in JULY + AUGUST if v is not None]
+        self.assertEqual(merged.count, len(values))
+        self.assertEqual(merged.mean(), sum(values) / len(values))
+        # Decimal 精確計算，合併後的變異數與直接由全部數值計算的結果相同
+        self.assertEqual(merged.variance(), statistics.pvariance(values))
+        self.assertEqual(merged.variance(ddof=1), statistics.variance(values))
+        self.assertEqual((merged.minimum, merged.maximum), (Decimal('18.00'), Decimal('22.25')))
+
+    def test_merge_order_does_not_matter(self):
+        states = [AggregateState.from_values([v]) for v in JULY + AUGUST]
+        forward = combine(states)
+        backward = combine(reversed(states))
+        self.assertEqual((forward.count, forward.total, forward.total_sq),
+                         (backward.count, backward.total, backward.total_sq))
+
+    def test_empty_states(self):
+        empty = combine([])
+        self.assertIsNone(empty.mean())
+        self.assertIsNone(empty.variance())
+        self.assertIsNone(AggregateState.from_values([Decimal('1.00')]).variance(ddof=1))
+        merged = empty + AggregateState.from_values(JULY)
+        self.assertEqual(merged.minimum, Decimal('20.50'))
+
+    def test_from_row(self):
+        row = {'temperature_count': 3, 'temperature_sum': Decimal('63.75'),
+               'temperature_sumsq': Decimal('1356.3125'), 'temperature_min': Decimal('20.50'),
+               'temperature_max': Decimal('22.25')}
+        state = AggregateState.from_row(row, 'temperature')
+        self.assertEqual(state.variance(), AggregateState.from_values(JULY).variance())
+
+
+class StubCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.query = None
+        self.params = None
+
+    def execute(self, query, params=()):
+        self.query, self.params = query, params
+
+    def fetchall(self):
+        if self.params and self.params[0] in ('GL860', 'GL860-2'):
+            return [row for row in self.rows if row['logger_id'] == self.params[0]]
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class StubConnection:
+    def __init__(self, rows):
+        self.last_cursor = StubCursor(rows)
+
+    def cursor(self, dictionary=False):
+        return self.last_cursor
+
+
+def daily_row(logger_id, values):
+    """每日彙總的一列（只有 temperature 有資料）"""
+    row = {'logger_id': logger_id}
+    state = AggregateState.from_values(values)
+    for name in rollups.ROLLUP_CHANNELS:
+        current = state if name == 'temperature' else AggregateState()
+        row.update({f'{name}_count': current.count, f'{name}_sum': current.total,
+                    f'{name}_sumsq': current.total_sq, f'{name}_min': current.minimum,
+                    f'{name}_max': current.maximum})
+    return row
+
+
+class SummarizeDaysTest(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = StubConnection([
+            daily_row('GL860', JULY[:2]),
+            daily_row('GL860', JULY[2:]),
+            daily_row('GL860-2', [Decimal('35.00')]),
+        ])
+
+    def test_loggers_are_not_mixed(self):
+        summary = rollups.summarize_days(self.connection, date(2025, 7, 1), date(2025, 8, 1))
+        self.assertEqual(set(summary), {'GL860', 'GL860-2'})
+        self.assertEqual(summary['GL860']['temperature'].variance(), statistics.pvariance(JULY))
+        self.assertEqual(summary['GL860-2']['temperature'].mean(), Decimal('35.00'))
+        self.assertEqual(summary['GL860']['uv'].count, 0)
+
+    def test_filter_by_logger(self):
+        summary = rollups.summarize_days(self.connection, date(2025, 7, 1), date(2025, 8, 1),
+                                         channels=['temperature'], logger_id='GL860-2')
+        self.assertEqual(list(summary), ['GL860-2'])
+        self.assertEqual(list(summary['GL860-2']), ['temperature'])
+        self.assertIn('logger_id = %s', self.connection.last_cursor.query)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+CSV 匯出檔尾端導入的測試：最後一行還沒寫完時留到下次，之後由位元組位置繼續讀取
+
+    python -m pytest tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gl860_parser import GL860CsvReader, TailPosition  # noqa: E402
+
+HEADER = (
+    b"Model,GL860\r\n"
+    b"Data\r\n"
+    b"No.,Time,CH1,CH2,CH3,CH4,CH5\r\n"
+    b"NO.,Time,degC,%,W/m2,lux,degC\r\n"
+)
+DATE_INDEX = 1
+
+
+def data_line(number):
+    return f"{number},2025/07/01 00:{number:02d}:00,25.5,60.0,0.0,0.0,30.2\r\n".encode('ascii')
+
+
+class CsvTailTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, 'GL860 RAWDATA_2507.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write(self, data, mode='wb'):
+        with open(self.path, mode) as f:
+            f.write(data)
+
+    def read(self, position=None):
+        """讀取檔案，回傳 (資料列, 讀取後的位置, 是否從 position 繼續)"""
+        with GL860CsvReader(self.path) as reader:
+            resumed = reader.resume(position, DATE_INDEX) if position is not None else None
+            rows = list(reader) if resumed is not False else []
+            return rows, reader.position(DATE_INDEX), resumed
+
+    def test_unterminated_last_line_is_left_for_next_read(self):
+        # 第 3 行還在寫入中（沒有換行）
+        self.write(HEADER + data_line(1) + data_line(2) + data_line(3)[:12])
+        rows, position, _ = self.read()
+        self.assertEqual([row[0] for row in rows], ['1', '2'])
+        self.assertEqual(position.rows, 2)
+        self.assertEqual(position.offset, len(HEADER + data_line(1) + data_line(2)))
+        self.assertEqual(position.last_time, datetime(2025, 7, 1, 0, 2))
+
+        # 寫完第 3 行並增加第 4 行，由上次的位置繼續，只讀取新的資料列
+        self.write(data_line(3)[12:] + data_line(4), mode='ab')
+        rows, position, resumed = self.read(position)
+        self.assertTrue(resumed)
+        self.assertEqual([row[0] for row in rows], ['3', '4'])
+        self.assertEqual(rows[0][2], '25.5')
+        self.assertEqual(position.rows, 4)
+        self.assertEqual(position.offset, os.path.getsize(self.path))
+        self.assertEqual(position.last_time, datetime(2025, 7, 1, 0, 4))
+
+    def test_resume_without_new_rows_keeps_last_time(self):
+        self.write(HEADER + data_line(1) + data_line(2))
+        _, position, _ = self.read()
+        rows, again, resumed = self.read(position)
+        self.assertTrue(resumed)
+        self.assertEqual(rows, [])
+        self.assertEqual((again.rows, again.offset, again.last_time),
+                         (position.rows, position.offset, position.last_time))
+
+    def test_modified_file_cannot_resume(self):
+        self.write(HEADER + data_line(1) + data_line(2))
+        _, position, _ = self.read()
+        # 前面的內容被修改，上次的最後一行不同
+        self.write(HEADER + data_line(1) + data_line(5) + data_line(6))
+        _, _, resumed = self.read(position)
+        self.assertFalse(resumed)
+
+    def test_position_past_end_cannot_resume(self):
+        self.write(HEADER + data_line(1))
+        position = TailPosition(5, len(HEADER) + 1000, datetime(2025, 7, 1, 0, 5))
+        _, _, resumed = self.read(position)
+        self.assertFalse(resumed)
+
+
+if __name__ == '__main__':
+    unittest.main()
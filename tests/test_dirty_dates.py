@@ -0,0 +1,44 @@
+"""
+待更新統計日期合併成 record_time 區間（dirty_dates.date_ranges）的測試
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dirty_dates import date_ranges  # noqa: E402
+
+
+class DateRangesTest(unittest.TestCase):
+
+    def test_consecutive_dates_are_merged(self):
+        self.assertEqual(
+            date_ranges([date(2025, 7, 1), date(2025, 7, 2), date(2025, 7, 5)]),
+            [(datetime(2025, 7, 1), datetime(2025, 7, 3)), (datetime(2025, 7, 5), datetime(2025, 7, 6))],
+        )
+
+    def test_unsorted_and_duplicate_dates(self):
+        dates = [date(2025, 7, 3), date(2025, 7, 1), date(2025, 7, 2), date(2025, 7, 1)]
+        self.assertEqual(date_ranges(dates), [(datetime(2025, 7, 1), datetime(2025, 7, 4))])
+
+    def test_ranges_cross_month_and_year(self):
+        dates = [date(2025, 7, 31), date(2025, 8, 1), date(2025, 12, 31), date(2026, 1, 1)]
+        self.assertEqual(date_ranges(dates), [
+            (datetime(2025, 7, 31), datetime(2025, 8, 2)),
+            (datetime(2025, 12, 31), datetime(2026, 1, 2)),
+        ])
+
+    def test_datetimes_use_their_day(self):
+        self.assertEqual(date_ranges([datetime(2025, 7, 1, 13, 30)]),
+                         [(datetime(2025, 7, 1), datetime(2025, 7, 2))])
+
+    def test_empty(self):
+        self.assertEqual(date_ranges([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
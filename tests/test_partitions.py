@@ -0,0 +1,118 @@
+"""
+月份分區（partitions.py）的測試：月份與分區名稱的計算，以及由 pmax / p_before 切分新分區的語法，不需要 MySQL
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import partitions  # noqa: E402
+
+
+class StubCursor:
+    """information_schema.PARTITIONS 回傳固定的分區名稱，記錄執行的 ALTER TABLE"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.result = []
+
+    def execute(self, query, params=()):
+        if 'information_schema.PARTITIONS' in query:
+            self.result = [(name,) for name in self.connection.partitions]
+        else:
+            self.connection.statements.append(' '.join(query.split()))
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class StubConnection:
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+
+    def cursor(self):
+        return StubCursor(self)
+
+
+class MonthMathTest(unittest.TestCase):
+
+    def test_partition_name(self):
+        self.assertEqual(partitions.partition_name(2025, 7), 'p202507')
+        self.assertEqual(partitions.partition_name(987, 12), 'p098712')
+
+    def test_add_months(self):
+        self.assertEqual(partitions.add_months(2025, 11, 1), (2025, 12))
+        self.assertEqual(partitions.add_months(2025, 12, 1), (2026, 1))
+        self.assertEqual(partitions.add_months(2025, 1, -1), (2024, 12))
+        self.assertEqual(partitions.add_months(2025, 7, 18), (2027, 1))
+
+    def test_month_range(self):
+        self.assertEqual(partitions.month_range((2025, 11), (2026, 2)),
+                         [(2025, 11), (2025, 12), (2026, 1), (2026, 2)])
+        self.assertEqual(partitions.month_range((2025, 7), (2025, 7)), [(2025, 7)])
+        self.assertEqual(partitions.month_range((2025, 8), (2025, 7)), [])
+
+    def test_month_bound_and_days(self):
+        self.assertEqual(partitions.month_bound(2025, 12), "'2026-01-01'")
+        self.assertEqual(len(partitions.month_days(2024, 2)), 29)
+        self.assertEqual(len(partitions.month_days(2025, 2)), 28)
+        self.assertEqual(max(partitions.month_days(2025, 12)), date(2025, 12, 31))
+
+    def test_month_partitions_ignore_pmax_and_p_before(self):
+        names = ['p_before', 'p202508', 'p202507', 'pmax', 'p2025']
+        self.assertEqual(partitions._month_partitions(names), [(2025, 7), (2025, 8)])
+
+
+class EnsurePartitionsTest(unittest.TestCase):
+
+    def test_unpartitioned_table_is_left_alone(self):
+        connection = StubConnection([])
+        self.assertEqual(partitions.ensure_partitions(connection, 't', (2025, 7), (2025, 9)), 0)
+        self.assertEqual(connection.statements, [])
+
+    def test_split_pmax_only(self):
+        connection = StubConnection(['pmax'])
+        added = partitions.ensure_partitions(connection, 't', (2025, 7), (2025, 8))
+        self.assertEqual(added, 2)
+        self.assertEqual(connection.statements, [
+            "ALTER TABLE t REORGANIZE PARTITION pmax INTO ("
+            "PARTITION p_before VALUES LESS THAN ('2025-07-01'), "
+            "PARTITION p202507 VALUES LESS THAN ('2025-08-01'), "
+            "PARTITION p202508 VALUES LESS THAN ('2025-09-01'), "
+            "PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+        ])
+
+    def test_split_later_and_earlier_months(self):
+        connection = StubConnection(['p_before', 'p202507', 'p202508', 'pmax'])
+        added = partitions.ensure_partitions(connection, 't', (2025, 5), (2025, 10))
+        self.assertEqual(added, 4)
+        later, earlier = connection.statements
+        self.assertEqual(later, (
+            "ALTER TABLE t REORGANIZE PARTITION pmax INTO ("
+            "PARTITION p202509 VALUES LESS THAN ('2025-10-01'), "
+            "PARTITION p202510 VALUES LESS THAN ('2025-11-01'), "
+            "PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+        ))
+        self.assertEqual(earlier, (
+            "ALTER TABLE t REORGANIZE PARTITION p_before INTO ("
+            "PARTITION p_before VALUES LESS THAN ('2025-05-01'), "
+            "PARTITION p202505 VALUES LESS THAN ('2025-06-01'), "
+            "PARTITION p202506 VALUES LESS THAN ('2025-07-01'))"
+        ))
+
+    def test_existing_months_need_nothing(self):
+        connection = StubConnection(['p_before', 'p202507', 'p202508', 'pmax'])
+        self.assertEqual(partitions.ensure_partitions(connection, 't', (2025, 7), (2025, 8)), 0)
+        self.assertEqual(connection.statements, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
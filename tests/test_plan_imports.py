@@ -0,0 +1,135 @@
+"""
+增量導入的處理方式（add_new_data.plan_imports）和 tail 改為重新導入整個檔案的條件，不需要 MySQL
+
+    python -m pytest tests
+"""
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import add_new_data  # noqa: E402
+from add_new_data import (  # noqa: E402
+    ACTION_IMPORT, ACTION_SKIP, STATUS_EXISTS, GL860IncrementalImporter,
+)
+from import_manifest import STATUS_CHANGED, STATUS_NEW, STATUS_UNCHANGED  # noqa: E402
+
+STATUSES = {
+    'new.xlsx': STATUS_NEW,
+    'changed.xlsx': STATUS_CHANGED,
+    'unchanged.xlsx': STATUS_UNCHANGED,
+    'exists.xlsx': STATUS_EXISTS,
+}
+FILES = list(STATUSES)
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      'GL860', 'GL860 RAWDATA_2507.xlsx')
+
+
+class StubManifest:
+    """沒有任何導入位置記錄的 manifest"""
+
+    def get(self, filepath):
+        return None
+
+    def record(self, *args, **kwargs):
+        raise AssertionError("跳過的檔案不應登記到 manifest")
+
+
+class PlanImportsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.importer = GL860IncrementalImporter()
+
+    def plan(self, mode='all', policy=None):
+        return dict(self.importer.plan_imports(FILES, STATUSES, mode, policy))
+
+    def test_default_policy(self):
+        # 未指定時與選單相同：新檔案導入、已變更的檔案 upsert、其他已存在的月份跳過
+        self.assertEqual(self.plan(), {
+            'new.xlsx': ACTION_IMPORT,
+            'changed.xlsx': 'upsert',
+            'unchanged.xlsx': ACTION_SKIP,
+            'exists.xlsx': ACTION_SKIP,
+        })
+
+    def test_policies(self):
+        for policy in ('skip', 'replace', 'upsert'):
+            self.assertEqual(self.plan(policy=policy), {
+                'new.xlsx': ACTION_IMPORT,
+                'changed.xlsx': policy,
+                'unchanged.xlsx': policy,
+                'exists.xlsx': policy,
+            }, policy)
+
+    def test_tail_skips_unchanged_files(self):
+        self.assertEqual(self.plan(policy='tail'), {
+            'new.xlsx': ACTION_IMPORT,
+            'changed.xlsx': 'tail',
+            'unchanged.xlsx': ACTION_SKIP,
+            'exists.xlsx': 'tail',
+        })
+
+    def test_new_mode_only_new_and_changed(self):
+        self.assertEqual(self.plan(mode='new', policy='replace'), {
+            'new.xlsx': ACTION_IMPORT,
+            'changed.xlsx': 'replace',
+        })
+        self.assertEqual(self.plan(mode='files'), self.plan(mode='all'))
+
+    def test_tail_fallback_requires_confirmation(self):
+        importer = self.importer
+        importer.manifest = StubManifest()
+        importer.tail_fallback = False
+
+        def load_file(*args, **kwargs):
+            raise AssertionError("沒有 --yes 時不應重新導入整個檔案")
+
+        importer.load_file = load_file
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertFalse(importer.import_file(SAMPLE, mode='tail'))
+        self.assertIn('--yes', output.getvalue())
+
+    def test_run_unattended_passes_yes_to_tail_fallback(self):
+        class Args:
+            mode = 'files'
+            files = [SAMPLE]
+            folder = 'GL860'
+            reimport_policy = 'tail'
+            dry_run = False
+
+        class Importer:
+            tail_fallback = True
+
+            def file_status(self, filepath):
+                return STATUS_CHANGED
+
+            def print_file_list(self, files, statuses):
+                pass
+
+            plan_imports = GL860IncrementalImporter.plan_imports
+
+            def acquire_lock(self):
+                return True
+
+            def release_lock(self):
+                pass
+
+            def run_plan(self, plan):
+                self.plan = plan
+                return True
+
+        for yes in (False, True):
+            importer = Importer()
+            Args.yes = yes
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertTrue(add_new_data.run_unattended(importer, Args))
+            self.assertEqual(importer.plan, [(SAMPLE, 'tail')])
+            self.assertEqual(importer.tail_fallback, yes)
+
+
+if __name__ == '__main__':
+    unittest.main()
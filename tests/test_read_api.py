@@ -0,0 +1,218 @@
+"""
+讀取 API 的測試：以替代的資料庫連線執行，不需要 MySQL
+
+    python -m pytest tests
+"""
+import asyncio
+import json
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import read_api  # noqa: E402
+import result_cache  # noqa: E402
+from mysql.connector import Error, errorcode  # noqa: E402
+
+ROWS = [
+    ('GL860', datetime(2025, 7, 1) + timedelta(minutes=i), Decimal('25.50'), Decimal('60.00'),
+     None, None, Decimal('30.25'))
+    for i in range(7)
+]
+
+
+class StubCursor:
+    """依查詢內容回傳固定結果的游標"""
+
+    def __init__(self, connection, dictionary):
+        self.connection = connection
+        self.dictionary = dictionary
+        self.result = []
+
+    def execute(self, query, params=()):
+        self.connection.queries.append(query)
+        if '@@hostname' in query:
+            self.result = [('stub', 3306, 'weather', 1)]
+        elif 'gl860_data_generations' in query:
+            self.result = [(0, 0, 1)]
+        elif 'gl860_daily_rollup' in query:
+            raise Error(errno=errorcode.ER_NO_SUCH_TABLE, msg="Table doesn't exist")
+        elif 'GROUP BY period' in query:
+            self.connection.statistics_params.append(params)
+            self.result = [{'period': datetime(2025, 7, 1).date(), 'logger_id': 'GL860',
+                            'record_count': len(ROWS), 'temperature_avg': Decimal('25.50')}]
+        elif 'ORDER BY record_time DESC' in query:
+            self.result = [dict(zip(read_api.RECORD_FIELDS, ROWS[-1]))]
+        else:
+            # /range 的一頁：參數依序為 start, (上一頁最後一筆的 record_time, logger_id,) LIMIT
+            rows = ROWS
+            if 'record_time >= %s' in query:
+                rows = [row for row in rows if row[1] >= params[0]]
+            if '(record_time, logger_id) >' in query:
+                after = (params[-3], params[-2])
+                rows = [row for row in rows if (row[1], row[0]) > after]
+            self.result = rows[:params[-1]]
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def close(self):
+        pass
+
+
+class StubConnection:
+    """替代的資料庫連線（ReadAPI 的 connect 參數）"""
+
+    def __init__(self):
+        self.queries = []
+        self.statistics_params = []
+
+    def cursor(self, dictionary=False):
+        return StubCursor(self, dictionary)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+async def fetch(port, target):
+    """送出 GET 請求，回傳 (狀態碼, 標頭, 本文)；chunked 本文會依區塊長度組合"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    status_line = (await reader.readline()).decode('latin-1')
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, value = line.split(':', 1)
+        headers[name.lower()] = value.strip()
+    if headers.get('transfer-encoding') == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            data = await reader.readexactly(size + 2)
+            if size == 0:
+                break
+            chunks.append(data[:-2])
+        body = b''.join(chunks)
+    else:
+        body = await reader.read()
+    writer.close()
+    return int(status_line.split()[1]), headers, json.loads(body.decode('utf-8'))
+
+
+class ReadAPITest(unittest.TestCase):
+
+    def setUp(self):
+        # 只使用程序內快取，不寫入磁碟
+        self.saved_cache = result_cache._default_cache
+        result_cache._default_cache = result_cache.ResultCache(folder=None)
+        self.saved_stream_rows = read_api.STREAM_ROWS
+        read_api.STREAM_ROWS = 3
+        self.api = read_api.ReadAPI(connect=StubConnection, max_connections=2)
+
+    def tearDown(self):
+        self.api.close()
+        read_api.STREAM_ROWS = self.saved_stream_rows
+        result_cache._default_cache = self.saved_cache
+
+    def request(self, *targets):
+        """啟動伺服器並依序送出請求"""
+        async def run():
+            server = await asyncio.start_server(
+                read_api.HttpServer(self.api).handle, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return [await fetch(port, target) for target in targets]
+        return asyncio.run(run())
+
+    def test_statistics_routes_fall_back_to_raw(self):
+        for path in ('/hourly', '/daily', '/monthly'):
+            (status, _, body), = self.request(f"{path}?start=2025-07-01&end=2025-07-02")
+            self.assertEqual(status, 200, path)
+            self.assertIn(body['source'], ('raw', 'hourly', 'daily', 'monthly'))
+            self.assertEqual(body['rows'][0]['record_count'], len(ROWS))
+            self.assertEqual(body['rows'][0]['temperature_avg'], 25.5)
+        # 還沒建立彙總資料表時改為讀取原始資料
+        (status, _, body), = self.request("/daily?start=2025-07-01&end=2025-07-02")
+        self.assertEqual(body['source'], 'raw')
+
+    def test_statistics_filter_by_logger(self):
+        connections = []
+
+        def connect():
+            connections.append(StubConnection())
+            return connections[-1]
+
+        self.api.close()
+        self.api = read_api.ReadAPI(connect=connect, max_connections=2)
+        (status, _, body), = self.request("/hourly?start=2025-07-01&end=2025-07-02&logger_id=GL860")
+        self.assertEqual(status, 200)
+        self.assertEqual(body['rows'][0]['logger_id'], 'GL860')
+        queries = [q for c in connections for q in c.queries if 'GROUP BY period' in q]
+        self.assertTrue(queries and all('logger_id = %s' in q for q in queries))
+        params = [p for c in connections for p in c.statistics_params]
+        self.assertEqual(params[-1][0], 'GL860')
+
+    def test_latest(self):
+        (status, _, body), = self.request("/latest?logger_id=GL860")
+        self.assertEqual(status, 200)
+        self.assertEqual(body['rows'][0]['record_time'], '2025-07-01 00:06:00')
+
+    def test_bad_requests(self):
+        responses = self.request(
+            "/latest?limit=x",
+            "/latest?limit=0",
+            "/daily?channels=unknown",
+            "/range?start=2025-07-02&end=2025-07-01",
+            "/range?start=not-a-date",
+        )
+        for status, _, body in responses:
+            self.assertEqual(status, 400)
+            self.assertIn('error', body)
+
+    def test_unknown_path(self):
+        (status, _, body), = self.request("/nope")
+        self.assertEqual(status, 404)
+        self.assertIn('/range', body['endpoints'])
+
+    def test_range_streams_all_pages(self):
+        (status, headers, body), = self.request("/range?start=2025-07-01")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers.get('transfer-encoding'), 'chunked')
+        self.assertEqual(body['source'], 'raw')
+        # 每頁 3 筆，7 筆分成 3 頁讀取，依時間順序且沒有重複
+        times = [row['record_time'] for row in body['rows']]
+        self.assertEqual(times, sorted(set(times)))
+        self.assertEqual(len(times), len(ROWS))
+        self.assertEqual(body['rows'][0]['channel5_device_temp'], 30.25)
+
+    def test_range_empty(self):
+        (status, headers, body), = self.request("/range?start=2030-01-01")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers.get('transfer-encoding'), 'chunked')
+        self.assertEqual(body, {'source': 'raw', 'rows': []})
+
+    def test_max_connections_clamped_to_pool(self):
+        pool_size = read_api.mysql_config().getint('pool_size', fallback=read_api.DEFAULT_POOL_SIZE)
+        api = read_api.ReadAPI(max_connections=pool_size + 10)
+        try:
+            self.assertEqual(api.max_connections, pool_size)
+        finally:
+            api.close()
+        # 替代的連線不受連線池限制
+        self.assertEqual(self.api.max_connections, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+資料夾監看（watch_folders.FolderWatcher）的測試：寫入完成的判斷和失敗檔案的重試間隔，以虛擬的時間執行
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import watch_folders  # noqa: E402
+from watch_folders import MAX_RETRY_DELAY, RETRY_DELAY, FolderWatcher  # noqa: E402
+
+PATH = os.path.join('GL860', 'GL860 RAWDATA_2510.xlsx')
+
+
+class StubTarget:
+    """scan 回傳測試設定的 {路徑: (大小, 修改時間)}"""
+
+    name = 'GL860'
+    folder = 'GL860'
+
+    def __init__(self):
+        self.files = {}
+
+    def scan(self):
+        return dict(self.files)
+
+
+class FolderWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.saved_is_readable = watch_folders.is_readable
+        watch_folders.is_readable = lambda path: True
+        self.target = StubTarget()
+        self.watcher = FolderWatcher([self.target], settle=3)
+
+    def tearDown(self):
+        watch_folders.is_readable = self.saved_is_readable
+
+    def ready(self, now):
+        return self.watcher.poll(now).get(self.target, [])
+
+    def test_settle_debounce(self):
+        self.target.files[PATH] = (100, 1.0)
+        self.assertEqual(self.ready(0), [])
+        self.assertEqual(self.ready(2), [])
+        # 仍在寫入，重新計時
+        self.target.files[PATH] = (200, 2.0)
+        self.assertEqual(self.ready(4), [])
+        self.assertEqual(self.ready(6), [])
+        self.assertEqual(self.ready(7), [PATH])
+        # 已處理，沒有變動時不再回傳
+        self.assertEqual(self.ready(20), [])
+
+    def test_unreadable_file_waits(self):
+        watch_folders.is_readable = lambda path: False
+        self.target.files[PATH] = (100, 1.0)
+        self.ready(0)
+        self.assertEqual(self.ready(5), [])
+        watch_folders.is_readable = lambda path: True
+        self.assertEqual(self.ready(6), [PATH])
+
+    def test_deleted_file_is_dropped(self):
+        self.target.files[PATH] = (100, 1.0)
+        self.ready(0)
+        del self.target.files[PATH]
+        self.ready(1)
+        self.assertEqual(self.watcher.pending, {})
+
+    def test_failed_file_backs_off(self):
+        self.target.files[PATH] = (100, 1.0)
+        self.ready(0)
+        self.assertEqual(self.ready(3), [PATH])
+        self.watcher.forget([PATH], now=3)
+        # 不會每次檢查都重試
+        self.assertEqual(self.ready(4), [])
+        self.assertEqual(self.ready(3 + RETRY_DELAY - 1), [])
+        self.assertEqual(self.ready(3 + RETRY_DELAY), [PATH])
+        # 重試還沒有結果之前不再回傳
+        self.assertEqual(self.ready(3 + RETRY_DELAY * 10), [])
+        # 再次失敗，間隔加倍
+        now = 3 + RETRY_DELAY
+        self.watcher.forget([PATH], now=now)
+        self.assertEqual(self.ready(now + RETRY_DELAY), [])
+        self.assertEqual(self.ready(now + RETRY_DELAY * 2), [PATH])
+
+    def test_retry_delay_is_capped(self):
+        self.target.files[PATH] = (100, 1.0)
+        for _ in range(20):
+            self.watcher.forget([PATH], now=0)
+        self.assertEqual(self.watcher.failures[PATH][1], MAX_RETRY_DELAY)
+
+    def test_changed_file_retries_after_settle(self):
+        self.target.files[PATH] = (100, 1.0)
+        self.ready(0)
+        self.ready(3)
+        self.watcher.forget([PATH], now=3)
+        # 檔案被重新存檔，不必等到重試時間，維持 settle 秒不變就重新處理
+        self.target.files[PATH] = (150, 5.0)
+        self.assertEqual(self.ready(5), [])
+        self.assertEqual(self.ready(8), [PATH])
+        self.assertNotIn(PATH, self.watcher.failures)
+
+
+if __name__ == '__main__':
+    unittest.main()
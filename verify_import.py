@@ -1,108 +1,64 @@
-import mysql.connector
 from mysql.connector import Error
 
-def verify_import():
-    """驗證導入的資料"""
+from db import get_connection
+from result_cache import month_summaries
+
+def extreme(summaries, function, field):
+    """合併各月份的最小值或最大值，沒有資料時為 None"""
+    values = [row[field] for row in summaries if row[field] is not None]
+    return function(values) if values else None
+
+def verify_import(connection=None):
+    """驗證導入的資料，成功時回傳 True
+    connection: 可傳入現有的連線，否則從共用連線池取得並在結束後歸還
+    """
+    owns_connection = connection is None
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='weather_data',
-            user='root',
-            password=''
-        )
+        if owns_connection:
+            connection = get_connection()
         
         if connection.is_connected():
-            cursor = connection.cursor()
-            
             print("=" * 70)
             print("資料驗證報告")
             print("=" * 70)
             
-            # 查詢各月份的資料統計
-            query = """
-            SELECT 
-                year, 
-                month,
-                COUNT(*) as total,
-                MIN(record_time) as first_time,
-                MAX(record_time) as last_time,
-                ROUND(AVG(channel1_temperature), 2) as avg_temp,
-                ROUND(AVG(channel2_humidity), 2) as avg_humidity
-            FROM gl860_weather_data
-            GROUP BY year, month
-            ORDER BY year, month
-            """
-            
-            cursor.execute(query)
-            results = cursor.fetchall()
+            # 各月份的彙總（兩次導入之間由結果快取回答，只有導入過的月份會重新查詢）
+            summaries = month_summaries(connection)
             
             print("\n各月份統計：")
             print(f"{'年':<6} {'月':<6} {'記錄數':<10} {'第一筆時間':<20} {'最後一筆時間':<20} {'平均溫度':<10} {'平均濕度':<10}")
             print("-" * 100)
             
-            for row in results:
-                print(f"{row[0]:<6} {row[1]:<6} {row[2]:<10} {str(row[3]):<20} {str(row[4]):<20} {row[5]:<10} {row[6]:<10}")
-            
-            # 查詢最高最低溫度
-            query2 = """
-            SELECT 
-                MIN(channel1_temperature) as min_temp,
-                MAX(channel1_temperature) as max_temp,
-                MIN(channel2_humidity) as min_humidity,
-                MAX(channel2_humidity) as max_humidity
-            FROM gl860_weather_data
-            WHERE channel1_temperature IS NOT NULL
-            """
-            
-            cursor.execute(query2)
-            result = cursor.fetchone()
+            for row in summaries:
+                print(f"{row['year']:<6} {row['month']:<6} {row['total']:<10} {str(row['first_time']):<20} {str(row['last_time']):<20} {row['avg_temp']:<10} {row['avg_humidity']:<10}")
             
+            # 最高最低溫度（有溫度的記錄）
             print(f"\n溫濕度範圍：")
-            print(f"  最低溫度: {result[0]}°C")
-            print(f"  最高溫度: {result[1]}°C")
-            print(f"  最低濕度: {result[2]}%")
-            print(f"  最高濕度: {result[3]}%")
-            
-            # 查詢 UV 和 Lux 資料
-            query3 = """
-            SELECT 
-                MIN(record_time) as first_uv_time,
-                COUNT(DISTINCT DATE(record_time)) as days_with_uv
-            FROM gl860_weather_data
-            WHERE channel3_uv IS NOT NULL
-            """
-            
-            cursor.execute(query3)
-            result = cursor.fetchone()
+            print(f"  最低溫度: {extreme(summaries, min, 'min_temp')}°C")
+            print(f"  最高溫度: {extreme(summaries, max, 'max_temp')}°C")
+            print(f"  最低濕度: {extreme(summaries, min, 'min_humidity')}%")
+            print(f"  最高濕度: {extreme(summaries, max, 'max_humidity')}%")
             
+            # UV 資料（每天只屬於一個月份，天數可以直接相加）
             print(f"\nUV 資料統計：")
-            print(f"  第一筆 UV 記錄時間: {result[0]}")
-            print(f"  有 UV 記錄的天數: {result[1]} 天")
-            
-            # 查詢設備溫度資料
-            query4 = """
-            SELECT 
-                year,
-                month,
-                COUNT(*) as count
-            FROM gl860_weather_data
-            WHERE channel5_device_temp IS NOT NULL
-            GROUP BY year, month
-            """
-            
-            cursor.execute(query4)
-            results = cursor.fetchall()
+            print(f"  第一筆 UV 記錄時間: {extreme(summaries, min, 'first_uv_time')}")
+            print(f"  有 UV 記錄的天數: {sum(row['uv_days'] for row in summaries)} 天")
             
+            # 設備溫度資料
             print(f"\n設備溫度資料分布：")
-            for row in results:
-                print(f"  {row[0]}年{row[1]}月: {row[2]} 筆記錄")
+            for row in summaries:
+                if row['ch5_count']:
+                    print(f"  {row['year']}年{row['month']}月: {row['ch5_count']} 筆記錄")
             
-            connection.close()
+            if owns_connection:
+                connection.close()
             print("\n" + "=" * 70)
             print("驗證完成！")
+            return True
             
     except Error as e:
         print(f"錯誤: {e}")
+    return False
 
 if __name__ == "__main__":
     verify_import()
@@ -0,0 +1,224 @@
+"""
+監看資料夾並自動導入
+持續監看 GL860 和 COAI 資料夾，有新檔案或檔案被重新存檔時自動導入，並只更新受影響日期的統計：
+
+    python watch_folders.py                 # 每 2 秒檢查一次，按 Ctrl+C 結束
+    python watch_folders.py --once          # 只檢查一次（排程執行時使用）
+
+- 以輪詢方式檢查檔案大小和修改時間，只讀取目錄資訊，閒置時幾乎不佔用 CPU
+- 檔案大小和修改時間維持 --settle 秒不變才導入，不會讀到還在寫入中的檔案
+- 略過 Excel 的暫存檔（~$ 開頭）
+- 新檔案直接導入，未變更的檔案（只是被重新存檔）不會重新解析；
+  已變更的檔案（例如本月的匯出檔又增加了資料）只導入上次導入位置之後的資料列，
+  檔案前面的內容被修改時才以 upsert 重新導入整個檔案
+- 導入失敗的檔案在內容變動後立即重試，沒有變動時依 30 秒、60 秒、120 秒……（最多 1 小時）的間隔重試
+"""
+import argparse
+import fnmatch
+import os
+import time
+
+from mysql.connector import Error
+
+from add_new_data import GL860IncrementalImporter
+from c0ai10_parser import FILE_PATTERN as C0AI10_PATTERN
+from c0ai10_to_mysql import import_station_files
+from create_statistics import update_statistics
+from db import get_connection
+from gl860_parser import FILE_PATTERNS
+
+DEFAULT_INTERVAL = 2.0
+DEFAULT_SETTLE = 3.0
+# 導入失敗的檔案第一次重試前等待的秒數，之後每次失敗加倍，最多 MAX_RETRY_DELAY 秒
+RETRY_DELAY = 30.0
+MAX_RETRY_DELAY = 3600.0
+
+
+class WatchTarget:
+    """監看的資料夾
+
+    patterns: 檔名的萬用字元格式（可以有多個）
+    handler: 接收 (連線, 檔案列表) 的函式，有寫入資料時回傳 True
+    """
+
+    def __init__(self, name, folder, patterns, handler):
+        self.name = name
+        self.folder = folder
+        self.patterns = (patterns,) if isinstance(patterns, str) else tuple(patterns)
+        self.handler = handler
+
+    def matches(self, filename):
+        return any(fnmatch.fnmatch(filename, pattern) for pattern in self.patterns)
+
+    def scan(self):
+        """資料夾中符合條件的檔案 -> {路徑: (大小, 修改時間)}"""
+        files = {}
+        try:
+            entries = os.scandir(self.folder)
+        except FileNotFoundError:
+            return files
+        with entries:
+            for entry in entries:
+                if entry.name.startswith('~$') or not self.matches(entry.name):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # 掃描時剛好被刪除或改名
+                    continue
+                files[entry.path] = (stat.st_size, stat.st_mtime)
+        return files
+
+
+class FolderWatcher:
+    """以輪詢方式找出已經寫入完成的新檔案或變更的檔案
+
+    每個檔案的大小和修改時間維持 settle 秒不變才視為寫入完成；
+    啟動時資料夾中已有的檔案也會檢查一次（由 manifest 判斷是否需要導入）。
+    處理失敗的檔案（forget）變動後立即重新處理，沒有變動時依指數退避的間隔重試
+    """
+
+    def __init__(self, targets, settle=DEFAULT_SETTLE):
+        self.targets = targets
+        self.settle = settle
+        self.pending = {}   # 路徑 -> (簽章, 最後一次變動的時間)
+        self.handled = {}   # 路徑 -> 已處理的簽章
+        self.failures = {}  # 路徑 -> (連續失敗次數, 下次重試的時間)
+
+    def poll(self, now=None):
+        """檢查一次，回傳 {WatchTarget: [寫入完成的檔案, ...]}"""
+        now = time.monotonic() if now is None else now
+        ready = {}
+        for target in self.targets:
+            files = target.scan()
+            for path, signature in files.items():
+                if self.handled.get(path) == signature:
+                    failure = self.failures.get(path)
+                    if failure is not None and now >= failure[1]:
+                        # 檔案沒有變動，到了重試時間；處理結果確定之前不再重試
+                        self.failures[path] = (failure[0], float('inf'))
+                        ready.setdefault(target, []).append(path)
+                    continue
+                # 檔案有變動，之前的失敗不再計算
+                self.failures.pop(path, None)
+                previous = self.pending.get(path)
+                if previous is None or previous[0] != signature:
+                    # 新出現或仍在變動，重新計時
+                    self.pending[path] = (signature, now)
+                elif now - previous[1] >= self.settle and is_readable(path):
+                    del self.pending[path]
+                    self.handled[path] = signature
+                    ready.setdefault(target, []).append(path)
+            # 已刪除的檔案不再追蹤
+            for path in [p for p in self.pending if os.path.dirname(p) == target.folder and p not in files]:
+                del self.pending[path]
+        return ready
+
+    def forget(self, paths, now=None):
+        """登記處理失敗的檔案：檔案變動後立即重新處理，否則在退避時間後重試"""
+        now = time.monotonic() if now is None else now
+        for path in paths:
+            attempts = self.failures.get(path, (0, None))[0] + 1
+            delay = min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+            self.failures[path] = (attempts, now + delay)
+
+
+def is_readable(path):
+    """檔案是否可以開啟（Windows 上寫入中的檔案無法讀取）"""
+    try:
+        with open(path, 'rb'):
+            return True
+    except OSError:
+        return False
+
+
+def import_gl860_files(connection, files):
+    """導入 GL860 檔案：新檔案直接導入，已變更的檔案只導入新增的資料列，有寫入資料時回傳 True"""
+    importer = GL860IncrementalImporter(connection=connection)
+    if not importer.ensure_table():
+        raise RuntimeError("無法建立資料表")
+    files = sorted(files)
+    statuses = {filepath: importer.file_status(filepath) for filepath in files}
+    # 已變更的檔案通常是本月的匯出檔增加了資料，只導入後面新增的部分
+    plan = [(f, 'tail' if action == 'upsert' else action)
+            for f, action in importer.plan_imports(files, statuses, 'files') if action != 'skip']
+    if not plan:
+        return False
+    if not importer.acquire_lock():
+        raise RuntimeError("另一個導入程式正在執行")
+    try:
+        if not importer.run_plan(plan):
+            raise RuntimeError("部分檔案導入失敗")
+    finally:
+        importer.release_lock()
+    return True
+
+
+WATCH_TARGETS = [
+    WatchTarget('GL860', 'GL860', FILE_PATTERNS, import_gl860_files),
+    WatchTarget('C0AI10', 'COAI', C0AI10_PATTERN, import_station_files),
+]
+
+
+def process(watcher, ready):
+    """導入寫入完成的檔案，有寫入資料時更新統計（只重新計算受影響的日期）"""
+    try:
+        connection = get_connection(create_database=True)
+    except Error as e:
+        print(f"✗ 連接失敗: {e}")
+        for files in ready.values():
+            watcher.forget(files)
+        return
+
+    try:
+        changed = False
+        for target, files in ready.items():
+            print(f"\n[{time.strftime('%H:%M:%S')}] {target.name}: "
+                  f"{', '.join(os.path.basename(f) for f in files)}")
+            try:
+                changed = target.handler(connection, files) or changed
+            except Exception as e:
+                # 監看程式持續執行，失敗的檔案下次再重試
+                print(f"✗ {target.name} 導入失敗，稍後重試: {e}")
+                connection.rollback()
+                watcher.forget(files)
+        if changed:
+            update_statistics(connection)
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='監看資料夾並自動導入新檔案')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='檢查間隔（秒）')
+    parser.add_argument('--settle', type=float, default=DEFAULT_SETTLE,
+                        help='檔案維持不變多久（秒）才導入')
+    parser.add_argument('--once', action='store_true', help='只檢查一次資料夾中的所有檔案')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("監看資料夾：" + "、".join(
+        f"{t.folder}/{pattern}" for t in WATCH_TARGETS for pattern in t.patterns))
+    print("=" * 70)
+
+    if args.once:
+        watcher = FolderWatcher(WATCH_TARGETS, settle=0)
+        watcher.poll()
+        ready = watcher.poll()
+        if ready:
+            process(watcher, ready)
+        return
+
+    watcher = FolderWatcher(WATCH_TARGETS, settle=args.settle)
+    try:
+        while True:
+            ready = watcher.poll()
+            if ready:
+                process(watcher, ready)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n已停止監看")
+
+
+if __name__ == "__main__":
+    main()